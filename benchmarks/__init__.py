@@ -0,0 +1,5 @@
+"""
+Offline benchmarks. Run from the project root, e.g.:
+
+    uv run python -m benchmarks.mkb_catalogue
+"""
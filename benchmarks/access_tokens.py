@@ -0,0 +1,93 @@
+"""
+Access-token throughput: signing and the token endpoints, in process.
+
+Signing:
+- "AccessToken": the previous per-call api.AccessToken(...).to_jwt();
+- "sign": sign_access_token, the same claims signed directly with PyJWT;
+- "cached": generate_access_token for pairs already issued (reuse window).
+
+Endpoints (through the ASGI app, no network): POST /api/token once per
+pair vs POST /api/tokens with --batch pairs per request, for new pairs and
+for pairs requested again (e.g. a page reload).
+
+    uv run python -m benchmarks.access_tokens --tokens 2000 --batch 50
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Настройки требуют ключей; токены только подписываются, сеть не используется
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("LIVEKIT_URL", "wss://benchmark")
+os.environ.setdefault("LIVEKIT_API_KEY", "benchmark")
+os.environ.setdefault("LIVEKIT_API_SECRET", "benchmark-secret-benchmark-secret")
+
+import httpx
+from livekit import api
+
+from src.core.settings import settings
+from src.main import app
+from src.utils.auth import generate_access_token, get_access_token_cache, sign_access_token
+
+
+def legacy_token(room_name: str, participant_name: str) -> str:
+    token = api.AccessToken(settings.livekit_api_key, settings.livekit_api_secret)
+    token.with_identity(participant_name)
+    token.with_name(participant_name)
+    token.with_grants(api.VideoGrants(room_join=True, room=room_name, can_publish=True, can_subscribe=True))
+    return token.to_jwt()
+
+
+def pairs(n: int, prefix: str) -> list[tuple[str, str]]:
+    return [(f"{prefix}-room{i // 2}", f"{prefix}-{'doctor' if i % 2 else 'patient'}{i // 2}") for i in range(n)]
+
+
+def rate(n: int, fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return n / (time.perf_counter() - started)
+
+
+async def endpoint_rates(client: httpx.AsyncClient, items: list[tuple[str, str]], batch: int) -> tuple[float, float]:
+    started = time.perf_counter()
+    for room_name, participant_name in items:
+        r = await client.post("/api/token", json={"room_name": room_name, "participant_name": participant_name})
+        r.raise_for_status()
+    single = len(items) / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for i in range(0, len(items), batch):
+        participants = [{"room_name": room, "participant_name": name} for room, name in items[i:i + batch]]
+        r = await client.post("/api/tokens", json={"participants": participants})
+        r.raise_for_status()
+    batched = len(items) / (time.perf_counter() - started)
+    return single, batched
+
+
+async def main(n: int, batch: int):
+    print(f"{n} tokens, batch size {batch}")
+    items = pairs(n, "sign")
+    print(f"{'AccessToken':>12}: {rate(n, lambda: [legacy_token(*p) for p in items]):>9.0f} tokens/s")
+    print(f"{'sign':>12}: {rate(n, lambda: [sign_access_token(*p) for p in items]):>9.0f} tokens/s")
+    for p in items:
+        generate_access_token(*p)
+    print(f"{'cached':>12}: {rate(n, lambda: [generate_access_token(*p) for p in items]):>9.0f} tokens/s")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as client:
+        # разные пары для одиночного и пакетного пути, чтобы оба подписывали заново
+        single_new, _ = await endpoint_rates(client, pairs(n, "single"), batch)
+        _, batch_new = await endpoint_rates(client, pairs(n, "batch"), batch)
+        single_again, batch_again = await endpoint_rates(client, pairs(n, "batch"), batch)
+    print(f"{'':>12}  {'new pairs':>10} {'repeated':>10}")
+    print(f"{'/api/token':>12}: {single_new:>10.0f} {single_again:>10.0f} tokens/s")
+    print(f"{'/api/tokens':>12}: {batch_new:>10.0f} {batch_again:>10.0f} tokens/s")
+    print(f"token cache: {get_access_token_cache().stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=2000, help="pairs per run (keep within access_token_cache_size)")
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.batch))
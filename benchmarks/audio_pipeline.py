@@ -0,0 +1,225 @@
+"""
+CPU per concurrent room of the transcription worker's audio path, on
+synthetic audio (no LiveKit room, no OpenAI calls).
+
+Every track is fed real-time paced 10 ms frames (alternating bursts of
+formant-synthesized "speech" and pauses) through the worker's TrackTranscriber with the real
+Silero VAD and a stub STT stream that only counts frames.
+
+- "legacy": what the worker did before the transcription-only mode — a new
+  OpenAI STT plugin (and HTTP client) per track, a VAD stream whose output was
+  never read, all frames to STT, plus the AgentSession audio input reading a
+  participant's frames in parallel;
+- "transcription-only": one shared STT plugin per process, no AgentSession,
+  no VAD gating (all frames to STT);
+- "vad-gated": transcription-only with VAD gating of the STT input (speech
+  plus pre/post-roll only), reporting frames and bytes actually sent to STT.
+
+Noise cancellation (BVC) runs natively inside rtc.AudioStream and needs a
+room connection, so it is not included; the legacy mode ran one extra BVC
+per room on top of what is measured here.
+
+    uv run python -m benchmarks.audio_pipeline --rooms 1 4 8 --seconds 10
+    uv run python -m benchmarks.audio_pipeline --rooms 4 --wav consultation_16k.wav
+"""
+import argparse
+import asyncio
+import math
+import os
+import time
+import wave
+from typing import Optional
+
+# Настройки требуют ключей, но STT здесь заглушка — сеть не используется
+for _var in ("OPENAI_API_KEY", "LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+    os.environ.setdefault(_var, "benchmark")
+
+import numpy as np
+from livekit import rtc
+from livekit.plugins import openai, silero
+
+from src.core.settings import settings
+from src.services.audio_pipeline import FrameCounters, TrackTranscriber, get_stt_plugin
+
+SAMPLE_RATE = 16000
+FRAME_MS = 10
+SAMPLES_PER_FRAME = SAMPLE_RATE * FRAME_MS // 1000
+
+
+# Форманты гласных (Гц): голосовой импульсный сигнал через резонаторы похож на речь для Silero
+_VOWELS = [(730, 1090, 2440), (270, 2290, 3010), (300, 870, 2240), (530, 1840, 2480), (570, 840, 2410)]
+
+
+def _resonate(x: np.ndarray, freq: float, bandwidth: float = 80.0) -> np.ndarray:
+    r = math.exp(-math.pi * bandwidth / SAMPLE_RATE)
+    a1, a2 = -2 * r * math.cos(2 * math.pi * freq / SAMPLE_RATE), r * r
+    y = np.zeros(len(x))
+    y1 = y2 = 0.0
+    for i, v in enumerate(x):
+        y1, y2 = (1 - r) * v - a1 * y1 - a2 * y2, y1
+        y[i] = y1
+    return y
+
+
+def _speechlike(samples: int, rng: np.random.Generator) -> np.ndarray:
+    """Glottal pulse train through vowel formants, 4 Hz syllable envelope"""
+    t = np.arange(samples) / SAMPLE_RATE
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    pulses = (np.diff(np.floor(np.cumsum(pitch / SAMPLE_RATE)), prepend=0) > 0).astype(float)
+    out = np.zeros(samples)
+    syllable = SAMPLE_RATE // 5
+    for start in range(0, samples, syllable):
+        y = pulses[start:start + syllable]
+        for formant in _VOWELS[rng.integers(len(_VOWELS))]:
+            y = _resonate(y, formant)
+        out[start:start + syllable] = y
+    out *= 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    return out / max(np.abs(out).max(), 1e-9) * 8000
+
+
+def _to_frames(audio: np.ndarray) -> list[rtc.AudioFrame]:
+    audio = np.clip(audio, -32768, 32767).astype(np.int16)
+    return [
+        rtc.AudioFrame(audio[i:i + SAMPLES_PER_FRAME].tobytes(), SAMPLE_RATE, 1, SAMPLES_PER_FRAME)
+        for i in range(0, len(audio) - SAMPLES_PER_FRAME + 1, SAMPLES_PER_FRAME)
+    ]
+
+
+def synthetic_frames(seconds: float, seed: int) -> tuple[list[rtc.AudioFrame], float]:
+    """
+    Alternating 1-3 s speech-like bursts and 2-5 s pauses of low noise, like
+    a consultation with examination breaks. Returns the frames and the share
+    of synthesized speech; Silero does not recognise every synthetic burst as
+    speech, so use --wav with a real recording for representative gating
+    numbers.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    chunks, speaking, size, speech = [], False, 0, 0
+    while size < total:
+        length = min(int(rng.uniform(*((1, 3) if speaking else (2, 5))) * SAMPLE_RATE), total - size)
+        chunk = _speechlike(length, rng) if speaking else np.zeros(length)
+        speech += length if speaking else 0
+        chunks.append(chunk + rng.normal(0, 30, length))
+        speaking, size = not speaking, size + length
+    return _to_frames(np.concatenate(chunks)), speech / total
+
+
+def wav_frames(path: str) -> list[rtc.AudioFrame]:
+    """16 kHz mono 16-bit WAV file as 10 ms frames"""
+    with wave.open(path, "rb") as f:
+        if (f.getframerate(), f.getnchannels(), f.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+            raise SystemExit(f"{path}: expected 16 kHz mono 16-bit PCM")
+        audio = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    return _to_frames(audio.astype(np.float64))
+
+
+async def paced(frames: list[rtc.AudioFrame]):
+    """Yields frame events at real-time pace, like rtc.AudioStream"""
+    start = time.monotonic()
+    for i, frame in enumerate(frames):
+        delay = start + i * FRAME_MS / 1000 - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield rtc.AudioFrameEvent(frame)
+
+
+class _StubSpeechStream:
+    def __init__(self):
+        self.frames = 0
+        self._closed = asyncio.Event()
+
+    def push_frame(self, frame: rtc.AudioFrame):
+        self.frames += 1
+
+    async def aclose(self):
+        self._closed.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await self._closed.wait()
+        raise StopAsyncIteration
+
+
+class _StubSTT:
+    def stream(self):
+        return _StubSpeechStream()
+
+
+async def _session_input(frames: list[rtc.AudioFrame]):
+    # аудиовход AgentSession без STT/VAD: кадры читаются и отбрасываются
+    async for _ in paced(frames):
+        pass
+
+
+async def _unused_vad(frames: list[rtc.AudioFrame], vad_model):
+    # раньше каждый трек кормил VAD, результат которого не читался
+    vad_stream = vad_model.stream()
+    async for frame_event in paced(frames):
+        vad_stream.push_frame(frame_event.frame)
+    await vad_stream.aclose()
+
+
+async def run_room(mode: str, frames: list[rtc.AudioFrame], tracks: int, vad_model, counters: FrameCounters):
+    async def on_final(text: str):
+        pass
+
+    jobs = []
+    for track in range(tracks):
+        if mode == "legacy":
+            openai.STT(model=settings.stt_model, detect_language=True)
+        else:
+            get_stt_plugin()
+        transcriber = TrackTranscriber(
+            paced(frames), vad_model, _StubSTT(), on_final,
+            identity=f"track{track}", counters=counters, gated=mode == "vad-gated", segment_mode=False,
+        )
+        jobs.append(transcriber.run())
+        if mode == "legacy":
+            jobs.append(_unused_vad(frames, vad_model))
+    if mode == "legacy":
+        jobs.append(_session_input(frames))
+    await asyncio.gather(*jobs)
+
+
+async def measure(
+    mode: str, rooms: int, tracks: int, frames: list[rtc.AudioFrame], vad_model
+) -> tuple[float, float, FrameCounters]:
+    counters = FrameCounters()
+    get_stt_plugin.cache_clear()
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(run_room(mode, frames, tracks, vad_model, counters) for _ in range(rooms)))
+    return time.process_time() - cpu, time.perf_counter() - wall, counters
+
+
+async def main(room_counts: list[int], tracks: int, seconds: float, wav: Optional[str]):
+    vad_model = silero.VAD.load()
+    if wav:
+        frames = wav_frames(wav)
+        print(f"audio: {wav}")
+    else:
+        frames, speech_share = synthetic_frames(seconds, seed=0)
+        print(f"audio: synthetic, {speech_share:.0%} speech")
+    seconds = len(frames) * FRAME_MS / 1000
+    print(f"{tracks} tracks per room, {seconds:.0f} s of audio per track (BVC not included)")
+    for rooms in room_counts:
+        for mode in ("legacy", "transcription-only", "vad-gated"):
+            cpu, wall, counters = await measure(mode, rooms, tracks, frames, vad_model)
+            stt_bytes = counters.pushed * SAMPLES_PER_FRAME * 2
+            print(
+                f"{rooms:>3} rooms {mode:>18}: {cpu / rooms * 1000 / seconds:7.1f} ms CPU per room per audio second "
+                f"({cpu / wall * 100:5.1f}% of a core total), STT frames {counters.pushed} pushed / "
+                f"{counters.skipped} skipped, {stt_bytes / 1024:.0f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--tracks", type=int, default=2, help="audio tracks per room")
+    parser.add_argument("--seconds", type=float, default=10.0, help="synthetic audio per track")
+    parser.add_argument("--wav", help="16 kHz mono WAV recording to use instead of synthetic audio")
+    args = parser.parse_args()
+    asyncio.run(main(args.rooms, args.tracks, args.seconds, args.wav))
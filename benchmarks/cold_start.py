@@ -0,0 +1,77 @@
+"""
+Cold-start time of the transcription worker and the API.
+
+Every run is a fresh interpreter (`python -c "import <module>"`), so module
+imports and everything done at import time are measured, as on a container
+start or a new LiveKit job process. Reported: median / min wall time of the
+import, and the median self time of this project's own `src.*` modules from
+`-X importtime` (third-party imports dominate the wall time and are noisy,
+the work done at import time by our modules is what we control); then the
+wall time with every registered agent built on top of the worker import.
+
+    uv run python -m benchmarks.cold_start --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Настройки требуют ключей; сеть не используется
+for _var in ("OPENAI_API_KEY", "LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+    os.environ.setdefault(_var, "benchmark")
+
+from src.core.startup import ENTRY_MODULES, parse_importtime
+
+TARGETS = {name: f"import {module}" for name, module in ENTRY_MODULES.items()}
+# модули агентов регистрируют их при импорте; воркер импортирует их только в задаче
+AGENT_MODULES = ("role_agent", "role_validator_agent", "mkb_agent", "summary_agent")
+BUILD_AGENTS = "".join(f"; import src.agents.{name}" for name in AGENT_MODULES) + (
+    "; from src.agents.registry import build_all_agents; build_all_agents()"
+)
+
+
+def own_import_s(importtime_log: str) -> float:
+    """Sum of self times of src.* modules in `-X importtime` output"""
+    return sum(r.self_us for r in parse_importtime(importtime_log) if r.module.startswith("src.")) / 1e6
+
+
+def measure(code: str, runs: int) -> tuple[list[float], list[float]]:
+    timings, own = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            check=True, env=os.environ.copy(), stderr=subprocess.PIPE, text=True,
+        )
+        timings.append(time.perf_counter() - started)
+        own.append(own_import_s(result.stderr))
+    return timings, own
+
+
+def report(name: str, measured: tuple[list[float], list[float]]):
+    timings, own = measured
+    print(
+        f"  {name:<22} median {statistics.median(timings) * 1000:7.0f} ms, min {min(timings) * 1000:7.0f} ms, "
+        f"src.* self {statistics.median(own) * 1000:6.1f} ms"
+    )
+
+
+def main(runs: int, agents: bool):
+    # первый запуск прогревает кэш байткода и файловый кэш ОС
+    measure(TARGETS["worker"], 1)
+    print(f"{runs} fresh interpreters per target:")
+    report("python (empty)", measure("pass", runs))
+    for name, code in TARGETS.items():
+        report(name, measure(code, runs))
+    if agents:
+        report("worker + all agents", measure(TARGETS["worker"] + BUILD_AGENTS, runs))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-agents", action="store_true", help="skip building agents (trees without the registry)")
+    args = parser.parse_args()
+    main(args.runs, not args.no_agents)
@@ -0,0 +1,122 @@
+"""
+Concurrency of LiveKit RoomService calls from the API process, against a
+local stub Twirp server (no LiveKit needed).
+
+The stub answers CreateRoom/ListRooms after --latency seconds and records
+the peak number of requests it was serving at once. Its event loop runs in
+its own thread, so a blocking client stalls only the client's loop, as
+`requests.post` inside an `async def` stalled the FastAPI loop.
+
+- "legacy": the previous list_rooms — a fresh JWT and a blocking
+  `requests.post` (new connection) per call;
+- "pooled": LiveKitRoomClient — cached token, keep-alive httpx pool.
+
+    uv run python -m benchmarks.livekit_client --concurrency 1 10 50 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+from typing import Optional
+
+# Настройки требуют ключей; запросы идут только на локальную заглушку
+for _var in ("OPENAI_API_KEY", "LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+    os.environ.setdefault(_var, "benchmark")
+
+import requests
+from aiohttp import web
+
+from src.utils.livekit_client import LiveKitRoomClient
+from src.utils.room import create_room_list_token
+
+
+class StubTwirpServer:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.in_flight = 0
+        self.peak = 0
+        self.served = 0
+        self.url = ""
+        self._ready = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await request.read()
+            await asyncio.sleep(self.latency)
+            self.served += 1
+            method = request.match_info["method"]
+            body = {"rooms": []} if method == "ListRooms" else {"name": "room", "sid": "RM_stub"}
+            return web.json_response(body)
+        finally:
+            self.in_flight -= 1
+
+    def reset(self):
+        self.in_flight = self.peak = self.served = 0
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_post("/twirp/livekit.RoomService/{method}", self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name="stub_twirp").start()
+        self._ready.wait()
+
+
+async def legacy_list_rooms(base_url: str) -> dict:
+    # прежняя реализация: новый токен и блокирующий запрос на каждый вызов
+    token = create_room_list_token()
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    response = requests.post(f"{base_url}/twirp/livekit.RoomService/ListRooms", json={}, headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+
+async def run(call, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await call()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - started
+
+
+async def main(args):
+    server = StubTwirpServer(args.latency)
+    server.start()
+    client = LiveKitRoomClient(base_url=server.url)
+    print(f"stub Twirp server {server.url}, {args.latency * 1000:.0f} ms per call, {args.requests} ListRooms calls per run")
+    print(f"{'mode':>7} {'concurrency':>11} {'req/s':>8} {'wall s':>7} {'server peak':>11}")
+    for concurrency in args.concurrency:
+        for mode, call in (
+            ("legacy", lambda: legacy_list_rooms(server.url)),
+            ("pooled", client.list_rooms),
+        ):
+            server.reset()
+            wall = await run(call, args.requests, concurrency)
+            print(f"{mode:>7} {concurrency:>11} {args.requests / wall:>8.1f} {wall:>7.2f} {server.peak:>11}")
+    print(f"pooled client: {client.stats()}")
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub server response delay, seconds")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""
+Benchmark: indexed MkbCatalogue vs the original pandas path of the MKB tools.
+
+Walks the same classes -> blocks -> elements -> details chain the summary agent
+does for one diagnosis and reports per-walk latency for both implementations.
+The pandas path re-reads mkb10.csv on every call, exactly like the old tools.
+Also reports catalogue startup cost: CSV parse vs opening the mmap snapshot.
+
+Before timing, the full tool output of the sample walks and the codes
+returned for every class, block and element are checked against the old
+prefix-filter semantics, for both the CSV-built and the mapped catalogue.
+"""
+import json
+import time
+
+import pandas as pd
+
+from src.services.mkb_catalogue import MkbCatalogue, MKB_CSV_PATH, load_catalogue
+
+# Цепочки для обхода: класс -> блок -> элемент (туберкулёз, грипп, гипертензия, перелом черепа)
+WALKS = [
+    ("01", "0102", "0102A15"),
+    ("10", "1002", "1002J10"),
+    ("09", "0903", "0903I10"),
+    ("19", "1901", "1901S02"),
+]
+REPEATS = 5
+
+
+# --- старая реализация на pandas (копия инструментов до индексации) ---
+
+def _pandas_level(df: pd.DataFrame, length_filter, prefix: str | None, with_range: bool) -> str:
+    mask = length_filter(df["code"].astype(str).str.len())
+    if prefix is not None:
+        mask &= df["code"].astype(str).str.startswith(prefix)
+    filtered = df[mask].copy()
+    if with_range:
+        filtered["mkb_code"] = filtered["name"].str.extract(r"\(([A-Z0-9\-]+)\)")
+    filtered = filtered.drop(columns=["id", "parent_id", "has_children", "is_active", "version_date"])
+    return filtered.to_json(orient="records", force_ascii=False, indent=2)
+
+
+def pandas_walk(class_code: str, block_code: str, element_code: str) -> list[str]:
+    return [
+        _pandas_level(pd.read_csv(MKB_CSV_PATH), lambda s: s == 2, None, True),
+        _pandas_level(pd.read_csv(MKB_CSV_PATH), lambda s: s == 4, class_code, True),
+        _pandas_level(pd.read_csv(MKB_CSV_PATH), lambda s: s == 7, block_code, False),
+        _pandas_level(pd.read_csv(MKB_CSV_PATH), lambda s: s > 7, element_code, False),
+    ]
+
+
+def check_all_levels(catalogues: list[MkbCatalogue]) -> int:
+    """Codes of every level below every node, as the old prefix filters returned them; returns nodes checked"""
+    codes = pd.read_csv(MKB_CSV_PATH)["code"].astype(str)
+    lengths = codes.str.len()
+
+    def expected(length_filter, prefix: str) -> list[str]:
+        return sorted(codes[length_filter(lengths) & codes.str.startswith(prefix)])
+
+    levels = [
+        ("classes", lambda s: s == 2, None),
+        ("blocks", lambda s: s == 4, lambda c: c.classes()),
+        ("elements", lambda s: s == 7, lambda c: [b for k in c.classes() for b in c.blocks(k.code)]),
+        ("details", lambda s: s > 7, lambda c: [e for k in c.classes() for b in c.blocks(k.code) for e in c.elements(b.code)]),
+    ]
+    checked = 0
+    for name, length_filter, parents in levels:
+        nodes = [None] if parents is None else [e.code for e in parents(catalogues[0])]
+        for node in nodes:
+            want = expected(length_filter, node or "")
+            for catalogue in catalogues:
+                got = [e.code for e in (catalogue.classes() if node is None else getattr(catalogue, name)(node))]
+                assert got == want, f"{name} of {node}: {len(got)} codes, expected {len(want)}"
+            checked += 1
+    return checked
+
+
+def catalogue_walk(catalogue: MkbCatalogue, class_code: str, block_code: str, element_code: str) -> list[str]:
+    levels = [
+        catalogue.classes(),
+        catalogue.blocks(class_code),
+        catalogue.elements(block_code),
+        catalogue.details(element_code),
+    ]
+    return [json.dumps([e.as_record() for e in level], ensure_ascii=False, indent=2) for level in levels]
+
+
+def _timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    start = time.perf_counter()
+    catalogue = MkbCatalogue.from_csv()
+    build_s = time.perf_counter() - start
+    print(f"catalogue build from CSV: {build_s * 1000:.1f} ms, {len(catalogue)} rows")
+
+    load_catalogue()  # создаёт снапшот, если его ещё нет
+    start = time.perf_counter()
+    snapshot_catalogue = load_catalogue()
+    snapshot_s = time.perf_counter() - start
+    print(f"catalogue open from snapshot: {snapshot_s * 1000:.1f} ms")
+
+    # Результаты обеих реализаций должны совпадать
+    for walk in WALKS:
+        expected = [json.loads(x) for x in pandas_walk(*walk)]
+        actual = [json.loads(x) for x in catalogue_walk(catalogue, *walk)]
+        mapped = [json.loads(x) for x in catalogue_walk(snapshot_catalogue, *walk)]
+        assert expected == actual == mapped, f"mismatch for walk {walk}"
+    print(f"parity with the prefix filters: {check_all_levels([catalogue, snapshot_catalogue])} nodes checked")
+
+    pandas_times = [_timed(pandas_walk, *walk) for _ in range(REPEATS) for walk in WALKS]
+    catalogue_times = [_timed(catalogue_walk, catalogue, *walk) for _ in range(REPEATS) for walk in WALKS]
+
+    pandas_ms = sum(pandas_times) / len(pandas_times) * 1000
+    catalogue_ms = sum(catalogue_times) / len(catalogue_times) * 1000
+    print(f"pandas path:    {pandas_ms:8.2f} ms per 4-level walk")
+    print(f"catalogue path: {catalogue_ms:8.3f} ms per 4-level walk")
+    print(f"speedup:        {pandas_ms / catalogue_ms:8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
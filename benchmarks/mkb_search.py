@@ -0,0 +1,152 @@
+"""
+Offline benchmark: MKB-10 code lookup via search_mkb vs the four-level tree walk.
+
+Runs the real MKB agent from src/agents/mkb_agent.py against a stub model
+(pydantic-ai FunctionModel), so no OpenAI calls are made:
+
+- "tree" strategy: an ideal navigator that knows the answer and walks
+  classes -> blocks -> elements -> details, one tool call per level;
+- "search" strategy: calls search_mkb(query) once and answers with the top
+  hit, falling back to the tree walk when the expected code is not in the
+  results.
+
+Each stub model response sleeps --model-latency seconds to stand in for a
+real model round-trip. Reports model requests, tool calls and latency per
+query, plus search top-1 / top-k hit rates.
+
+    uv run python -m benchmarks.mkb_search --model-latency 0.8
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+# Настройки требуют ключей, но модель здесь заглушка — сеть не используется
+for _var in ("OPENAI_API_KEY", "LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+    os.environ.setdefault(_var, "benchmark")
+
+from pydantic_ai.messages import ModelMessage, ModelRequest, ModelResponse, ToolCallPart, UserPromptPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from src.agents.mkb_agent import get_agent
+from src.services.mkb_catalogue import ELEMENT_CODE_LEN, get_catalogue
+from src.services.mkb_search import get_search_index
+
+# (запрос, ожидаемый код МКБ-10)
+QUERIES = [
+    ("Туберкулез легких, подтвержденный только ростом культуры", "A15.1"),
+    ("Острый бронхит, вызванный стрептококком", "J20.2"),
+    ("Эссенциальная первичная гипертензия", "I10"),
+    ("Грипп с пневмонией, вирус гриппа идентифицирован", "J10.0"),
+    ("Перелом костей носа закрытый", "S02.20"),
+    ("Мигрень без ауры", "G43.0"),
+    ("Острый тонзиллит неуточненный", "J03.9"),
+    ("Гастроэзофагеальный рефлюкс с эзофагитом", "K21.0"),
+    ("Железодефицитная анемия неуточненная", "D50.9"),
+    ("Острый цистит", "N30.0"),
+]
+TOP_K = 10
+
+
+def _last_tool_json(messages: list[ModelMessage]) -> list[dict]:
+    """JSON payload of the most recent ToolReturn (sent as a user prompt part)"""
+    for message in reversed(messages):
+        if not isinstance(message, ModelRequest):
+            continue
+        for part in message.parts:
+            if isinstance(part, UserPromptPart) and isinstance(part.content, list):
+                return json.loads(part.content[-1])
+    return []
+
+
+def _tree_calls(expected: str) -> list[tuple[str, dict]]:
+    """Tool calls an ideal navigator makes to reach `expected` level by level"""
+    catalogue = get_catalogue()
+    row = next(r for r in range(len(catalogue)) if catalogue.entry(r).mkb_code == expected)
+    path = catalogue.ancestors(row) + [catalogue.entry(row)]
+    class_code, block_code = path[0].code, path[1].code
+    element_code = next(e.code for e in path if len(e.code) == ELEMENT_CODE_LEN)
+    return [
+        ("get_mkb_classes", {}),
+        ("get_mkb_class_blocks", {"mkb_class_code": class_code}),
+        ("get_mkb_class_block_elements", {"mkb_class_block_code": block_code}),
+        ("get_mkb_class_block_element_details", {"mkb_class_block_element_code": element_code}),
+    ]
+
+
+def _final(info: AgentInfo, mkb_code: str, name: str) -> ModelResponse:
+    answer = {"mkb_code": mkb_code, "name": name, "reason": "benchmark"}
+    return ModelResponse(parts=[
+        ToolCallPart(info.output_tools[0].name, {"exact_answer": answer, "similar_answers": []})
+    ])
+
+
+def stub_model(strategy: str, query: str, expected: str, latency: float) -> FunctionModel:
+    catalogue = get_catalogue()
+    expected_name = next(
+        catalogue.entry(r).name for r in range(len(catalogue)) if catalogue.entry(r).mkb_code == expected
+    )
+    plan = [] if strategy == "tree" else [("search_mkb", {"query": query, "top_k": TOP_K})]
+
+    async def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(latency)
+        step = sum(isinstance(m, ModelResponse) for m in messages)
+
+        if strategy == "search" and step == 1:
+            hits = _last_tool_json(messages)
+            if any(h["mkb_code"] == expected for h in hits):
+                return _final(info, expected, expected_name)
+            plan.extend(_tree_calls(expected))
+        elif strategy == "tree" and step == 0:
+            plan.extend(_tree_calls(expected))
+
+        if step < len(plan):
+            name, args = plan[step]
+            return ModelResponse(parts=[ToolCallPart(name, args)])
+        return _final(info, expected, expected_name)
+
+    return FunctionModel(respond)
+
+
+async def run_query(strategy: str, query: str, expected: str, latency: float) -> tuple[int, int, float]:
+    agent = get_agent()
+    with agent.override(model=stub_model(strategy, query, expected, latency)):
+        start = time.perf_counter()
+        result = await agent.run(query)
+        elapsed = time.perf_counter() - start
+
+    assert result.output.exact_answer.mkb_code == expected
+    responses = [m for m in result.all_messages() if isinstance(m, ModelResponse)]
+    tool_calls = sum(
+        1 for m in responses for p in m.parts if isinstance(p, ToolCallPart) and p.tool_name != "final_result"
+    )
+    return len(responses), tool_calls, elapsed
+
+
+async def main(latency: float):
+    index = get_search_index()
+    top1 = sum(index.search(q, 1)[0].entry.mkb_code == code for q, code in QUERIES)
+    topk = sum(any(h.entry.mkb_code == code for h in index.search(q, TOP_K)) for q, code in QUERIES)
+    print(f"search hit rate: top-1 {top1}/{len(QUERIES)}, top-{TOP_K} {topk}/{len(QUERIES)}")
+
+    for strategy in ("tree", "search"):
+        requests = calls = 0
+        elapsed = 0.0
+        for query, expected in QUERIES:
+            r, c, e = await run_query(strategy, query, expected, latency)
+            requests += r
+            calls += c
+            elapsed += e
+        n = len(QUERIES)
+        print(
+            f"{strategy:>6}: {requests / n:.1f} model requests, {calls / n:.1f} tool calls, "
+            f"{elapsed / n * 1000:.1f} ms per query (model latency {latency * 1000:.0f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-latency", type=float, default=0.0, help="simulated seconds per model request")
+    args = parser.parse_args()
+    asyncio.run(main(args.model_latency))
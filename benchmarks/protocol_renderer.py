@@ -0,0 +1,142 @@
+"""
+Protocol rendering throughput per format and its effect on the event loop.
+
+1. documents/sec of each renderer called directly (one thread);
+2. ProtocolRenderer.save with --concurrency documents in flight, per format;
+   meanwhile a ticker task measures event-loop lag (how late a 10 ms sleep
+   wakes up), compared with rendering inline in the event loop as the
+   pipeline did before (txt) / would have to for PDF without the pools.
+
+Documents are synthetic MedicalProtocols with every section filled.
+
+    uv run python -m benchmarks.protocol_renderer --docs 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from datetime import date
+
+# Настройки требуют ключей; рендеринг локальный, сеть не используется
+for _var in ("OPENAI_API_KEY", "LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+    os.environ.setdefault(_var, "benchmark")
+
+from src.schemas.protocol import (
+    AnamnesisMorbi, AnamnesisVitae, ChiefComplaint, DifferentialDiagnosis, MedicalProtocol, Metadata,
+    ObjectiveStatus, OtherFinding, Patient, PlanInvestigation, PlanTreatment, PreliminaryDiagnosis,
+    Prognosis, Recommendation, SignOff, StatusLocalisRegion,
+)
+from src.services.protocol_renderer import FORMATS, RENDERERS, ProtocolRenderer, render_document
+from src.utils.storage import LocalStorage, protocol_key
+
+HEADER = {"report_date": "2025-10-24", "doctor_name": "Dr. John Smith", "institution": "City Hospital"}
+
+
+def sample_protocol(i: int) -> MedicalProtocol:
+    return MedicalProtocol(
+        patient=Patient(full_name=f"Иванов Иван Иванович {i}", age=30 + i % 50, sex="M", date_of_exam=date(2025, 10, 24)),
+        metadata=Metadata(languages_detected=["ru"], consent_recording=True),
+        chief_complaints=[
+            ChiefComplaint(text=f"Боль в грудной клетке {k}", raw_text="болит грудь третий день", confidence=0.9) for k in range(4)
+        ],
+        anamnesis_morbi=AnamnesisMorbi(text="Боль появилась три дня назад после физической нагрузки. " * 4, confidence=0.9),
+        anamnesis_vitae=AnamnesisVitae(text="Гипертоническая болезнь 10 лет.\nОперации отрицает.", confidence=0.9),
+        objective_status=ObjectiveStatus(
+            summary="Общее состояние удовлетворительное.",
+            vitals={"temperature": {"value": 36.8, "unit": "°C"}, "pulse": 78, "bp": {"systolic": 135, "diastolic": 85}},
+            other_findings=[OtherFinding(text="Дыхание везикулярное, хрипов нет", confidence=0.9)],
+            confidence=0.9,
+        ),
+        status_localis=[
+            StatusLocalisRegion(region="Грудная клетка", findings=[OtherFinding(text="Болезненность при пальпации", confidence=0.8)])
+        ],
+        preliminary_diagnosis=[
+            PreliminaryDiagnosis(text="Стенокардия напряжения", icd10="I20.8", certainty="medium", rationale="Типичные жалобы", confidence=0.7)
+        ],
+        differential_diagnosis=[DifferentialDiagnosis(text=f"Вариант {k}", icd10=f"I2{k}.0", confidence=0.4) for k in range(3)],
+        plan_investigations=[PlanInvestigation(order=k, test=f"Исследование {k}", notes="натощак", confidence=0.9) for k in range(5, 0, -1)],
+        plan_treatment=[
+            PlanTreatment(order=k, treatment=f"Препарат {k}", dose="5 мг", route="oral", freq="1 раз в день", duration="30 дней", confidence=0.9)
+            for k in range(1, 5)
+        ],
+        recommendations=[Recommendation(order=k, text=f"Рекомендация {k}", confidence=0.9) for k in range(1, 6)],
+        prognosis=Prognosis(text="Благоприятный", category="favorable", confidence=0.8),
+        sign_off=SignOff(doctor_name="Петров П.П.", specialty="кардиолог", experience_years=12),
+    )
+
+
+class LoopLag:
+    """Worst and mean delay of a 10 ms sleep while rendering runs"""
+
+    def __init__(self):
+        self.lags: list[float] = []
+        self._task = None
+
+    async def _tick(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            self.lags.append(time.perf_counter() - started - 0.01)
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._tick())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+    def summary(self) -> str:
+        if not self.lags:
+            return "loop lag n/a"
+        return f"loop lag max {max(self.lags) * 1000:6.1f} ms, mean {sum(self.lags) / len(self.lags) * 1000:5.1f} ms"
+
+
+async def main(docs: int, concurrency: int):
+    protocols = [sample_protocol(i) for i in range(docs)]
+    out_dir = tempfile.mkdtemp(prefix="protocol_bench_")
+    try:
+        print(f"{docs} documents per run")
+        print("direct render (one thread, no file I/O):")
+        for fmt in FORMATS:
+            render = RENDERERS[fmt]
+            render(protocols[0], HEADER)  # шрифты и стили PDF — один раз
+            started = time.perf_counter()
+            size = sum(len(render(p, HEADER)) for p in protocols)
+            elapsed = time.perf_counter() - started
+            print(f"  {fmt:>4}: {docs / elapsed:8.1f} docs/s, {size / docs / 1024:6.1f} KiB/doc")
+
+        print(f"written to disk, {concurrency} documents in flight:")
+        storage = LocalStorage(out_dir)
+        renderer = ProtocolRenderer(storage=storage)
+        # прогрев пулов (в том числе запуск процесса для PDF)
+        await renderer.save(protocols[0], HEADER, client="warmup", formats=FORMATS)
+        for fmt in FORMATS:
+            for mode in ("inline", "pooled"):
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def one(i: int):
+                    async with semaphore:
+                        if mode == "inline":
+                            storage._put(protocol_key(f"inline{i}", fmt), render_document(protocols[i], fmt, HEADER))
+                            await asyncio.sleep(0)
+                        else:
+                            await renderer.save(protocols[i], HEADER, client=f"pooled{i}", formats=[fmt])
+
+                with LoopLag() as lag:
+                    started = time.perf_counter()
+                    await asyncio.gather(*(one(i) for i in range(docs)))
+                    elapsed = time.perf_counter() - started
+                print(f"  {fmt:>4} {mode:>6}: {docs / elapsed:8.1f} docs/s, {lag.summary()}")
+        renderer.close()
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.docs, args.concurrency))
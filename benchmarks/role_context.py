@@ -0,0 +1,84 @@
+"""
+Role agent request layout: legacy payload vs the prefix-stable context builder.
+
+A simulated consultation is classified segment by segment. For every call
+the request text (instructions + payload, as the provider sees it) is built
+and compared with the previous one. Reported: time to build the payload and
+the share of the request that is a byte-identical prefix of the previous
+request — what provider-side prompt caching can reuse. Legacy puts the new
+message first and re-dumps the last 10 messages, so only the instructions
+are shared.
+
+    uv run python -m benchmarks.role_context --turns 200
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+# Настройки требуют ключей; модель не вызывается
+for _var in ("OPENAI_API_KEY", "LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+    os.environ.setdefault(_var, "benchmark")
+
+from src.prompts.role_agent import prompt
+from src.schemas.agent_output import MessageToRoleAgent
+from src.services.role_context import RoleContextBuilder, context_payload
+
+TURNS = [
+    ("DOCTOR", "Здравствуйте, на что жалуетесь?"),
+    ("PATIENT", "Болит грудь третий день, особенно при нагрузке, иногда отдаёт в левую руку."),
+    ("DOCTOR", "Одышка, головокружение, потливость бывают?"),
+    ("PATIENT", "Одышка при подъёме по лестнице на второй этаж, головокружения нет."),
+]
+
+
+def legacy_payload(raw_message: str, context: list[MessageToRoleAgent]) -> str:
+    return (
+        "NEW_MESSAGE:\n" + raw_message + "\n\n" +
+        "CONTEXT_JSON:\n" + json.dumps([msg.model_dump() for msg in context], ensure_ascii=False)
+    )
+
+
+def shared_prefix(a: str, b: str) -> int:
+    return len(os.path.commonprefix([a, b]))
+
+
+def run(name: str, turns: int, build, append):
+    build_s, shared, previous = [], [], ""
+    for i in range(turns):
+        role, text = TURNS[i % len(TURNS)]
+        raw_message = f"{text} ({i})"
+        started = time.perf_counter()
+        payload = build(raw_message)
+        build_s.append(time.perf_counter() - started)
+        request = prompt + payload
+        if previous:
+            shared.append(shared_prefix(previous, request) / len(request))
+        previous = request
+        append(MessageToRoleAgent(role=role, content=raw_message))
+    print(
+        f"  {name:<16} build {statistics.mean(build_s) * 1e6:6.1f} us, "
+        f"shared prefix with previous request: mean {statistics.mean(shared):6.1%}, min {min(shared):6.1%}"
+    )
+
+
+def main(turns: int):
+    print(f"{turns} segments, instructions {len(prompt)} chars:")
+    history: list[MessageToRoleAgent] = []
+    run("legacy", turns, lambda raw: legacy_payload(raw, history[-10:]), history.append)
+
+    builder = RoleContextBuilder()
+    run(
+        "context builder", turns,
+        lambda raw: context_payload(builder.snapshot(), "NEW_MESSAGE", raw),
+        lambda message: builder.append([message]),
+    )
+    print(f"  builder stats: {builder.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+    main(args.turns)
@@ -0,0 +1,144 @@
+"""
+Session output storage under concurrent rooms: fixed paths vs per-room storage.
+
+1. message log: every room appends its STT segments; legacy opens and closes
+   output/messages.txt per line, storage keeps one buffered handle per room;
+2. transcript/protocol writes: every room rewrites its transcript JSON
+   while a reader polls it. Legacy writes one shared path in place, storage
+   writes <room>/transcript.json atomically. Reported: rooms whose own
+   transcript survived, and reads that saw a torn (unparseable) file.
+
+    uv run python -m benchmarks.session_storage --rooms 20 --lines 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# Настройки требуют ключей; бенчмарк работает только с локальными файлами
+for _var in ("OPENAI_API_KEY", "LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+    os.environ.setdefault(_var, "benchmark")
+
+from src.utils.storage import LocalStorage, room_key
+
+LINE = "Доктор: на что жалуетесь? Пациент: болит грудь третий день, особенно при нагрузке.\n"
+
+
+def legacy_append(path: str, line: str):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def legacy_put(path: str, text: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def transcript(room: int, version: int) -> str:
+    messages = [{"role": "DOCTOR", "content": f"room {room} message {k}"} for k in range(200 + version % 7)]
+    return json.dumps({"room": room, "messages": messages}, ensure_ascii=False, indent=2)
+
+
+async def bench_appends(root: str, rooms: int, lines: int):
+    legacy_path = os.path.join(root, "messages.txt")
+    started = time.perf_counter()
+    for _ in range(lines):
+        for _room in range(rooms):
+            legacy_append(legacy_path, LINE)
+    legacy_s = time.perf_counter() - started
+
+    storage = LocalStorage(os.path.join(root, "rooms"))
+    appenders = [storage.appender(room_key(f"room-{r}", "messages.txt")) for r in range(rooms)]
+    started = time.perf_counter()
+    for _ in range(lines):
+        for appender in appenders:
+            appender.write(LINE)
+    await storage.aclose()
+    storage_s = time.perf_counter() - started
+
+    total = rooms * lines
+    print(f"message log, {rooms} rooms x {lines} lines:")
+    print(f"  legacy open/append/close: {total / legacy_s:10.0f} lines/s")
+    print(f"  buffered per-room handle: {total / storage_s:10.0f} lines/s ({legacy_s / storage_s:.1f}x)")
+
+
+async def bench_writes(root: str, rooms: int, versions: int):
+    storage = LocalStorage(os.path.join(root, "rooms"))
+    legacy_path = os.path.join(root, "transcript.json")
+
+    async def reader(read) -> int:
+        torn = 0
+        while not done.is_set():
+            text = await asyncio.to_thread(read)
+            if text is not None:
+                try:
+                    json.loads(text)
+                except ValueError:
+                    torn += 1
+            await asyncio.sleep(0)
+        return torn
+
+    def legacy_read():
+        try:
+            with open(legacy_path, encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def storage_read():
+        data = storage._get(room_key("room-0", "transcript.json"))
+        return data.decode("utf-8") if data is not None else None
+
+    async def room_legacy(room: int):
+        for v in range(versions):
+            await asyncio.to_thread(legacy_put, legacy_path, transcript(room, v))
+
+    async def room_storage(room: int):
+        for v in range(versions):
+            await storage.put(room_key(f"room-{room}", "transcript.json"), transcript(room, v))
+
+    print(f"transcript writes, {rooms} rooms x {versions} versions, one reader polling room 0:")
+    for name, write_room, read in (
+        ("legacy shared path", room_legacy, legacy_read),
+        ("per-room atomic put", room_storage, storage_read),
+    ):
+        done = asyncio.Event()
+        reader_task = asyncio.create_task(reader(read))
+        started = time.perf_counter()
+        await asyncio.gather(*(write_room(r) for r in range(rooms)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        torn = await reader_task
+
+        if name.startswith("legacy"):
+            survived = 1 if legacy_read() else 0
+        else:
+            survived = 0
+            for r in range(rooms):
+                data = storage._get(room_key(f"room-{r}", "transcript.json"))
+                survived += data is not None and json.loads(data)["room"] == r
+        print(
+            f"  {name:>20}: {rooms * versions / elapsed:8.0f} writes/s, "
+            f"{survived}/{rooms} rooms kept their transcript, {torn} torn reads"
+        )
+
+
+async def main(rooms: int, lines: int, versions: int):
+    root = tempfile.mkdtemp(prefix="session_storage_bench_")
+    try:
+        await bench_appends(root, rooms, lines)
+        await bench_writes(root, rooms, versions)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=500)
+    parser.add_argument("--versions", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rooms, args.lines, args.versions))
@@ -0,0 +1,129 @@
+"""
+Load generator for the transcription worker: fake rooms, no LiveKit, no OpenAI.
+
+Each fake room has --tracks speakers producing final STT segments (mean
+--segment-interval seconds apart) into the real RoomClassificationQueue;
+classification is a stub that holds one of --llm-concurrency slots for
+--llm-latency seconds, standing in for the model's rate/latency limit.
+The number of rooms is ramped up and for each step the harness reports
+offered vs classified segment rate, segment latency, peak queue depth and
+the WorkerLoadModel value, marking where throughput saturates and where
+the worker would stop accepting jobs.
+
+    uv run python -m benchmarks.worker_load --rooms 1 2 4 8 16 32 --duration 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+# Настройки требуют ключей, но модель здесь заглушка — сеть не используется
+for _var in ("OPENAI_API_KEY", "LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+    os.environ.setdefault(_var, "benchmark")
+
+from src.schemas.agent_output import MessageToRoleAgent
+from src.services.classification_queue import RoomClassificationQueue, Segment
+from src.services.role_context import EMPTY_CONTEXT, RoleContext
+from src.services.worker_load import RoomLoad, WorkerLoadModel
+
+
+class FakeRoom:
+    def __init__(self, name: str, tracks: int, llm: asyncio.Semaphore, llm_latency: float):
+        self.name = name
+        self.tracks = tracks
+        self.llm = llm
+        self.llm_latency = llm_latency
+        self.latencies: list[float] = []
+        self.queue = RoomClassificationQueue(classify=self._classify, on_result=self._on_result, context=lambda: EMPTY_CONTEXT)
+
+    async def _classify(self, text: str, context: RoleContext, identity: str) -> list[MessageToRoleAgent]:
+        async with self.llm:
+            await asyncio.sleep(self.llm_latency)
+        return [MessageToRoleAgent(role="DOCTOR", content=text)]
+
+    def _on_result(self, segment: Segment, messages: list[MessageToRoleAgent]):
+        # текст сегмента — время его отправки
+        self.latencies.append(time.monotonic() - float(segment.text))
+
+    async def _speaker(self, track: int, interval: float, until: float):
+        while time.monotonic() < until:
+            await asyncio.sleep(random.expovariate(1 / interval))
+            await self.queue.submit(str(time.monotonic()), identity=f"{self.name}-{track}")
+
+    async def run(self, interval: float, duration: float):
+        self.queue.start()
+        until = time.monotonic() + duration
+        await asyncio.gather(*(self._speaker(t, interval, until) for t in range(self.tracks)))
+
+    def report(self) -> RoomLoad:
+        return RoomLoad(room=self.name, tracks=self.tracks, queue_depth=self.queue.depth)
+
+
+async def run_step(rooms: int, args, model: WorkerLoadModel) -> dict:
+    llm = asyncio.Semaphore(args.llm_concurrency)
+    fake_rooms = [FakeRoom(f"room{i}", args.tracks, llm, args.llm_latency) for i in range(rooms)]
+    peak = {"load": 0.0, "queue_depth": 0, "cpu": 0.0}
+
+    async def sample():
+        while True:
+            snapshot = model.snapshot(active_rooms=rooms, reports=[r.report() for r in fake_rooms])
+            for key in peak:
+                peak[key] = max(peak[key], snapshot[key])
+            await asyncio.sleep(0.25)
+
+    sampler = asyncio.create_task(sample())
+    start = time.monotonic()
+    await asyncio.gather(*(r.run(args.segment_interval, args.duration) for r in fake_rooms))
+    offered_s = time.monotonic() - start
+    # дожидаемся уже поданных сегментов: пропускная способность — за всё время обработки
+    await asyncio.gather(*(r.queue.drain(timeout=120.0) for r in fake_rooms))
+    elapsed = time.monotonic() - start
+    sampler.cancel()
+    for room in fake_rooms:
+        await room.queue.aclose()
+
+    submitted = sum(r.queue.submitted for r in fake_rooms)
+    latencies = sorted(l for r in fake_rooms for l in r.latencies)
+    return {
+        "offered": submitted / offered_s,
+        "throughput": len(latencies) / elapsed,
+        "latency": statistics.mean(latencies) if latencies else 0.0,
+        "p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        **peak,
+    }
+
+
+async def main(args):
+    model = WorkerLoadModel(report_dir=None)
+    print(
+        f"{args.tracks} tracks/room, segment every {args.segment_interval}s per track, "
+        f"LLM {args.llm_concurrency} concurrent x {args.llm_latency}s, load threshold {model.threshold}"
+    )
+    print(f"{'rooms':>5} {'offered/s':>9} {'done/s':>7} {'avg s':>6} {'p95 s':>6} {'depth':>5} {'cpu':>5} {'load':>5}")
+    saturated = refused = None
+    for rooms in args.rooms:
+        r = await run_step(rooms, args, model)
+        marks = []
+        if saturated is None and r["throughput"] < 0.9 * r["offered"]:
+            saturated = rooms
+            marks.append("<- throughput saturates")
+        if refused is None and r["load"] >= model.threshold:
+            refused = rooms
+            marks.append("<- worker stops accepting jobs")
+        print(
+            f"{rooms:>5} {r['offered']:>9.1f} {r['throughput']:>7.1f} {r['latency']:>6.2f} {r['p95']:>6.2f} "
+            f"{r['queue_depth']:>5} {r['cpu']:>5.2f} {r['load']:>5.2f} {' '.join(marks)}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--tracks", type=int, default=2)
+    parser.add_argument("--segment-interval", type=float, default=3.0, help="mean seconds between final segments per track")
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="seconds per classification")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per step")
+    asyncio.run(main(parser.parse_args()))
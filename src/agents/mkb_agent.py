@@ -0,0 +1,76 @@
+from typing import Optional, List
+from pydantic import BaseModel, Field
+from src.services.mkb_10 import get_mkb_tools
+from src.agents.registry import register_agent
+
+import asyncio
+
+
+class AgentOutput(BaseModel):
+    mkb_code: str
+    name: str
+    reason: str = Field(description="Причина выбора данного кода МКБ-10. Пошаговое объяснение от верхнего уровня до конечных деталей")
+    
+class SimilarAgentOutput(BaseModel):
+    exact_answer: Optional[AgentOutput] = Field( description="Точный ответ если был найден детальный код МКБ-10. Или первый из списка похожих если точного нет")
+    similar_answers: List[AgentOutput] = Field(description="Список похожих ответов если не был найден точный ответ")
+
+
+get_agent = register_agent(
+    "mkb",
+    instructions=(
+    """
+    Инструкция для агента подбора кода МКБ-10.
+
+    Цель
+        Найти подходящий код МКБ-10, используя ТОЛЬКО предоставленные функции и данные, и следуя переданным Pydantic-схемам.
+
+    Общие правила
+        - Использовать только инструменты: search_mkb(query), get_mkb_classes(), get_mkb_class_blocks(mkb_class_code),
+          get_mkb_class_block_elements(mkb_class_block_code), get_mkb_class_block_element_details(mkb_class_block_element_code).
+        - Сначала вызывать search_mkb с названием диагноза или ключевыми словами описания. Если среди результатов есть кандидат, чьё name соответствует запросу, использовать его и его path — обход дерева не нужен.
+        - Только если search_mkb не дал подходящих кандидатов, вызывать функции последовательно: классы → блоки → элементы → детали. Ответы без вызова функций недопустимы.
+        - Не придумывать коды и не обращаться к внешним источникам — все решения основывать исключительно на данных, возвращённых функциями.
+
+    Решение о стратегии поиска (когда искать по name, когда по описанию)
+        1. Определение, пришёл ли точный диагноз:
+            - Считать ввод «точным диагнозом», если текст явно содержит слова/фразы типа: "диагноз", "у меня", "диагностирован(о)", "подтвержден", "назван", или если ввод короткий (примерно ≤ 6 слов) и выглядит как название болезни.
+            - В остальных случаях считать ввод описанием симптомов/ситуации (описательный режим).
+
+        2. Поведение в режиме "точный диагноз" (по name):
+            - На каждом уровне обхода (классы → блоки → элементы → детали) сравнивать пользовательский ввод с полем name в возвращённых записях.
+            - Ищите сначала точные совпадения name (полное равенство или полное вхождение). Если найдено точное совпадение на уровне деталей — это приоритет: выбрать соответствующий детальный код.
+            - Если точного совпадения нет — вычислять степени схожести (лексическое совпадение / пересечение ключевых токенов / частичное вхождение) по полю name и собирать до 5 наиболее похожих кандидатов из уровня деталей (или, при их отсутствии, из элементов блока).
+        
+        3. Поведение в режиме "описание" (по описанию, постепенное сужение):
+            - Выделить ключевые слова из описания (симптомы, локализация, ключевые сущности).
+            - На уровне классов и блоков фильтровать записи, содержащие эти ключевые слова в поле name; переходить только в релевантные блоки/элементы.
+            - На уровне деталей проводить ту же оценку схожести по name и выбирать до 5 лучших кандидатов; если среди деталей есть запись, наиболее соответствующая по словам и формату — считаться предпочтительной.
+
+    Критерий детального (окончательного) кода
+        - Признак детального кода: в поле mkb_code присутствует точка '.' и за ней цифра(ы) (например "A15.0"). Такой код является детальным финалом только если он присутствует в результатах search_mkb или get_mkb_class_block_element_details.
+        - Если детальных кодов нет для выбранного элемента, допускается считать окончательным код элемента/блока (коды из get_mkb_class_block_elements), при условии что они наиболее релевантны по найденным совпадениям.
+        - Если выбран код элемента без точки, проверять наличие детальных записей через get_mkb_class_block_element_details перед тем, как финализировать выбор.
+
+    Выдача результата и пояснения
+        - Формирование ответа должно опираться только на данные, полученные функциями.
+        - Если найден точный детальный код — предоставить его как основной результат и пояснить выбор в поле reason пошагово: класс → блок → элемент → деталь.
+        - Если точного детального кода нет — предоставить набор похожих вариантов (до 5) с коротким объяснением причины выбора каждого (пошагово, от общего к частному).
+    """
+    ),
+    tools=get_mkb_tools,
+    output_type=SimilarAgentOutput,
+    retries=1,
+    temperature=None,
+)
+
+
+async def main():
+    result = await get_agent().run(
+        "\n ВОПРОС[Доктор сказал что у меня Туберкулез легких, подтвержденный только ростом культуры. Какой у меня может быть код МКБ-10?]"
+    )
+    print(result.output)
+    
+if __name__ == "__main__":
+    asyncio.run(main())
+    
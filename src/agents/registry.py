@@ -0,0 +1,128 @@
+"""
+Process-wide registry of the pydantic-ai agents.
+
+Agent modules register a spec (instructions, output type, tools) at import
+and get back a getter; the Agent itself is built on first use and cached, so
+importing an agent module costs nothing and a process only pays for the
+agents it actually runs. pydantic-ai generates the output JSON schema and
+tool definitions when an Agent is built, so each schema (the large
+MedicalProtocol one included) is generated once per process.
+
+All agents share one OpenAIProvider over one pooled httpx client (keep-alive
+connections, `openai_max_connections`), instead of a provider and client per
+module. Build times are reported by `stats()`.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Optional, Sequence
+
+import httpx
+from pydantic_ai import Agent, ModelSettings, Tool
+
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AgentSpec:
+    instructions: str
+    output_type: Any
+    # фабрика, а не список: инструменты тоже создаются только при первом использовании
+    tools: Callable[[], Sequence[Tool]] = tuple
+    model_name: str = settings.openai_model
+    retries: int = 3
+    temperature: Optional[float] = 0.2
+
+
+_specs: dict[str, AgentSpec] = {}
+# время создания провайдера, моделей и агентов, мс
+_build_ms: dict[str, float] = {}
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.openai_timeout_s, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=settings.openai_max_connections,
+            max_keepalive_connections=settings.openai_max_connections,
+        ),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_provider():
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    started = time.perf_counter()
+    provider = OpenAIProvider(api_key=settings.openai_api_key, http_client=get_http_client())
+    _build_ms["provider"] = (time.perf_counter() - started) * 1000
+    return provider
+
+
+@lru_cache(maxsize=None)
+def get_model(model_name: str = settings.openai_model):
+    from pydantic_ai.models.openai import OpenAIChatModel
+
+    provider = get_provider()
+    started = time.perf_counter()
+    model = OpenAIChatModel(model_name, provider=provider)
+    _build_ms[f"model:{model_name}"] = (time.perf_counter() - started) * 1000
+    return model
+
+
+def register_agent(
+    name: str,
+    instructions: str,
+    output_type: Any,
+    tools: Callable[[], Sequence[Tool]] = tuple,
+    **spec,
+) -> Callable[[], Agent]:
+    """Register an agent spec; returns a getter that builds the agent on first call"""
+    if name in _specs:
+        raise ValueError(f"Agent {name} is already registered")
+    _specs[name] = AgentSpec(instructions=instructions, output_type=output_type, tools=tools, **spec)
+    return lambda: get_agent(name)
+
+
+@lru_cache(maxsize=None)
+def get_agent(name: str) -> Agent:
+    spec = _specs[name]
+    model = get_model(spec.model_name)
+    started = time.perf_counter()
+    agent = Agent(
+        model=model,
+        instructions=spec.instructions,
+        retries=spec.retries,
+        tools=list(spec.tools()),
+        output_type=spec.output_type,
+        model_settings=ModelSettings(temperature=spec.temperature) if spec.temperature is not None else None,
+    )
+    _build_ms[name] = (time.perf_counter() - started) * 1000
+    logger.info(f"Agent {name} built in {_build_ms[name]:.1f} ms")
+    return agent
+
+
+def build_all_agents():
+    """Build every registered agent up front (when first-request latency matters more than startup)"""
+    for name in _specs:
+        get_agent(name)
+
+
+async def aclose_agents():
+    if get_http_client.cache_info().currsize:
+        await get_http_client().aclose()
+        get_http_client.cache_clear()
+        get_provider.cache_clear()
+        get_model.cache_clear()
+        get_agent.cache_clear()
+
+
+def stats() -> dict:
+    return {
+        "registered": sorted(_specs),
+        "built_ms": {name: round(ms, 1) for name, ms in _build_ms.items()},
+    }
@@ -1,33 +1,267 @@
-from src.schemas.agent_output import MessageToRoleAgent
-from src.prompts.role_agent import prompt
+from src.schemas.agent_output import MessageToRoleAgent, RoleBatchItem
+from src.prompts.role_agent import prompt, batch_prompt
 from src.core.settings import settings
+from src.services.role_classifier import IdentityRoleClassifier, get_lexical_model
+from src.services.role_context import RoleContext, context_payload
+from src.utils.storage import Appender
+from src.agents.registry import register_agent
 
-from pydantic_ai import Agent, ModelSettings
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.openai import OpenAIProvider
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+import asyncio
 import json
+import logging
+import time
 
-model = OpenAIChatModel('gpt-4o-mini', provider=OpenAIProvider(api_key=settings.openai_api_key))
-
-agent = Agent(
-    model=model,
-    instructions=prompt,
-    retries=3,
-    output_type=list[MessageToRoleAgent],
-    model_settings=ModelSettings(temperature=0.2)
-)
-
-async def process_transcript(raw_message: str, role_messages: list[MessageToRoleAgent]):
-    print(raw_message)
-    with open("output/messages.txt", "a", encoding="utf-8") as f:
-        f.write(raw_message + "\n")
-    
-    print(f"ADDITIONAL CONTEXT TO LLM: {role_messages}")
-    
-    payload = (
-        "NEW_MESSAGE:\n" + raw_message + "\n\n" +
-        "CONTEXT_JSON:\n" + json.dumps([msg.model_dump() for msg in role_messages], ensure_ascii=False)
+from livekit.agents import metrics
+
+logger = logging.getLogger(__name__)
+
+get_agent = register_agent("role", instructions=prompt, output_type=list[MessageToRoleAgent])
+get_batch_agent = register_agent("role_batch", instructions=batch_prompt, output_type=list[RoleBatchItem])
+
+# получатель метрик LLM-вызовов (UsageCollector задачи)
+MetricsFn = Callable[[metrics.LLMMetrics], None]
+
+
+def _llm_metrics(label: str, result, duration: float) -> metrics.LLMMetrics:
+    """pydantic-ai run usage as LiveKit LLM metrics (cached prompt tokens included)"""
+    usage = result.usage()
+    return metrics.LLMMetrics(
+        label=label,
+        request_id=getattr(result, "run_id", None) or "",
+        timestamp=time.time(),
+        duration=duration,
+        ttft=duration,
+        cancelled=False,
+        completion_tokens=usage.output_tokens,
+        prompt_tokens=usage.input_tokens,
+        prompt_cached_tokens=usage.cache_read_tokens,
+        total_tokens=usage.input_tokens + usage.output_tokens,
+        tokens_per_second=usage.output_tokens / duration if duration > 0 else 0.0,
     )
-    
+
+
+async def _run(agent, label: str, payload: str, on_metrics: Optional[MetricsFn]):
+    started = time.perf_counter()
     result = await agent.run(payload)
-    return result.output
\ No newline at end of file
+    if on_metrics is not None:
+        on_metrics(_llm_metrics(label, result, time.perf_counter() - started))
+    return result.output
+
+
+async def process_transcript(
+    raw_message: str, context: RoleContext, on_metrics: Optional[MetricsFn] = None
+) -> list[MessageToRoleAgent]:
+    print(f"ADDITIONAL CONTEXT TO LLM: {context.turns} turns")
+
+    payload = context_payload(context, "NEW_MESSAGE", raw_message)
+    return await _run(get_agent(), "role", payload, on_metrics)
+
+async def process_transcript_batch(
+    raw_messages: list[str], context: RoleContext, on_metrics: Optional[MetricsFn] = None
+) -> list[Optional[list[MessageToRoleAgent]]]:
+    """
+    Classify several final STT segments in one model call.
+    Returns results in input order; None for segments the model skipped.
+    """
+    new_messages = json.dumps([{"id": i, "text": t} for i, t in enumerate(raw_messages)], ensure_ascii=False)
+    payload = context_payload(context, "NEW_MESSAGES", new_messages)
+
+    output = await _run(get_batch_agent(), "role_batch", payload, on_metrics)
+    by_id = {item.id: item.messages for item in output}
+    return [by_id.get(i) for i in range(len(raw_messages))]
+
+
+@dataclass
+class _PendingSegment:
+    raw_message: str
+    context: RoleContext
+    future: asyncio.Future
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class RoleClassificationBatcher:
+    """
+    Micro-batching in front of the role agent.
+
+    Final STT segments are collected for up to `max_delay_s` seconds or until
+    `max_size` segments are pending, then classified in one model call; each
+    caller gets the messages for its own segment. Context of the oldest
+    segment in the batch is sent to the model. Token usage of every call
+    (cached prompt tokens included) goes to `on_metrics`.
+    """
+
+    def __init__(
+        self,
+        max_delay_s: float = settings.role_batch_max_delay_s,
+        max_size: int = settings.role_batch_max_size,
+        on_metrics: Optional[MetricsFn] = None,
+    ):
+        self.max_delay_s = max_delay_s
+        self.max_size = max(1, max_size)
+        self.on_metrics = on_metrics
+        self._pending: list[_PendingSegment] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+        # метрики
+        self.segments = 0
+        self.batches = 0
+        self.llm_calls = 0
+        self._flushed = 0
+        self._completed = 0
+        self._wait_s_total = 0.0
+        self._latency_s_total = 0.0
+
+    async def classify(self, raw_message: str, context: RoleContext) -> list[MessageToRoleAgent]:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_PendingSegment(raw_message, context, future))
+        self.segments += 1
+
+        if len(self._pending) >= self.max_size or self.max_delay_s <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay_s, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._run(batch), name="role_batch")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[_PendingSegment]):
+        started = time.monotonic()
+        self.batches += 1
+        self._flushed += len(batch)
+        for segment in batch:
+            self._wait_s_total += started - segment.submitted_at
+
+        try:
+            if len(batch) == 1:
+                results = [await process_transcript(batch[0].raw_message, batch[0].context, self.on_metrics)]
+                self.llm_calls += 1
+            else:
+                results = await process_transcript_batch(
+                    [s.raw_message for s in batch], batch[0].context, self.on_metrics
+                )
+                self.llm_calls += 1
+                # сегменты, пропущенные моделью, классифицируются по одному
+                for i, messages in enumerate(results):
+                    if messages is None:
+                        logger.warning("Role batch skipped segment %d, classifying it alone", i)
+                        results[i] = await process_transcript(batch[i].raw_message, batch[i].context, self.on_metrics)
+                        self.llm_calls += 1
+        except Exception as e:
+            for segment in batch:
+                if not segment.future.done():
+                    segment.future.set_exception(e)
+            return
+
+        finished = time.monotonic()
+        for segment, messages in zip(batch, results):
+            self._latency_s_total += finished - segment.submitted_at
+            self._completed += 1
+            if not segment.future.done():
+                segment.future.set_result(messages)
+
+    def stats(self) -> dict:
+        return {
+            "segments": self.segments,
+            "batches": self.batches,
+            "llm_calls": self.llm_calls,
+            "calls_saved": self._flushed - self.llm_calls,
+            "avg_batch_size": round(self._flushed / self.batches, 2) if self.batches else 0.0,
+            "avg_wait_ms": round(self._wait_s_total / self._flushed * 1000, 1) if self._flushed else 0.0,
+            "avg_latency_ms": round(self._latency_s_total / self._completed * 1000, 1) if self._completed else 0.0,
+        }
+
+
+class RoleClassifierChain:
+    """
+    Cheap local classifiers first, the (batched) role agent only as fallback.
+
+    Tiers are tried in order: participant identity, then the offline-trained
+    lexical model; the first answer with confidence >= `min_confidence` is
+    used as a single message with the whole segment. Per-tier hit rates and
+    per-utterance latency are reported by `stats()`. Every utterance is
+    written to `message_log` (the room's messages.txt), whichever tier answers.
+    """
+
+    def __init__(
+        self,
+        fallback: RoleClassificationBatcher,
+        identity: Optional[IdentityRoleClassifier] = None,
+        lexical=None,
+        min_confidence: float = settings.role_local_min_confidence,
+        message_log: Optional[Appender] = None,
+    ):
+        self.fallback = fallback
+        self.message_log = message_log
+        self.min_confidence = min_confidence
+        self.tiers = [(name, tier) for name, tier in (("identity", identity), ("lexical", lexical)) if tier]
+
+        self._hits = {name: 0 for name, _ in self.tiers}
+        self._hits["llm"] = 0
+        self._latency_s = dict.fromkeys(self._hits, 0.0)
+
+    async def classify(
+        self, raw_message: str, context: RoleContext, identity: Optional[str] = None
+    ) -> list[MessageToRoleAgent]:
+        started = time.perf_counter()
+        self._log(raw_message)
+        for name, tier in self.tiers:
+            guess = tier.classify(raw_message, identity)
+            if guess is not None and guess.confidence >= self.min_confidence:
+                self._record(name, started)
+                content = raw_message.strip()
+                return [MessageToRoleAgent(role=guess.role, content=content)] if content else []
+
+        messages = await self.fallback.classify(raw_message, context)
+        self._record("llm", started)
+        return messages
+
+    def _log(self, raw_message: str):
+        print(raw_message)
+        if self.message_log is not None:
+            self.message_log.write(raw_message + "\n")
+
+    def _record(self, tier: str, started: float):
+        self._hits[tier] += 1
+        self._latency_s[tier] += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        total = sum(self._hits.values())
+        return {
+            "utterances": total,
+            **{
+                tier: {
+                    "hits": hits,
+                    "hit_rate": round(hits / total, 3) if total else 0.0,
+                    "avg_latency_ms": round(self._latency_s[tier] / hits * 1000, 2) if hits else 0.0,
+                }
+                for tier, hits in self._hits.items()
+            },
+        }
+
+
+def create_role_classifier(
+    fallback: Optional[RoleClassificationBatcher] = None,
+    message_log: Optional[Appender] = None,
+) -> RoleClassifierChain:
+    """Classifier chain configured from settings (tiers without config/model are skipped)"""
+    lexical = get_lexical_model()
+    if lexical is None:
+        logger.info("Lexical role model not found at %s, local tier disabled", settings.role_lexical_model_path)
+    return RoleClassifierChain(
+        fallback=fallback or RoleClassificationBatcher(),
+        identity=IdentityRoleClassifier(settings.role_identity_map),
+        lexical=lexical,
+        message_log=message_log,
+    )
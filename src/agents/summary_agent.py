@@ -1,46 +1,93 @@
 from src.schemas.agent_output import MessageToRoleAgent 
 from src.schemas.protocol import MedicalProtocol
 from src.prompts.summary_agent import prompt
-from src.services.mkb_10 import (
-    get_mkb_classes,
-    get_mkb_class_blocks,
-    get_mkb_class_block_elements,
-    get_mkb_class_block_element_details,
-)
-from src.core.settings import settings
-
-from output.mock_conversation import mock_conversation
-
-from pydantic_ai import Agent, ModelSettings, Tool
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.openai import OpenAIProvider
-import json
+from src.services.mkb_10 import get_mkb_tools
+from src.utils.file_saver import PROTOCOL_SECTIONS
+from src.agents.registry import register_agent
+
+from typing import Awaitable, Callable, Optional
 import asyncio
 
-model = OpenAIChatModel('gpt-4o-mini', provider=OpenAIProvider(api_key=settings.openai_api_key))
-
-agent = Agent(
-    model=model,
-    instructions=prompt,
-    retries=3,
-    tools=[
-        Tool(get_mkb_classes, takes_ctx=False), 
-        Tool(get_mkb_class_blocks, takes_ctx=False), 
-        Tool(get_mkb_class_block_elements, takes_ctx=False), 
-        Tool(get_mkb_class_block_element_details, takes_ctx=False)
-    ],
-    output_type=MedicalProtocol,
-    model_settings=ModelSettings(temperature=0.2)
-)
+get_agent = register_agent("summary", instructions=prompt, output_type=MedicalProtocol, tools=get_mkb_tools)
 
-async def generate_summary_of_transcript_with_roles(transcript: list[MessageToRoleAgent]):
+# Разделы протокола в порядке генерации (порядок полей схемы)
+PROTOCOL_FIELDS = list(MedicalProtocol.model_fields)
+# Разделы, которые попадают в документ и отправляются клиентам (без metadata, audit_log)
+RENDERED_FIELDS = [name for name in PROTOCOL_FIELDS if name in PROTOCOL_SECTIONS]
+
+def _build_prompt(transcript: list[MessageToRoleAgent], previous: Optional[MedicalProtocol] = None) -> str:
     joined = "\n".join([f"{msg.role}: {msg.content}" for msg in transcript])
-    result = await agent.run(f"\nВот транскрибированный диалог врача и пациента:\n{joined}")
-    with open("output/summary.txt", "w", encoding="utf-8") as f:
-        f.write(json.dumps(result.output.model_dump(mode='json'), ensure_ascii=False, indent=2))
+    if previous is None:
+        return f"\nВот транскрибированный диалог врача и пациента:\n{joined}"
+    # Инкрементальный режим: черновик по началу диалога + только новые реплики
+    return (
+        "\nВот черновик протокола (JSON), составленный по началу диалога врача и пациента:\n"
+        f"{previous.model_dump_json()}\n\n"
+        f"Вот продолжение транскрибированного диалога:\n{joined}\n\n"
+        "Верни полный обновлённый протокол: дополни и исправь разделы с учётом новых реплик, "
+        "сохрани данные черновика, если новые реплики им не противоречат."
+    )
+
+def completed_sections(partial: MedicalProtocol) -> list[str]:
+    """
+    Sections of a partial protocol that are already final.
+    The model emits fields in schema order, so a field is complete
+    once any later field has started.
+    """
+    present = [i for i, name in enumerate(PROTOCOL_FIELDS) if name in partial.model_fields_set]
+    if not present:
+        return []
+    return PROTOCOL_FIELDS[:max(present)]
+
+async def generate_summary_of_transcript_with_roles(transcript: list[MessageToRoleAgent]):
+    result = await get_agent().run(_build_prompt(transcript))
+    return result.output
+
+async def update_summary_of_transcript_with_roles(
+    previous: Optional[MedicalProtocol],
+    transcript_delta: list[MessageToRoleAgent],
+) -> MedicalProtocol:
+    """Merge new messages into a draft protocol (or start one when previous is None)"""
+    result = await get_agent().run(_build_prompt(transcript_delta, previous))
     return result.output
 
+async def stream_summary_of_transcript_with_roles(
+    transcript: list[MessageToRoleAgent],
+    on_section: Callable[[str, MedicalProtocol], Awaitable[None]],
+    previous: Optional[MedicalProtocol] = None,
+) -> MedicalProtocol:
+    """
+    Same as generate_summary_of_transcript_with_roles, but streams the structured
+    output and calls on_section(section, partial_protocol) for every section as soon
+    as it is complete, in schema order; only sections rendered in the protocol
+    document are emitted. Returns the final validated protocol.
+
+    With `previous`, `transcript` is only the part of the dialog not yet covered by
+    that draft; if it is empty the draft is emitted as is without a model call.
+    """
+    emitted: set[str] = set()
+
+    async def _emit(protocol: MedicalProtocol, sections: list[str]):
+        for section in sections:
+            if section in PROTOCOL_SECTIONS and section not in emitted:
+                emitted.add(section)
+                await on_section(section, protocol)
+
+    if previous is not None and not transcript:
+        protocol = previous
+    else:
+        async with get_agent().run_stream(_build_prompt(transcript, previous)) as result:
+            async for partial in result.stream_output(debounce_by=0.2):
+                await _emit(partial, completed_sections(partial))
+            protocol = await result.get_output()
+
+    await _emit(protocol, RENDERED_FIELDS)
+    return protocol
+
 async def main():
+    # локальный пример диалога (output/mock_conversation.py не хранится в репозитории)
+    from output.mock_conversation import mock_conversation
+
     result = await generate_summary_of_transcript_with_roles(mock_conversation)
     print(result)
     
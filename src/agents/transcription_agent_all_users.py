@@ -1,17 +1,28 @@
-from concurrent.futures import process
 import logging
 import sys
 import os
 import asyncio
 from datetime import datetime
+from typing import Optional
 import json
 
 # Add the project root to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from src.services.one_user_pipeline import generate_summary
+# Модули задачи на pydantic-ai (агенты, протокол, инструменты МКБ) импортируются
+# в prewarm/entrypoint: основному процессу воркера они не нужны
 from src.schemas.agent_output import MessageToRoleAgent
-from src.agents.role_agent import process_transcript
+from src.services.classification_queue import RoomClassificationQueue, Segment
+from src.services.role_context import RoleContextBuilder
+from src.services.transcript_log import TranscriptLog
+from src.services.mkb_search import get_search_index
+from src.services.role_classifier import get_lexical_model
+from src.services.audio_pipeline import FrameCounters, TrackTranscriber, get_stt_plugin
+from src.services.track_registry import TrackRegistry
+from src.services.worker_load import LoadReporter, RoomLoad, WorkerLoadModel
+from src.core.settings import settings
+from src.core.startup import startup_phase
+from src.utils.storage import get_storage, room_key
 
 from dotenv import load_dotenv
 from livekit.agents import (
@@ -26,8 +37,8 @@ from livekit.agents import (
     metrics,
     UserInputTranscribedEvent
 )
-from livekit.plugins import noise_cancellation, silero, openai
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+# плагины LiveKit регистрируются при импорте в главном потоке (и для download-files)
+from livekit.plugins import noise_cancellation, silero
 from livekit import rtc
 
 logger = logging.getLogger("agent")
@@ -44,17 +55,74 @@ class Assistant(Agent):
             You are curious, friendly, and have a sense of humor.""",
         )
 
+# агенты, которые вызывает задача: LLM-уровень классификатора ролей и протокол
+JOB_AGENTS = ("role", "role_batch", "summary")
+
+
 def prewarm(proc: JobProcess):
-    proc.userdata["vad"] = silero.VAD.load()
+    """
+    Runs in every job process before it is given a job and loads exactly what
+    entrypoint() uses, so the first consultation pays no import, model load
+    or index build. Agents that jobs never call (MKB lookup, role validator)
+    stay unbuilt; set STARTUP_PROFILE=1 to log the time of each step.
+    """
+    with startup_phase("prewarm.job_modules"):
+        from src.agents.registry import get_agent
+        from src.services.mkb_10 import warm_mkb_cache
+        import src.services.one_user_pipeline  # noqa: F401
+        import src.services.rolling_summary  # noqa: F401
+
+    # VAD нужен только для гейтинга STT, сегментного режима и голосовой сессии
+    if settings.stt_vad_gating or settings.stt_segment_mode or not settings.transcription_only:
+        with startup_phase("prewarm.vad"):
+            proc.userdata["vad"] = silero.VAD.load()
+    with startup_phase("prewarm.role_model"):
+        get_lexical_model()
+    with startup_phase("prewarm.agents"):
+        for name in JOB_AGENTS:
+            get_agent(name)
+    with startup_phase("prewarm.mkb"):
+        # ответы инструментов агента протокола и индекс поиска/проверки кодов
+        warm_mkb_cache()
+        get_search_index()
 
 
 async def entrypoint(ctx: JobContext):
+    from src.agents.registry import aclose_agents, stats as agent_registry_stats
+    from src.agents.role_agent import RoleClassificationBatcher, create_role_classifier
+    from src.services.mkb_10 import get_mkb_cache_stats
+    from src.services.one_user_pipeline import generate_summary
+    from src.services.rolling_summary import RollingSummarizer
+
     ctx.log_context_fields = {"room": ctx.room.name}
 
-    session = AgentSession(
-    )
+    # в режиме только транскрипции голосовой ассистент не запускается:
+    # его аудиовход дублировал шумоподавление и ничего не использовал
+    session = None if settings.transcription_only else AgentSession()
+    stt_plugin = get_stt_plugin()
+    stt_frames = FrameCounters()
+
+    # журнал транскрипта на диске: переживает падение воркера, в памяти только хвост
+    transcript = TranscriptLog(ctx.job.room.name)
+    rolling_summary = RollingSummarizer()
+    # контекст агента ролей: реплики сериализуются один раз, префикс запроса стабилен
+    role_context = RoleContextBuilder()
+    if len(transcript):
+        print(f"Resuming session {ctx.job.room.name}: {len(transcript)} messages replayed")
+        rolling_summary.on_messages(transcript)
+        role_context.append(transcript.tail(role_context.max_turns))
+    # файлы сессии — под префиксом комнаты: параллельные комнаты не перезаписывают друг друга
+    storage = get_storage()
+    usage_collector = metrics.UsageCollector()
+
+    def _on_llm_metrics(llm_metrics: metrics.LLMMetrics):
+        metrics.log_metrics(llm_metrics)
+        usage_collector.collect(llm_metrics)
 
-    sessions: dict[str, list[MessageToRoleAgent]] = {}
+    role_batcher = RoleClassificationBatcher(on_metrics=_on_llm_metrics)
+    role_classifier = create_role_classifier(
+        role_batcher, message_log=storage.appender(room_key(ctx.job.room.name, "messages.txt"))
+    )
 
     async def send_text_to_chat(message: str):
         await ctx.room.local_participant.send_text(message, topic="lk.chat")
@@ -74,228 +142,272 @@ async def entrypoint(ctx: JobContext):
         
         await ctx.room.local_participant.publish_data(json.dumps(payload).encode("utf-8"), topic=channel)
 
-    usage_collector = metrics.UsageCollector()
+    def _on_publish_done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Failed to publish to room {ctx.room.name}: {task.exception()}")
+
+    def publish_in_background(coro_fn, *args):
+        # после отключения комнаты публиковать некуда: реплика уже в журнале транскрипта
+        if not ctx.room.isconnected():
+            return
+        asyncio.create_task(coro_fn(*args)).add_done_callback(_on_publish_done)
+
+    def _on_classified(segment: Segment, role_messages: list[MessageToRoleAgent]):
+        # вызывается строго в порядке поступления сегментов
+        messages = [MessageToRoleAgent(role=msg.role, content=msg.content) for msg in role_messages]
+        transcript.append(messages)
+        role_context.append(messages)
+        for msg in role_messages:
+            publish_in_background(send_text_to_chat, f"[{msg.role}] {msg.content}")
+            publish_in_background(send_text_to_channel, msg, "transcription")
+        rolling_summary.on_messages(transcript)
+
+    classification_queue = RoomClassificationQueue(
+        classify=role_classifier.classify,
+        on_result=_on_classified,
+        context=role_context.snapshot,
+    )
+    classification_queue.start()
+
+    async def send_protocol_section(section: str, text: str, data):
+        if not ctx.room.isconnected():
+            # завершение при остановке задачи: комната уже отключена, протокол — только в файлах
+            return
+        payload = {
+            "id": f"{ctx.job.id}_{section}",
+            "type": "protocol_section",
+            "source": "agent",
+            "agent": "transcription_agent_all_users",
+            "section": section,
+            "text": text,
+            "data": data,
+            "timestamp": int(datetime.utcnow().timestamp() * 1000),
+        }
+        try:
+            await ctx.room.local_participant.publish_data(
+                json.dumps(payload, ensure_ascii=False).encode("utf-8"), topic="protocol"
+            )
+        except Exception as e:
+            # раздел всё равно попадёт в файл протокола
+            logger.warning(f"Failed to publish protocol section {section}: {e}")
 
-    @session.on("metrics_collected")
     def _on_metrics_collected(ev: MetricsCollectedEvent):
         metrics.log_metrics(ev.metrics)
         usage_collector.collect(ev.metrics)
-        
+
+    def _on_stt_metrics(stt_metrics: metrics.STTMetrics):
+        metrics.log_metrics(stt_metrics)
+        usage_collector.collect(stt_metrics)
+
+    if session is not None:
+        session.on("metrics_collected", _on_metrics_collected)
+    # плагин STT общий для процесса — подписка снимается при завершении задачи
+    stt_plugin.on("metrics_collected", _on_stt_metrics)
+
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        if summary.llm_prompt_tokens:
+            logger.info(
+                f"LLM prompt cache: {summary.llm_prompt_cached_tokens}/{summary.llm_prompt_tokens} tokens cached "
+                f"({summary.llm_prompt_cached_tokens / summary.llm_prompt_tokens:.1%})"
+            )
+        logger.info(f"Role agent context: {role_context.stats()}")
+        logger.info(f"MKB response cache: {get_mkb_cache_stats()}")
+        logger.info(f"Role classification tiers: {role_classifier.stats()}")
+        logger.info(f"Role classification batching: {role_batcher.stats()}")
+        logger.info(f"Role classification queue: {classification_queue.stats()}")
+        logger.info(f"Transcript log: {transcript.stats()}")
+        logger.info(f"Session storage: {storage.stats()}")
+        logger.info(f"Agents: {agent_registry_stats()}")
+        logger.info(f"STT input frames: {stt_frames.as_dict()}")
+        logger.info(f"Audio tracks: {tracks.stats()}")
+        stt_plugin.off("metrics_collected", _on_stt_metrics)
 
-    ctx.add_shutdown_callback(log_usage)
-    
     async def summarize_and_generate():
-        room_name = ctx.job.room.name
-        print(f"Available sessions: {list(sessions.keys())}")
-        print(f"Looking for session: {room_name}")
-
-        if room_name in sessions and sessions[room_name]:
-            data = sessions.pop(room_name)
-            print(f"Found {len(data)} messages for session {room_name}")
-
-            header_data = {
-                "report_date": datetime.now().strftime("%Y-%m-%d"),
-                "doctor_name": "Dr. John Smith",
-                "doctor_position": "Cardiologist",
-                "institution": "City Hospital"
-            }
-
-            summary = await generate_summary(data, client=room_name, header_data=header_data)
-            print(f"Summary for session {room_name}: {summary}")
-        else:
-            print(f"No data found for session {room_name} or session is empty")
-            
-    ctx.add_shutdown_callback(summarize_and_generate)
+        try:
+            room_name = ctx.job.room.name
+            # новые сегменты больше не принимаются; дожидаемся классификации уже распознанных
+            tracks.close()
+            await classification_queue.drain(timeout=30.0)
+            await classification_queue.aclose()
+            await transcript.aclose()
+            await storage.close_room(room_name)
+
+            if len(transcript):
+                data = transcript.read()
+                print(f"Found {len(data)} messages for session {room_name}")
+
+                header_data = {
+                    "report_date": datetime.now().strftime("%Y-%m-%d"),
+                    "doctor_name": "Dr. John Smith",
+                    "doctor_position": "Cardiologist",
+                    "institution": "City Hospital"
+                }
+
+                previous, summarized_upto = await rolling_summary.finalize()
+                print(f"Rolling summary covers {summarized_upto} of {len(data)} messages")
+
+                summary = await generate_summary(
+                    data,
+                    client=room_name,
+                    header_data=header_data,
+                    on_section=send_protocol_section,
+                    previous=previous,
+                    summarized_upto=summarized_upto,
+                )
+                print(f"Summary for session {room_name}: {summary}")
+                # протокол сохранён — журнал больше не нужен; при ошибке выше он остаётся для повтора
+                await transcript.discard()
+            else:
+                print(f"No data found for session {room_name} or session is empty")
+                await transcript.discard()
+        finally:
+            # LLM-клиент общий для процесса задачи: закрываем после последнего вызова модели
+            await aclose_agents()
+            # метрики — после последнего вызова модели, иначе итоговый протокол в них не попадёт
+            await log_usage()
+
+    # --- завершение консультации ---
+    # LiveKit отключает комнату до shutdown-колбэков, поэтому протокол собирается, пока
+    # комната подключена: после ухода последнего участника (с паузой на переподключение)
+    # или по RPC end_consultation. Shutdown-колбэк — запасной путь, только файлы.
+    finish_task: Optional[asyncio.Task] = None
+    end_timer: Optional[asyncio.TimerHandle] = None
+
+    async def _finish(reason: str):
+        logger.info(f"Finishing consultation {ctx.job.room.name}: {reason}")
+        try:
+            await summarize_and_generate()
+        finally:
+            if ctx.room.isconnected():
+                ctx.shutdown(reason=f"consultation finished: {reason}")
+
+    def finish_consultation(reason: str) -> asyncio.Task:
+        nonlocal finish_task
+        if finish_task is None:
+            finish_task = asyncio.create_task(_finish(reason), name="finish_consultation")
+        return finish_task
+
+    async def _finish_on_shutdown():
+        await finish_consultation("job shutdown")
+
+    ctx.add_shutdown_callback(_finish_on_shutdown)
 
     # start agent session
-    await session.start(
-        agent=Assistant(),
-        room=ctx.room,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
-    )
+    if session is not None:
+        await session.start(
+            agent=Assistant(),
+            room=ctx.room,
+            room_input_options=RoomInputOptions(
+                noise_cancellation=noise_cancellation.BVC(),
+            ),
+        )
 
     await ctx.connect()
 
-    # --- listeners/tasks registry ---
-    listeners_tasks: dict[str, asyncio.Task] = {}  # key: publication.sid -> task
-    listeners_lock = asyncio.Lock()  # чтобы безопасно модифицировать listeners_tasks
+    @ctx.room.local_participant.register_rpc_method("end_consultation")
+    async def _on_end_consultation(data: rtc.RpcInvocationData) -> str:
+        # ответ сразу: разделы протокола приходят в топик "protocol", итог — protocol_ready
+        finish_consultation(f"end_consultation from {data.caller_identity}")
+        return json.dumps({"status": "finishing"})
+
+    room_closed = asyncio.Event()
+
+    async def _process_publication(pub: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant, track: rtc.Track):
+        identity = participant.identity or getattr(participant, "name", None) or getattr(participant, "sid", None)
+
+        audio_stream = rtc.AudioStream.from_track(
+            track=track,
+            sample_rate=16000,
+            num_channels=1,
+            noise_cancellation=noise_cancellation.BVC(),
+        )
 
-    async def _process_publication(pub: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant):
+        # one denoise -> VAD -> STT chain per track, STT plugin shared by the process
+        transcriber = TrackTranscriber(
+            frames=audio_stream,
+            vad_model=ctx.proc.userdata.get("vad"),
+            stt_plugin=stt_plugin,
+            # не ждём LLM: сегмент уходит в очередь, STT продолжает читаться
+            on_final=lambda text: classification_queue.submit(text, identity),
+            identity=identity,
+            counters=stt_frames,
+        )
         try:
-            # subscribe request (API supports set_subscribed)
+            await transcriber.run()
+        finally:
             try:
-                pub.set_subscribed(True)
+                await audio_stream.aclose()
             except Exception:
                 pass
 
-            # wait for pub.track to appear (polling; можно заменить wait_for_track_publication helper)
-            timeout = 10.0
-            waited = 0.0
-            while pub.track is None and waited < timeout:
-                await asyncio.sleep(0.05)
-                waited += 0.05
-
-            if pub.track is None:
-                print(f"[WARN] track not available for publication {pub.sid} (participant={participant.identity})")
-                async with listeners_lock:
-                    listeners_tasks.pop(pub.sid, None)
-                return
-
-            track = pub.track
-            identity = participant.identity or getattr(participant, "name", None) or getattr(participant, "sid", None)
-
-            audio_stream = rtc.AudioStream.from_track(
-                track=track,
-                sample_rate=16000,
-                num_channels=1,
-                noise_cancellation=noise_cancellation.BVC(),
-            )
+    # --- track registry: one task per publication sid, started by room events ---
+    tracks = TrackRegistry(_process_publication)
 
-            # per-user VAD + per-user STT stream
-            vad_stream = ctx.proc.userdata["vad"].stream()
-            stt_plugin = openai.STT(model="gpt-4o-transcribe", detect_language=True)
-            stt_stream = stt_plugin.stream()
+    # отчёт о нагрузке комнаты для load_fnc основного процесса воркера
+    load_reporter = LoadReporter(
+        key=ctx.job.id,
+        sample=lambda: RoomLoad(
+            room=ctx.room.name,
+            tracks=tracks.stats()["active"],
+            queue_depth=classification_queue.depth,
+        ),
+    )
+    load_reporter.start()
+    ctx.add_shutdown_callback(load_reporter.aclose)
 
-            async def _forward_input():
-                try:
-                    async for frame_event in audio_stream:
-                        frame = frame_event.frame
-                        try:
-                            vad_stream.push_frame(frame)
-                        except Exception:
-                            pass
-                        try:
-                            stt_stream.push_frame(frame)
-                        except Exception:
-                            pass
-                finally:
-                    # graceful close
-                    try:
-                        await stt_stream.aclose()
-                    except Exception:
-                        pass
-                    try:
-                        vad_stream.close()
-                    except Exception:
-                        # VADStream may have close() or end_input(); use safe guard
-                        try:
-                            vad_stream.end_input()
-                        except Exception:
-                            pass
-                    try:
-                        await audio_stream.aclose()
-                    except Exception:
-                        pass
-
-            async def _consume_stt():
-                try:
-                    
-                    room_name = ctx.job.room.name
-                    sessions.setdefault(room_name, [])
-
-                    async for ev in stt_stream:
-                        etype = getattr(ev, "type", None)
-                        is_final = getattr(ev, "is_final", None)
-                        if is_final is None:
-                            is_final = (etype and str(etype).lower().find("final") != -1)
-                        text = None
-                        if hasattr(ev, "alternatives") and ev.alternatives:
-                            text = getattr(ev.alternatives[0], "text", None)
-                        if text is None and hasattr(ev, "text"):
-                            text = ev.text
-                        if text is None:
-                            continue
-
-                        if is_final:
-                            print(f"[TRANSCR FINAL] {identity}: {text}")
-                            
-                            role_messages = await process_transcript(text, sessions[room_name][-10:])
-                            for msg in role_messages:
-                                sessions[room_name].append(MessageToRoleAgent(role=msg.role, content=msg.content))
-                                asyncio.create_task(send_text_to_chat(f"[{msg.role}] {msg.content}"))
-                                asyncio.create_task(send_text_to_channel(msg, channel="transcription"))
-                        else:
-                            print(f"[TRANSCR PART] {identity}: {text}")
-                except asyncio.CancelledError:
-                    return
-                except Exception as e:
-                    logger.exception("STT consumer error for %s: %s", identity, e)
-
-            forward_t = asyncio.create_task(_forward_input(), name=f"forward_{pub.sid}")
-            consumer_t = asyncio.create_task(_consume_stt(), name=f"stt_consume_{pub.sid}")
-
-            # keep them until finished/cancelled
-            await asyncio.gather(forward_t, consumer_t)
-        except asyncio.CancelledError:
-            return
-        except Exception:
-            logger.exception("Error in processing publication %s for %s", getattr(pub, "sid", "<no-sid>"), getattr(participant, "identity", "<no-id>"))
-        finally:
-            async with listeners_lock:
-                listeners_tasks.pop(getattr(pub, "sid", None), None)
+    def _on_room_empty():
+        nonlocal end_timer
+        end_timer = None
+        if not ctx.room.remote_participants:
+            finish_consultation("all participants left")
 
     # --- room-level handlers: register ONCE ---
     @ctx.room.on("participant_connected")
     def _on_participant_connected(participant: rtc.RemoteParticipant):
+        nonlocal end_timer
+        if end_timer is not None:
+            end_timer.cancel()
+            end_timer = None
+        if finish_task is not None:
+            return
         # start processing any existing audio publications for the participant
         for pub in participant.track_publications.values():
-            if getattr(pub, "kind", None) == rtc.TrackKind.KIND_AUDIO:
-                sid = getattr(pub, "sid", None)
-                # prevent double-start
-                if sid not in listeners_tasks:
-                    listeners_tasks[sid] = asyncio.create_task(_process_publication(pub, participant))
+            tracks.publication_added(pub, participant)
 
     @ctx.room.on("participant_disconnected")
     def _on_participant_disconnected(participant: rtc.RemoteParticipant):
-        # cancel tasks for this participant
-        to_cancel = []
-        for sid, task in list(listeners_tasks.items()):
-            # if publication belongs to participant, cancel it
-            # note: participant.track_publications keys are publication.sids
-            if sid in participant.track_publications:
-                to_cancel.append(sid)
-        for sid in to_cancel:
-            t = listeners_tasks.pop(sid, None)
-            if t and not t.done():
-                t.cancel()
+        nonlocal end_timer
+        tracks.participant_disconnected(participant)
+        if not ctx.room.remote_participants and end_timer is None and finish_task is None:
+            end_timer = asyncio.get_running_loop().call_later(settings.consultation_end_grace_s, _on_room_empty)
 
     @ctx.room.on("track_published")
     def _on_track_published(publication: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant):
-        if getattr(publication, "kind", None) == rtc.TrackKind.KIND_AUDIO:
-            sid = getattr(publication, "sid", None)
-            if sid not in listeners_tasks:
-                listeners_tasks[sid] = asyncio.create_task(_process_publication(publication, participant))
+        if finish_task is None:
+            tracks.publication_added(publication, participant)
 
     @ctx.room.on("track_subscribed")
     def _on_track_subscribed(track: rtc.Track, publication: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant):
-        # track available -> ensure we process publication if not already
-        if getattr(publication, "kind", None) == rtc.TrackKind.KIND_AUDIO:
-            sid = getattr(publication, "sid", None)
-            if sid not in listeners_tasks:
-                listeners_tasks[sid] = asyncio.create_task(_process_publication(publication, participant))
-                
+        tracks.track_subscribed(track, publication, participant)
+
     @ctx.room.on("disconnected")
     def _on_room_disconnected():
         print(f"[INFO] Room {ctx.room.name} disconnected, cleaning up STT streams...")
 
         async def cleanup():
             try:
-                for sid, t in list(listeners_tasks.items()):
-                    if not t.done():
-                        t.cancel()
-                listeners_tasks.clear()
+                tracks.close()
             except Exception as e:
                 logger.warning(f"Cleanup error on room disconnect: {e}")
 
-            try:
-                await session.aclose()
-            except Exception:
-                pass
+            if session is not None:
+                try:
+                    await session.aclose()
+                except Exception:
+                    pass
+            room_closed.set()
 
         asyncio.create_task(cleanup())
 
@@ -304,17 +416,16 @@ async def entrypoint(ctx: JobContext):
         _on_participant_connected(participant)
 
     # session close event (instead of non-existent wait_closed())
-    session_closed = asyncio.Event()
-
-    @session.on("close")
-    def _on_session_close(ev) -> None:
-        try:
-            session_closed.set()
-        except Exception:
-            pass
+    if session is not None:
+        @session.on("close")
+        def _on_session_close(ev) -> None:
+            try:
+                room_closed.set()
+            except Exception:
+                pass
 
     try:
-        await session_closed.wait()
+        await room_closed.wait()
     except asyncio.CancelledError:
         pass
 
@@ -322,4 +433,17 @@ async def entrypoint(ctx: JobContext):
 
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm, drain_timeout=1))
+    # отчёты о нагрузке — в каталоге этого воркера: воркеры на одном хосте не считают чужие
+    # комнаты. Процессы задач запускаются позже и получают каталог через окружение
+    worker_load_dir = os.path.join(settings.worker_load_dir, f"worker-{os.getpid()}")
+    os.environ["WORKER_LOAD_DIR"] = worker_load_dir
+    settings.worker_load_dir = worker_load_dir
+    worker_load = WorkerLoadModel(report_dir=worker_load_dir)
+    cli.run_app(WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
+        request_fnc=worker_load.request_fnc,
+        load_fnc=worker_load.load,
+        load_threshold=settings.worker_load_threshold,
+        drain_timeout=1,
+    ))
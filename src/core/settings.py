@@ -17,8 +17,12 @@ class Settings(BaseSettings):
     
     # Whisper settings
     
-    # OpenAI settings
+    # OpenAI settings: all agents of a process share one provider and one
+    # pooled HTTP client (keep-alive connections)
     openai_api_key: str
+    openai_model: str = "gpt-4o-mini"
+    openai_timeout_s: float = 600.0
+    openai_max_connections: int = 20
     
     # FastAPI settings
     app_title: str = "Speech-to-Text with LiveKit"
@@ -31,6 +35,126 @@ class Settings(BaseSettings):
     
     livekit_agent_name: str = "transcription-agent"
     
+    # Log the duration of every startup phase (app lifespan, worker prewarm
+    # steps); import costs: uv run python -m src.core.startup api|worker
+    startup_profile: bool = False
+    
+    # LiveKit RoomService client (pooled keep-alive connections); server API
+    # tokens are reused until livekit_token_refresh_s before they expire
+    livekit_api_timeout_s: float = 5.0
+    livekit_api_retries: int = 2
+    livekit_api_max_connections: int = 20
+    livekit_token_refresh_s: float = 60.0
+    
+    # GET /api/list-rooms cache; LiveKit room webhooks (POST /api/livekit/webhook)
+    # invalidate it early, 0 only de-duplicates concurrent requests
+    room_list_cache_ttl_s: float = 3.0
+    
+    # Participant join tokens: validity, and how long an identical token for
+    # the same room/participant is handed out again instead of re-signing
+    access_token_ttl_s: int = 6 * 3600
+    access_token_reuse_s: int = 300
+    access_token_cache_size: int = 4096
+    token_batch_max_size: int = 200
+    
+    # Session output storage: every room's files under its own prefix
+    # (<room>/transcript.json, <room>/medical_protocol.txt, ...). "local" is
+    # storage_dir on the output volume shared by the worker and the API;
+    # "memory" is an in-process object store stand-in (single process only).
+    # Streaming logs are buffered and reach storage at most storage_append_flush_s
+    # after a write
+    storage_backend: str = "local"
+    storage_dir: str = "output/rooms"
+    storage_append_buffer_bytes: int = 64 * 1024
+    storage_append_flush_s: float = 1.0
+    
+    # GET /api/protocol: cached protocol files (validated by mtime/size) and
+    # long polling (?wait=seconds) for a new version of the protocol
+    protocol_cache_size: int = 256
+    protocol_poll_interval_s: float = 0.5
+    protocol_wait_max_s: float = 60.0
+    
+    # Protocol-ready notifications (SSE / WebSocket). "file" shares events
+    # through notification_dir between the transcription worker and all
+    # uvicorn workers; "memory" only works within a single process
+    notification_backend: str = "file"
+    notification_dir: str = "output/events"
+    notification_poll_interval_s: float = 0.5
+    notification_retention_s: float = 600.0
+    notification_heartbeat_s: float = 15.0
+    
+    # Protocol documents written when the protocol is final (txt is always
+    # written: the API serves it). Rendering runs off the event loop: txt/html
+    # in threads, PDF in a process pool (0 = in a thread)
+    protocol_formats: list[str] = ["txt", "html", "pdf"]
+    renderer_threads: int = 2
+    renderer_pdf_processes: int = 1
+    pdf_font_path: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+    pdf_font_bold_path: str = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+    
+    # Transcription worker: skip the conversational AgentSession (its audio
+    # input is never used) and run only the per-track denoise -> VAD -> STT chain
+    transcription_only: bool = True
+    stt_model: str = "gpt-4o-transcribe"
+    
+    # The consultation is finished (queue drained, protocol generated and its
+    # sections published to the room) this long after the last participant
+    # leaves, while the agent is still connected; must stay below the room's
+    # empty_timeout. Clients can also finish it with the end_consultation RPC
+    consultation_end_grace_s: float = 5.0
+    
+    # VAD gating of STT input: only speech plus pre/post-roll padding is sent;
+    # segment mode transcribes finished utterances with batch recognition
+    stt_vad_gating: bool = True
+    stt_pre_roll_ms: int = 600
+    stt_post_roll_ms: int = 600
+    stt_segment_mode: bool = False
+    
+    # Worker load model: load = max(cpu, rooms/max_rooms, tracks/max_tracks,
+    # queue_depth/max_queue_depth); above the threshold no new jobs are taken.
+    # Job processes report their tracks/queue depth through files in worker_load_dir
+    # (each worker uses its own worker-<pid> subdirectory)
+    worker_max_rooms: int = 10
+    worker_max_tracks: int = 20
+    worker_max_queue_depth: int = 50
+    worker_load_threshold: float = 0.75
+    worker_load_dir: str = "/tmp/transcription_worker_load"
+    worker_load_report_interval_s: float = 2.0
+    
+    # Per-room transcript log (append-only, replayed when a job restarts):
+    # fsync after N messages or T seconds, last N messages kept in memory
+    transcript_log_dir: str = "transcripts"
+    transcript_fsync_every_n: int = 20
+    transcript_fsync_interval_s: float = 1.0
+    transcript_tail_size: int = 50
+    
+    # Rolling summary settings (draft protocol is updated every N messages
+    # or after a pause in the conversation; 0 disables)
+    rolling_summary_every_n: int = 20
+    rolling_summary_idle_s: float = 30.0
+    
+    # Role classification batching (final STT segments per model call)
+    role_batch_max_delay_s: float = 0.5
+    role_batch_max_size: int = 8
+    
+    # Role agent context: the last turns, laid out so consecutive calls share a
+    # byte-identical prefix (provider prompt caching); when the window reaches
+    # role_context_max_turns its oldest role_context_drop_turns turns are dropped
+    role_context_max_turns: int = 12
+    role_context_drop_turns: int = 6
+    
+    # Role classification queue (per room: bounded backlog of final STT
+    # segments and number of concurrent classification workers)
+    role_queue_maxsize: int = 100
+    role_queue_workers: int = 4
+    
+    # Local role classifiers tried before the LLM: participant identity
+    # (or identity prefix) -> DOCTOR/PATIENT, and an offline-trained lexical
+    # model; a local answer is used when its confidence reaches the threshold
+    role_identity_map: dict[str, str] = {}
+    role_lexical_model_path: str = "role_model.json"
+    role_local_min_confidence: float = 0.95
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,115 @@
+"""
+Startup profiling of the API and the transcription worker
+
+Import cost breakdown: the entry module is imported in a fresh interpreter
+with `-X importtime`, and the self time of every imported module is summed
+per package; the slowest modules are listed by cumulative time.
+
+    uv run python -m src.core.startup api
+    uv run python -m src.core.startup worker --top 30
+
+Startup phases in a running process (app lifespan, each step of the worker's
+prewarm) are timed with `startup_phase()`; with STARTUP_PROFILE=1
+(settings.startup_profile) every phase is logged as it finishes.
+"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ENTRY_MODULES = {
+    "api": "src.main",
+    "worker": "src.agents.transcription_agent_all_users",
+}
+
+# время фаз запуска этого процесса, мс
+_phases: dict[str, float] = {}
+
+
+@contextmanager
+def startup_phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = (time.perf_counter() - started) * 1000
+        if settings.startup_profile:
+            logger.info(f"Startup phase {name}: {_phases[name]:.1f} ms")
+
+
+def startup_phases() -> dict[str, float]:
+    return {name: round(ms, 1) for name, ms in _phases.items()}
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(log: str) -> list[ImportRecord]:
+    """Records of `python -X importtime` stderr output"""
+    records = []
+    for line in log.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # заголовок таблицы
+        records.append(ImportRecord(parts[2].strip(), int(parts[0]), int(parts[1])))
+    return records
+
+
+def package_of(module: str) -> str:
+    """Grouping key: top-level package, one level deeper for src and livekit"""
+    parts = module.split(".")
+    depth = 3 if parts[0] == "livekit" and len(parts) > 2 and parts[1] == "plugins" else 2
+    return ".".join(parts[:depth]) if parts[0] in ("src", "livekit") else parts[0]
+
+
+def profile_imports(module: str) -> list[ImportRecord]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=False, env=os.environ.copy(), stderr=subprocess.PIPE, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("target", choices=sorted(ENTRY_MODULES))
+    parser.add_argument("--top", type=int, default=20, help="packages / modules to list")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    records = profile_imports(ENTRY_MODULES[args.target])
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    total_us = sum(r.self_us for r in records)
+    by_package = Counter()
+    for r in records:
+        by_package[package_of(r.module)] += r.self_us
+    print(f"{ENTRY_MODULES[args.target]}: {len(records)} modules, {total_us / 1000:.0f} ms importing, {wall_ms:.0f} ms wall")
+
+    print("\nby package (self time):")
+    for package, us in by_package.most_common(args.top):
+        print(f"  {us / 1000:8.1f} ms  {us / total_us:6.1%}  {package}")
+
+    print("\nslowest modules (cumulative time, with what they import):")
+    for r in sorted(records, key=lambda r: r.cumulative_us, reverse=True)[:args.top]:
+        print(f"  {r.cumulative_us / 1000:8.1f} ms  {r.module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,14 +9,29 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.core.settings import settings
-from src.routers import rooms, document
+from src.core.startup import startup_phase
+from src.routers import rooms, document, notifications
 from src.schemas.livekit import ApiInfoResponse, HealthResponse
+from src.services.notifications import get_notification_hub
+from src.utils.livekit_client import close_room_client, get_room_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup_phase("api.lifespan"):
+        # один пул соединений к LiveKit на всё приложение
+        get_room_client()
+        await get_notification_hub().start()
+    yield
+    await get_notification_hub().aclose()
+    await close_room_client()
 
 
 app = FastAPI(
     title=settings.app_title,
     version=settings.app_version,
     description="saubol",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -29,6 +44,7 @@ app.add_middleware(
 
 app.include_router(rooms.router)
 app.include_router(document.router)
+app.include_router(notifications.router)
 
 @app.get("/", response_model=ApiInfoResponse)
 async def root():
@@ -37,7 +53,13 @@ async def root():
         message="Speech-to-Text API with LiveKit",
         endpoints={
             "create_room": "/api/create-room",
+            "list_rooms": "/api/list-rooms",
+            "livekit_webhook": "/api/livekit/webhook",
+            "protocol": "/api/protocol",
+            "protocol_events": "/api/protocol/events",
+            "protocol_ws": "/api/protocol/ws",
             "generate_token": "/api/token",
+            "generate_tokens": "/api/tokens",
             "start_transcription": "/api/start-transcription",
             "stop_transcription": "/api/stop-transcription",
             "start_agent": "/api/start-agent",
@@ -89,9 +89,10 @@ Status localis (детально)
         Найти подходящий код МКБ-10, используя ТОЛЬКО предоставленные функции и данные, и следуя переданным Pydantic-схемам.
 
     Общие правила
-        - Использовать только инструменты: get_mkb_classes(), get_mkb_class_blocks(mkb_class_code),
+        - Использовать только инструменты: search_mkb(query), get_mkb_classes(), get_mkb_class_blocks(mkb_class_code),
           get_mkb_class_block_elements(mkb_class_block_code), get_mkb_class_block_element_details(mkb_class_block_element_code).
-        - Всегда вызывать функции последовательно: классы → блоки → элементы → детали. Ответы без вызова функций недопустимы.
+        - Сначала вызывать search_mkb с названием диагноза или ключевыми словами описания. Если среди результатов есть кандидат, чьё name соответствует диагнозу, использовать его и его path — обход дерева не нужен.
+        - Только если search_mkb не дал подходящих кандидатов, вызывать функции последовательно: классы → блоки → элементы → детали. Ответы без вызова функций недопустимы.
         - Не придумывать коды и не обращаться к внешним источникам — все решения основывать исключительно на данных, возвращённых функциями.
 
     Решение о стратегии поиска (когда искать по name, когда по описанию)
@@ -110,9 +111,9 @@ Status localis (детально)
             - На уровне деталей проводить ту же оценку схожести по name и выбирать до 5 лучших кандидатов; если среди деталей есть запись, наиболее соответствующая по словам и формату — считаться предпочтительной.
 
     Критерий детального (окончательного) кода
-        - ПРИЗНАК детального кода: в поле mkb_code присутствует точка '.' и за ней цифра(ы) (например "A15.0"). Такой код является детальным финалом только если он присутствует в результатах get_mkb_class_block_element_details.
+        - ПРИЗНАК детального кода: в поле mkb_code присутствует точка '.' и за ней цифра(ы) (например "A15.0"). Такой код является детальным финалом только если он присутствует в результатах search_mkb или get_mkb_class_block_element_details.
         - Если детальных кодов нет для выбранного элемента, допускается считать окончательным код элемента/блока (коды из get_mkb_class_block_elements), при условии что они наиболее релевантны по найденным совпадениям и get_mkb_class_block_element_details выдает пустой результат.
-        - ВСЕГДА проверять наличие детальных записей через get_mkb_class_block_element_details перед тем, как финализировать выбор.
+        - Если выбран код элемента без точки — ВСЕГДА проверять наличие детальных записей через get_mkb_class_block_element_details перед тем, как финализировать выбор.
 
     Выдача результата и пояснения
         - Формирование ответа должно опираться только на данные, полученные функциями.
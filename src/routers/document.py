@@ -1,24 +1,49 @@
-from fastapi import APIRouter, HTTPException
-from pathlib import Path
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 
+from src.core.settings import settings
+from src.utils.http_cache import cache_headers, not_modified
+from src.utils.protocol_cache import get_protocol_cache
 
 
 router = APIRouter(prefix="/api", tags=["documents"])
 
 
 @router.get("/protocol")
-async def get_protocol(room_name: str):
+async def get_protocol(
+    request: Request,
+    room_name: str,
+    wait: float = Query(0, ge=0, le=settings.protocol_wait_max_s),
+    partial: bool = False,
+):
     """
     Retrieve the medical protocol document for a given room.
     
+    Supports ETag / If-None-Match (304 Not Modified). With `wait` > 0 the
+    request long-polls: it returns as soon as the protocol exists and differs
+    from the client's If-None-Match version, or after `wait` seconds.
+    Only the final protocol is served unless `partial` is set; `final` in
+    the response tells the two apart.
+    
     Args:
         room_name: Name of the room to get the protocol for.
+        wait: Seconds to wait for a new version of the protocol.
+        partial: Also return the protocol while its sections are streaming.
     """
-    file_path = Path(f"output/medical_protocol_{room_name}.txt")
-    if not file_path.exists():
+    if not room_name or "/" in room_name or "\\" in room_name or room_name.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid room name")
+
+    cache = get_protocol_cache()
+    if wait > 0:
+        protocol = await cache.wait(room_name, request.headers.get("if-none-match"), timeout=wait, partial=partial)
+    else:
+        protocol = await cache.get(room_name, partial=partial)
+    if protocol is None:
         raise HTTPException(status_code=404, detail="Protocol not found")
-    
-    with open(file_path, "r", encoding="utf-8") as f:
-        protocol_content = f.read()
 
-    return {"room_name": room_name, "protocol": protocol_content}
\ No newline at end of file
+    headers = cache_headers(protocol.etag, protocol.mtime)
+    if not_modified(request, protocol.etag, protocol.mtime):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(
+        {"room_name": room_name, "protocol": protocol.text, "final": protocol.final}, headers=headers
+    )
@@ -0,0 +1,60 @@
+"""
+Per-room push notifications (protocol ready) over SSE and WebSocket
+"""
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from src.core.settings import settings
+from src.services.notifications import get_notification_hub
+
+
+router = APIRouter(prefix="/api", tags=["notifications"])
+
+
+@router.get("/protocol/events")
+async def protocol_events(request: Request, room_name: str):
+    """
+    Server-Sent Events stream of a room's notifications.
+
+    The room's last event (e.g. protocol_ready) is sent immediately on
+    connect, so subscribing after the protocol was saved is not racy.
+
+    Args:
+        room_name: Name of the room to subscribe to.
+    """
+    async def stream():
+        with get_notification_hub().subscribe(room_name) as subscription:
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=settings.notification_heartbeat_s)
+                if event is None:
+                    # комментарий SSE держит соединение через прокси
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {event.id}\nevent: {event.type}\ndata: {event.to_json()}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/protocol/ws")
+async def protocol_ws(websocket: WebSocket, room_name: str):
+    """
+    WebSocket stream of a room's notifications, one JSON event per message.
+
+    Args:
+        room_name: Name of the room to subscribe to.
+    """
+    await websocket.accept()
+    with get_notification_hub().subscribe(room_name) as subscription:
+        try:
+            while True:
+                event = await subscription.get(timeout=settings.notification_heartbeat_s)
+                if event is None:
+                    await websocket.send_json({"type": "keepalive"})
+                    continue
+                await websocket.send_text(event.to_json())
+        except WebSocketDisconnect:
+            pass
@@ -1,10 +1,19 @@
 """
 Room management API endpoints
 """
-from fastapi import APIRouter, HTTPException
-from src.schemas.livekit import RoomCreationResponse, TokenResponse, RoomRequest
-from src.utils.auth import create_room, generate_access_token
-from src.utils.room import list_rooms
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from src.schemas.livekit import (
+    BatchTokenItem,
+    BatchTokenRequest,
+    BatchTokenResponse,
+    RoomCreationResponse,
+    RoomRequest,
+    TokenResponse,
+)
+from src.utils.auth import create_room, generate_access_token, get_webhook_receiver
+from src.utils.http_cache import cache_headers, not_modified
+from src.utils.room_cache import INVALIDATING_EVENTS, get_room_list_cache
 from src.core.settings import settings
 
 router = APIRouter(prefix="/api", tags=["rooms"])
@@ -34,20 +43,72 @@ async def generate_token(request: RoomRequest):
     except Exception as e:
         print(f"Error generating token: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate token: {str(e)}")
+
+
+@router.post("/tokens", response_model=BatchTokenResponse)
+async def generate_tokens(request: BatchTokenRequest):
+    """
+    Generate access tokens for many participants in one request
+    (e.g. opening the rooms of a whole shift).
+    
+    Args:
+        request: List of room and participant pairs
+        
+    Returns:
+        LiveKit URL and one token per pair, in request order
+    """
+    try:
+        tokens = [
+            BatchTokenItem(
+                room_name=item.room_name,
+                participant_name=item.participant_name,
+                token=generate_access_token(item.room_name, item.participant_name),
+            )
+            for item in request.participants
+        ]
+        return BatchTokenResponse(url=settings.livekit_url, tokens=tokens)
+    
+    except Exception as e:
+        print(f"Error generating tokens: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate tokens: {str(e)}")
     
     
 @router.get("/list-rooms")
-async def list_rooms_router():
+async def list_rooms_router(request: Request):
     """
     List all existing LiveKit rooms.
     
+    Served from a short-TTL cache shared by all callers; supports
+    conditional requests with ETag / Last-Modified.
+    
     Returns:
         List of rooms with their details
     """
     try:
-        rooms_data = await list_rooms()
-        return rooms_data
-    
+        rooms = await get_room_list_cache().get()
     except Exception as e:
         print(f"Error listing rooms: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to list rooms: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to list rooms: {str(e)}")
+
+    headers = cache_headers(rooms.etag, rooms.last_modified)
+    if not_modified(request, rooms.etag, rooms.last_modified):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(rooms.data, headers=headers)
+
+
+@router.post("/livekit/webhook")
+async def livekit_webhook(request: Request, authorization: str = Header(...)):
+    """
+    Receive LiveKit webhooks; room and participant events invalidate the
+    cached room list.
+    """
+    body = (await request.body()).decode("utf-8")
+    try:
+        event = get_webhook_receiver().receive(body, authorization)
+    except Exception as e:
+        print(f"Rejected LiveKit webhook: {e}")
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    if event.event in INVALIDATING_EVENTS:
+        get_room_list_cache().invalidate()
+    return {"status": "ok"}
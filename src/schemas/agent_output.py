@@ -19,5 +19,7 @@ class MessageToRoleAgent(BaseModel):
     
 class RoleAgentOutput(BaseModel):
     messages: list[MessageToRoleAgent]
-    
 
+class RoleBatchItem(BaseModel):
+    id: int
+    messages: list[MessageToRoleAgent]
@@ -1,13 +1,16 @@
 """
 Request and response models for LiveKit API endpoints
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from src.core.settings import settings
 
 
 class RoomRequest(BaseModel):
     """Request model for room and participant information"""
-    room_name: str
-    participant_name: str
+    # пустые значения LiveKit отклоняет при входе в комнату — отвечаем 422 сразу
+    room_name: str = Field(min_length=1)
+    participant_name: str = Field(min_length=1)
 
 
 class TokenResponse(BaseModel):
@@ -17,6 +20,24 @@ class TokenResponse(BaseModel):
     room_name: str
 
 
+class BatchTokenRequest(BaseModel):
+    """Request model for issuing tokens for many room/participant pairs at once"""
+    participants: list[RoomRequest] = Field(min_length=1, max_length=settings.token_batch_max_size)
+
+
+class BatchTokenItem(BaseModel):
+    """One issued token of a batch"""
+    room_name: str
+    participant_name: str
+    token: str
+
+
+class BatchTokenResponse(BaseModel):
+    """Response model for batch token generation, in request order"""
+    url: str
+    tokens: list[BatchTokenItem]
+
+
 class RoomCreationResponse(BaseModel):
     """Response model for room creation"""
     room_name: str
@@ -3,6 +3,7 @@ from typing import List, Optional, Literal
 from datetime import date, datetime
 
 from pydantic import BaseModel, Field, confloat
+from pydantic.json_schema import SkipJsonSchema
 
 # Тип для confidence: число в диапазоне [0.0, 1.0]
 Confidence = confloat(ge=0.0, le=1.0)
@@ -94,6 +95,8 @@ class StatusLocalisRegion(BaseModel):
 class PreliminaryDiagnosis(BaseModel):
     text: str = Field(..., description="Текст предварительного диагноза")
     icd10: Optional[str] = Field(None, description="Код МКБ-10, если подобран")
+    # Заполняется валидатором МКБ-10 после генерации, модели не показывается
+    icd10_name: SkipJsonSchema[Optional[str]] = None
     certainty: Optional[Literal['high', 'medium', 'low']] = Field(None, description="Степень уверенности диагноза")
     rationale: Optional[str] = Field(None, description="Обоснование (почему предложен)")
     confidence: Confidence = Field(..., description="Доверие (0.0-1.0)")
@@ -102,6 +105,8 @@ class PreliminaryDiagnosis(BaseModel):
 class DifferentialDiagnosis(BaseModel):
     text: str = Field(..., description="Текст варианта дифференциального диагноза")
     icd10: Optional[str] = Field(None, description="Возможный код МКБ-10")
+    # Заполняется валидатором МКБ-10 после генерации, модели не показывается
+    icd10_name: SkipJsonSchema[Optional[str]] = None
     confidence: Confidence = Field(..., description="Доверие (0.0-1.0)")
 
 
@@ -0,0 +1,236 @@
+"""
+Per-track audio pipeline of the transcription worker.
+
+Each remote audio track gets exactly one denoise -> VAD -> STT chain: the
+caller opens the (noise-cancelled) audio stream, TrackTranscriber feeds its
+frames to a VAD stream and hands final transcripts to `on_final`. The STT
+plugin (and its HTTP client) is shared by all tracks and rooms of the process.
+
+VAD events gate what reaches STT: only speech plus `pre_roll_ms` before it
+(kept in a ring buffer, so the VAD's own detection delay is covered too) and
+`post_roll_ms` after it is forwarded; silence is dropped. In segment mode the
+gated audio is not streamed at all — each finished utterance is sent to the
+STT plugin's batch `recognize()` instead.
+"""
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AsyncIterable, Awaitable, Callable, Optional
+
+from livekit import rtc
+from livekit.agents import stt, vad
+from livekit.plugins import openai
+
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def get_stt_plugin() -> stt.STT:
+    """One STT plugin per process instead of one per audio track"""
+    return openai.STT(model=settings.stt_model, detect_language=True)
+
+
+@dataclass
+class FrameCounters:
+    """Audio frames sent to STT vs dropped by the VAD gate (shared per room)"""
+    pushed: int = 0
+    skipped: int = 0
+    segments: int = 0
+
+    def as_dict(self) -> dict:
+        total = self.pushed + self.skipped
+        return {
+            "frames_pushed": self.pushed,
+            "frames_skipped": self.skipped,
+            "skipped_ratio": round(self.skipped / total, 3) if total else 0.0,
+            "segments": self.segments,
+        }
+
+
+def _duration(frame: rtc.AudioFrame) -> float:
+    return frame.samples_per_channel / frame.sample_rate
+
+
+class TrackTranscriber:
+    def __init__(
+        self,
+        frames: AsyncIterable[rtc.AudioFrameEvent],
+        vad_model: Optional[vad.VAD],
+        stt_plugin: stt.STT,
+        on_final: Callable[[str], Awaitable[None]],
+        identity: Optional[str] = None,
+        counters: Optional[FrameCounters] = None,
+        gated: bool = settings.stt_vad_gating,
+        segment_mode: bool = settings.stt_segment_mode,
+        pre_roll_ms: int = settings.stt_pre_roll_ms,
+        post_roll_ms: int = settings.stt_post_roll_ms,
+    ):
+        self.frames = frames
+        self.vad_model = vad_model
+        self.stt_plugin = stt_plugin
+        self.on_final = on_final
+        self.identity = identity
+        self.counters = counters or FrameCounters()
+        # сегментный режим опирается на границы речи от VAD
+        self.segment_mode = segment_mode
+        self.gated = gated or segment_mode
+        if self.gated and vad_model is None:
+            raise ValueError("VAD gating and segment mode need a VAD model")
+        self.pre_roll_s = pre_roll_ms / 1000
+        self.post_roll_s = post_roll_ms / 1000
+
+        # состояние шлюза
+        self._speaking = False
+        self._post_roll_left = 0.0
+        self._pre_roll: deque[rtc.AudioFrame] = deque()
+        self._pre_roll_s = 0.0
+        self._segment: list[rtc.AudioFrame] = []
+        self._segments: asyncio.Queue[Optional[list[rtc.AudioFrame]]] = asyncio.Queue()
+        self._stt_stream: Optional[stt.SpeechStream] = None
+
+    async def run(self):
+        vad_stream = self.vad_model.stream() if self.gated else None
+        if not self.segment_mode:
+            self._stt_stream = self.stt_plugin.stream()
+
+        tasks = [asyncio.create_task(self._forward_input(vad_stream), name=f"forward_{self.identity}")]
+        if self._stt_stream is not None:
+            tasks.append(asyncio.create_task(self._consume_stt(self._stt_stream), name=f"stt_consume_{self.identity}"))
+        else:
+            tasks.append(asyncio.create_task(self._recognize_segments(), name=f"stt_segments_{self.identity}"))
+        if vad_stream is not None:
+            tasks.append(asyncio.create_task(self._consume_vad(vad_stream), name=f"vad_consume_{self.identity}"))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _emit(self, frame: rtc.AudioFrame):
+        self.counters.pushed += 1
+        if self.segment_mode:
+            self._segment.append(frame)
+            return
+        try:
+            self._stt_stream.push_frame(frame)
+        except Exception:
+            pass
+
+    def _end_segment(self):
+        if self.segment_mode and self._segment:
+            self._segments.put_nowait(self._segment)
+            self._segment = []
+
+    def _gate(self, frame: rtc.AudioFrame):
+        if self._speaking:
+            self._emit(frame)
+        elif self._post_roll_left > 0:
+            self._emit(frame)
+            self._post_roll_left -= _duration(frame)
+            if self._post_roll_left <= 0:
+                self._end_segment()
+        else:
+            # тишина копится в кольцевом буфере pre-roll; вытесненные кадры не отправляются
+            self._pre_roll.append(frame)
+            self._pre_roll_s += _duration(frame)
+            while self._pre_roll and self._pre_roll_s > self.pre_roll_s:
+                self._pre_roll_s -= _duration(self._pre_roll.popleft())
+                self.counters.skipped += 1
+
+    async def _forward_input(self, vad_stream: Optional[vad.VADStream]):
+        try:
+            async for frame_event in self.frames:
+                frame = frame_event.frame
+                if vad_stream is None:
+                    self._emit(frame)
+                    continue
+                try:
+                    vad_stream.push_frame(frame)
+                except Exception:
+                    pass
+                self._gate(frame)
+        finally:
+            self.counters.skipped += len(self._pre_roll)
+            self._pre_roll.clear()
+            self._end_segment()
+            self._segments.put_nowait(None)
+            # graceful close
+            if self._stt_stream is not None:
+                try:
+                    await self._stt_stream.aclose()
+                except Exception:
+                    pass
+            if vad_stream is not None:
+                try:
+                    await vad_stream.aclose()
+                except Exception:
+                    pass
+
+    async def _consume_vad(self, vad_stream: vad.VADStream):
+        try:
+            async for ev in vad_stream:
+                if ev.type == vad.VADEventType.START_OF_SPEECH:
+                    self._speaking = True
+                    self._post_roll_left = 0.0
+                    for frame in self._pre_roll:
+                        self._emit(frame)
+                    self._pre_roll.clear()
+                    self._pre_roll_s = 0.0
+                elif ev.type == vad.VADEventType.END_OF_SPEECH:
+                    self._speaking = False
+                    self._post_roll_left = self.post_roll_s
+                    if self._post_roll_left <= 0:
+                        self._end_segment()
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            # без VAD шлюз остаётся в последнем состоянии; лучше слать всё, чем терять речь
+            logger.exception("VAD consumer error for %s: %s", self.identity, e)
+            self._speaking = True
+
+    async def _recognize_segments(self):
+        while True:
+            segment = await self._segments.get()
+            if segment is None:
+                return
+            self.counters.segments += 1
+            try:
+                ev = await self.stt_plugin.recognize(rtc.combine_audio_frames(segment))
+            except Exception as e:
+                logger.exception("STT segment recognition failed for %s: %s", self.identity, e)
+                continue
+            text = ev.alternatives[0].text if ev.alternatives else ""
+            if text.strip():
+                print(f"[TRANSCR FINAL] {self.identity}: {text}")
+                await self.on_final(text)
+
+    async def _consume_stt(self, stt_stream: stt.SpeechStream):
+        try:
+            async for ev in stt_stream:
+                etype = getattr(ev, "type", None)
+                is_final = getattr(ev, "is_final", None)
+                if is_final is None:
+                    is_final = (etype and str(etype).lower().find("final") != -1)
+                text = None
+                if hasattr(ev, "alternatives") and ev.alternatives:
+                    text = getattr(ev.alternatives[0], "text", None)
+                if text is None and hasattr(ev, "text"):
+                    text = ev.text
+                if text is None:
+                    continue
+
+                if is_final:
+                    self.counters.segments += 1
+                    print(f"[TRANSCR FINAL] {self.identity}: {text}")
+                    await self.on_final(text)
+                else:
+                    print(f"[TRANSCR PART] {self.identity}: {text}")
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.exception("STT consumer error for %s: %s", self.identity, e)
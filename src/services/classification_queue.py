@@ -0,0 +1,137 @@
+"""
+Per-room queue between the STT consumers and speaker-role classification.
+
+STT consumers only enqueue final segments (with a sequence number) and go
+back to reading the stream, so LLM latency no longer back-pressures STT.
+A small pool of workers classifies segments concurrently (which also lets
+the role batcher group them), and results are released strictly in
+sequence order before they reach the session transcript.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from src.core.settings import settings
+from src.schemas.agent_output import MessageToRoleAgent
+from src.services.role_context import RoleContext
+
+logger = logging.getLogger(__name__)
+
+# classify(text, context, identity) -> сообщения с ролями
+ClassifyFn = Callable[[str, RoleContext, Optional[str]], Awaitable[list[MessageToRoleAgent]]]
+
+
+@dataclass
+class Segment:
+    seq: int
+    text: str
+    identity: Optional[str] = None
+
+
+class RoomClassificationQueue:
+    def __init__(
+        self,
+        classify: ClassifyFn,
+        on_result: Callable[[Segment, list[MessageToRoleAgent]], None],
+        context: Callable[[], RoleContext],
+        workers: int = settings.role_queue_workers,
+        maxsize: int = settings.role_queue_maxsize,
+    ):
+        self._classify = classify
+        self._on_result = on_result
+        self._context = context
+        self._queue: asyncio.Queue[Segment] = asyncio.Queue(maxsize=maxsize)
+        self._worker_count = max(1, workers)
+        self._workers: list[asyncio.Task] = []
+
+        self._next_seq = 0
+        self._next_release = 0
+        self._done: dict[int, tuple[Segment, list[MessageToRoleAgent]]] = {}
+        self._in_flight = 0
+
+        # метрики
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_depth = 0
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"role_classifier_{i}")
+            for i in range(self._worker_count)
+        ]
+
+    @property
+    def depth(self) -> int:
+        """Segments waiting for or undergoing classification, plus results held for reordering"""
+        return self._queue.qsize() + self._in_flight + len(self._done)
+
+    async def submit(self, text: str, identity: Optional[str] = None) -> Segment:
+        """Enqueue a final segment; waits only when the queue is full"""
+        segment = Segment(seq=-1, text=text, identity=identity)
+        if self._queue.full():
+            logger.warning("Role classification queue is full (%d), STT consumer is waiting", self._queue.maxsize)
+        await self._queue.put(segment)
+        # номер — только после успешной постановки: отменённое ожидание в полной очереди
+        # не оставляет дыру в seq, на которой _release остановился бы навсегда.
+        # Между put и этой строкой нет await, поэтому воркер видит уже номер
+        segment.seq = self._next_seq
+        self._next_seq += 1
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        logger.debug("Role classification queue depth: %d", self.depth)
+        return segment
+
+    async def _worker(self):
+        while True:
+            segment = await self._queue.get()
+            self._in_flight += 1
+            try:
+                messages = await self._classify(segment.text, self._context(), segment.identity)
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Role classification failed for segment %d (%s)", segment.seq, segment.identity)
+                messages = []
+                self.failed += 1
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
+            self._done[segment.seq] = (segment, messages)
+            self._release()
+
+    def _release(self):
+        # выдаём результаты строго по порядку seq
+        while self._next_release in self._done:
+            segment, messages = self._done.pop(self._next_release)
+            self._next_release += 1
+            try:
+                self._on_result(segment, messages)
+            except Exception:
+                logger.exception("Role classification result handler failed for segment %d", segment.seq)
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Wait until every submitted segment has been classified and released"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Role classification queue not drained in %ss, %d segments left", timeout, self.depth)
+
+    async def aclose(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
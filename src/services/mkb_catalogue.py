@@ -0,0 +1,269 @@
+"""
+In-memory MKB-10 catalogue with a parent -> children index.
+
+The catalogue is built once per process and shared by every MKB tool call.
+Rows are kept sorted by `code`, children are stored in CSR form
+(`child_offsets` / `child_rows`), so each level lookup touches only the
+children of the requested node instead of scanning the whole table.
+
+The tree follows the code prefixes (a row's parent is the longest code that
+is a proper prefix of its own), which is what the MKB tools filter by. The
+CSV `parent_id` is not used: a few rows point past their element straight
+at the block (e.g. C80.0 and C80.9 under block 0213 instead of 0213C80).
+
+At runtime the columns come from a memory-mapped snapshot of mkb10.csv
+(see src/services/mkb_snapshot.py), which is rebuilt when the CSV changes.
+Build it ahead of time with:
+
+    uv run python -m src.services.mkb_catalogue
+"""
+import bisect
+import csv
+import logging
+import re
+from array import array
+from functools import lru_cache
+from typing import NamedTuple, Optional, Sequence
+
+from src.services.mkb_snapshot import SnapshotColumns, csv_digest, open_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+MKB_CSV_PATH = "mkb10.csv"
+MKB_SNAPSHOT_PATH = "mkb10.snapshot"
+
+# Длина поля code на каждом уровне иерархии
+CLASS_CODE_LEN = 2
+BLOCK_CODE_LEN = 4
+ELEMENT_CODE_LEN = 7
+
+# Диапазон кодов в названии класса/блока, например "(A00-B99)"
+_CODE_RANGE_RE = re.compile(r"\(([A-Z0-9\-]+)\)")
+
+
+class MkbEntry(NamedTuple):
+    """Single catalogue row"""
+    row: int
+    code: str
+    mkb_code: Optional[str]
+    name: str
+
+    def as_record(self) -> dict:
+        """
+        Record in the shape returned by the MKB tools.
+
+        Classes and blocks have no own mkb_code, so the bracketed code range
+        from the name is used instead (e.g. "A00-B99").
+        """
+        mkb_code = self.mkb_code
+        if mkb_code is None and len(self.code) <= BLOCK_CODE_LEN:
+            match = _CODE_RANGE_RE.search(self.name)
+            mkb_code = match.group(1) if match else None
+        return {"code": self.code, "mkb_code": mkb_code, "name": self.name}
+
+
+class MkbCatalogue:
+    """
+    Read-only MKB-10 tree.
+
+    Columns are plain sequences indexed by row number; `child_offsets` has
+    one extra slot at position `len(codes)` for the virtual root, whose
+    children are the MKB classes.
+    """
+
+    def __init__(
+        self,
+        codes: Sequence[str],
+        mkb_codes: Sequence[str],
+        names: Sequence[str],
+        parents: Sequence[int],
+        child_offsets: Sequence[int],
+        child_rows: Sequence[int],
+    ):
+        self._codes = codes
+        self._mkb_codes = mkb_codes
+        self._names = names
+        self._parents = parents
+        self._child_offsets = child_offsets
+        self._child_rows = child_rows
+
+    @classmethod
+    def from_csv(cls, path: str = MKB_CSV_PATH) -> "MkbCatalogue":
+        """Parse mkb10.csv and build the sorted columns and children index"""
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = sorted(csv.DictReader(f), key=lambda r: r["code"])
+
+        parents = _prefix_parents([r["code"] for r in rows])
+        child_offsets, child_rows = _build_children_index(parents)
+
+        return cls(
+            codes=[r["code"] for r in rows],
+            mkb_codes=[r["mkb_code"] for r in rows],
+            names=[r["name"] for r in rows],
+            parents=parents,
+            child_offsets=child_offsets,
+            child_rows=child_rows,
+        )
+
+    @classmethod
+    def from_snapshot(cls, columns: SnapshotColumns) -> "MkbCatalogue":
+        return cls(*columns)
+
+    def write_snapshot(self, path: str, digest: bytes) -> None:
+        write_snapshot(
+            path,
+            digest,
+            self._codes,
+            self._mkb_codes,
+            self._names,
+            self._parents,
+            self._child_offsets,
+            self._child_rows,
+        )
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def entry(self, row: int) -> MkbEntry:
+        return MkbEntry(
+            row=row,
+            code=self._codes[row],
+            mkb_code=self._mkb_codes[row] or None,
+            name=self._names[row],
+        )
+
+    def find_row(self, code: str) -> Optional[int]:
+        """Row number for a catalogue `code` (binary search over sorted codes)"""
+        i = bisect.bisect_left(self._codes, code)
+        if i < len(self._codes) and self._codes[i] == code:
+            return i
+        return None
+
+    def get(self, code: str) -> Optional[MkbEntry]:
+        row = self.find_row(code)
+        return self.entry(row) if row is not None else None
+
+    def child_rows(self, row: Optional[int]) -> Sequence[int]:
+        """Direct children of `row`; `None` means the virtual root"""
+        slot = len(self._codes) if row is None else row
+        return self._child_rows[self._child_offsets[slot]:self._child_offsets[slot + 1]]
+
+    def children(self, code: Optional[str]) -> list[MkbEntry]:
+        if code is None:
+            return [self.entry(r) for r in self.child_rows(None)]
+        row = self.find_row(code)
+        if row is None:
+            return []
+        return [self.entry(r) for r in self.child_rows(row)]
+
+    def ancestors(self, row: int) -> list[MkbEntry]:
+        """Path from the class down to the parent of `row`"""
+        path = []
+        parent = self._parents[row]
+        while parent >= 0:
+            path.append(self.entry(parent))
+            parent = self._parents[parent]
+        path.reverse()
+        return path
+
+    # --- per-level views used by the MKB tools ---
+
+    def classes(self) -> list[MkbEntry]:
+        return [e for e in self.children(None) if len(e.code) == CLASS_CODE_LEN]
+
+    def blocks(self, class_code: str) -> list[MkbEntry]:
+        return [e for e in self.children(class_code) if len(e.code) == BLOCK_CODE_LEN]
+
+    def elements(self, block_code: str) -> list[MkbEntry]:
+        return [e for e in self.children(block_code) if len(e.code) == ELEMENT_CODE_LEN]
+
+    def details(self, element_code: str) -> list[MkbEntry]:
+        """All descendants of an element (codes longer than 7), in code order"""
+        if self.find_row(element_code) is None:
+            return []
+        # потомки элемента — непрерывный диапазон отсортированных кодов с его префиксом
+        start = bisect.bisect_right(self._codes, element_code)
+        stop = bisect.bisect_left(self._codes, element_code + "\x7f", lo=start)
+        return [self.entry(r) for r in range(start, stop) if len(self._codes[r]) > ELEMENT_CODE_LEN]
+
+
+def _prefix_parents(codes: Sequence[str]) -> array:
+    """Parent row of every row: the longest code that is a proper prefix of its code, -1 for none"""
+    row_by_code = {code: i for i, code in enumerate(codes)}
+    parents = array("i", [-1] * len(codes))
+    for row, code in enumerate(codes):
+        for length in range(len(code) - 1, 0, -1):
+            parent = row_by_code.get(code[:length])
+            if parent is not None:
+                parents[row] = parent
+                break
+    return parents
+
+
+def _build_children_index(parents: Sequence[int]) -> tuple[array, array]:
+    """
+    CSR children index: children of row i are
+    child_rows[child_offsets[i]:child_offsets[i + 1]], root slot is len(parents).
+    Children keep row (= code) order.
+    """
+    n = len(parents)
+    counts = [0] * (n + 1)
+    for p in parents:
+        counts[p if p >= 0 else n] += 1
+
+    child_offsets = array("i", [0] * (n + 2))
+    for slot in range(n + 1):
+        child_offsets[slot + 1] = child_offsets[slot] + counts[slot]
+
+    fill = list(child_offsets[:-1])
+    child_rows = array("i", [0] * n)
+    for row, p in enumerate(parents):
+        slot = p if p >= 0 else n
+        child_rows[fill[slot]] = row
+        fill[slot] += 1
+
+    return child_offsets, child_rows
+
+
+def load_catalogue(csv_path: str = MKB_CSV_PATH, snapshot_path: str = MKB_SNAPSHOT_PATH) -> MkbCatalogue:
+    """
+    Map the snapshot if it matches the CSV, otherwise rebuild it from the CSV.
+    Falls back to the in-memory catalogue when the snapshot can't be written.
+    """
+    digest = csv_digest(csv_path)
+    columns = open_snapshot(snapshot_path, digest)
+    if columns is not None:
+        return MkbCatalogue.from_snapshot(columns)
+
+    catalogue = MkbCatalogue.from_csv(csv_path)
+    try:
+        catalogue.write_snapshot(snapshot_path, digest)
+    except OSError as e:
+        logger.warning("Could not write MKB snapshot %s: %s", snapshot_path, e)
+        return catalogue
+
+    columns = open_snapshot(snapshot_path, digest)
+    return MkbCatalogue.from_snapshot(columns) if columns is not None else catalogue
+
+
+@lru_cache(maxsize=1)
+def get_catalogue() -> MkbCatalogue:
+    """Process-wide catalogue, loaded on first use"""
+    return load_catalogue()
+
+
+def normalize_code(code: int | str, width: int = 0) -> str:
+    """
+    Normalize a code coming from the LLM: strip spaces and restore leading
+    zeros lost when a numeric code was passed as int (1 -> "01").
+    """
+    code = str(code).strip()
+    if width and code.isdigit():
+        code = code.zfill(width)
+    return code
+
+
+if __name__ == "__main__":
+    catalogue = MkbCatalogue.from_csv(MKB_CSV_PATH)
+    catalogue.write_snapshot(MKB_SNAPSHOT_PATH, csv_digest(MKB_CSV_PATH))
+    print(f"Wrote {MKB_SNAPSHOT_PATH}: {len(catalogue)} rows")
@@ -0,0 +1,164 @@
+"""
+Local fuzzy search over MKB-10 names.
+
+Names are normalized (lower case, ё -> е, punctuation dropped), split into
+tokens and reduced to crude Russian stems by stripping inflection endings.
+An inverted index maps stems to catalogue rows; a trigram index over the stem
+vocabulary lets misspelled or differently inflected query words match too.
+Results are ranked by idf-weighted query coverage and carry the full
+class -> block -> element path, so the model gets candidate codes in one call.
+"""
+import math
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import NamedTuple
+
+from src.services.mkb_catalogue import MkbCatalogue, MkbEntry, get_catalogue
+
+# Слова и коды МКБ ("j20.0" остаётся одним токеном)
+_TOKEN_RE = re.compile(r"[0-9a-zа-я]+(?:\.[0-9]+)?")
+
+_STOP_WORDS = {
+    "и", "в", "во", "на", "с", "со", "по", "при", "или", "от", "до", "из",
+    "к", "у", "о", "об", "без", "для", "не", "как", "что", "так", "другие",
+    "других", "другой", "другая", "другое",
+}
+
+# Окончания, отсекаемые при стемминге, сгруппированы по длине (длинные проверяются первыми)
+_ENDINGS = {
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией",
+    "ий", "ый", "ой", "ая", "яя", "ое", "ее", "ые", "ие", "ых", "их", "ую",
+    "юю", "ов", "ев", "ей", "ам", "ям", "ах", "ях", "ом", "ем", "ия", "ию",
+    "а", "я", "ы", "и", "о", "е", "у", "ю", "ь",
+}
+_ENDING_LENGTHS = sorted({len(e) for e in _ENDINGS}, reverse=True)
+_MIN_STEM_LEN = 3
+
+# Минимальная похожесть (коэффициент Дайса по триграммам) для нечёткого совпадения
+FUZZY_THRESHOLD = 0.6
+
+
+class MkbSearchHit(NamedTuple):
+    entry: MkbEntry
+    score: float
+    path: list[MkbEntry]
+
+    def as_record(self) -> dict:
+        record = self.entry.as_record()
+        record["score"] = round(self.score, 3)
+        record["path"] = [p.as_record() for p in self.path]
+        return record
+
+
+def normalize_text(text: str) -> list[str]:
+    """Lower-case, fold ё, tokenize and drop stop words"""
+    text = text.lower().replace("ё", "е")
+    return [t for t in _TOKEN_RE.findall(text) if t not in _STOP_WORDS]
+
+
+@lru_cache(maxsize=None)
+def stem(token: str) -> str:
+    if token.isdigit():
+        return token
+    for length in _ENDING_LENGTHS:
+        if len(token) - length >= _MIN_STEM_LEN and token[-length:] in _ENDINGS:
+            return token[:-length]
+    return token
+
+
+def _trigrams(term: str) -> set[str]:
+    padded = f" {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MkbSearchIndex:
+    """Inverted index over the `name` column of rows that have an mkb_code"""
+
+    def __init__(self, catalogue: MkbCatalogue):
+        self._catalogue = catalogue
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        self._row_terms: dict[int, int] = {}
+
+        for row in range(len(catalogue)):
+            entry = catalogue.entry(row)
+            if entry.mkb_code is None:
+                continue
+            terms = {stem(t) for t in normalize_text(entry.name)}
+            # Код МКБ тоже ищется: "J20", "J20.0"
+            terms.add(entry.mkb_code.lower())
+            self._row_terms[row] = len(terms)
+            for term in terms:
+                self._postings[term].append(row)
+
+        total = len(self._row_terms)
+        self._idf = {term: math.log(1 + total / len(rows)) for term, rows in self._postings.items()}
+
+        self._trigram_index: dict[str, list[str]] = defaultdict(list)
+        self._trigram_counts: dict[str, int] = {}
+        for term in self._postings:
+            grams = _trigrams(term)
+            self._trigram_counts[term] = len(grams)
+            for gram in grams:
+                self._trigram_index[gram].append(term)
+
+    def similar_terms(self, term: str) -> dict[str, float]:
+        """Vocabulary terms similar to `term` with their Dice similarity"""
+        if term in self._postings:
+            return {term: 1.0}
+        grams = _trigrams(term)
+        shared: dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigram_index.get(gram, ()):
+                shared[candidate] += 1
+        result = {}
+        for candidate, common in shared.items():
+            similarity = 2 * common / (len(grams) + self._trigram_counts[candidate])
+            if similarity >= FUZZY_THRESHOLD:
+                result[candidate] = similarity
+        return result
+
+    def search(self, query: str, top_k: int = 10) -> list[MkbSearchHit]:
+        query_terms = list(dict.fromkeys(stem(t) for t in normalize_text(query)))
+        if not query_terms:
+            return []
+
+        # row -> вклад каждого слова запроса (лучшее совпадение)
+        row_weights: dict[int, list[float]] = defaultdict(lambda: [0.0] * len(query_terms))
+        row_matched: dict[int, set[str]] = defaultdict(set)
+        max_weights = [0.0] * len(query_terms)
+        for i, q in enumerate(query_terms):
+            for term, similarity in self.similar_terms(q).items():
+                weight = similarity * self._idf[term]
+                max_weights[i] = max(max_weights[i], weight)
+                for row in self._postings[term]:
+                    weights = row_weights[row]
+                    if weight > weights[i]:
+                        weights[i] = weight
+                    row_matched[row].add(term)
+
+        total_weight = sum(max_weights)
+        if total_weight == 0:
+            return []
+
+        scored = []
+        for row, weights in row_weights.items():
+            query_coverage = sum(weights) / total_weight
+            name_coverage = len(row_matched[row]) / self._row_terms[row]
+            scored.append((0.8 * query_coverage + 0.2 * name_coverage, row))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+
+        return [
+            MkbSearchHit(
+                entry=self._catalogue.entry(row),
+                score=score,
+                path=self._catalogue.ancestors(row),
+            )
+            for score, row in scored[:top_k]
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_search_index() -> MkbSearchIndex:
+    """Process-wide search index, built on first use"""
+    return MkbSearchIndex(get_catalogue())
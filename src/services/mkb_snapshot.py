@@ -0,0 +1,153 @@
+"""
+Compact binary snapshot of the MKB-10 catalogue.
+
+Layout (native byte order, all int sections are int32):
+
+    header        magic, version, byte order, rows, blob size, sha256(mkb10.csv)
+    code_offsets  rows + 1   byte offsets of `code` strings in the blob
+    mkb_offsets   rows + 1   byte offsets of `mkb_code` strings
+    name_offsets  rows + 1   byte offsets of `name` strings
+    parents       rows       parent row or -1
+    child_offsets rows + 2   CSR children index (last slot is the virtual root)
+    child_rows    rows
+    blob                     utf-8 strings of all three columns
+
+The file is memory-mapped read-only, so every worker process on a host shares
+the same page cache and nothing is parsed at startup. A snapshot whose version,
+byte order or CSV hash does not match is treated as missing.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from typing import NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"MKBSNAP\x00"
+# 2: дерево по префиксам кодов вместо parent_id из CSV
+SNAPSHOT_VERSION = 2
+
+_HEADER = struct.Struct("=8sIIII32s")
+_BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+_INT_SIZE = array("i").itemsize
+
+
+class StringColumn(Sequence[str]):
+    """Read-only string column decoded on access from the shared blob"""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+
+class SnapshotColumns(NamedTuple):
+    codes: StringColumn
+    mkb_codes: StringColumn
+    names: StringColumn
+    parents: memoryview
+    child_offsets: memoryview
+    child_rows: memoryview
+
+
+def csv_digest(csv_path: str) -> bytes:
+    """sha256 of the source CSV, stored in the header to detect stale snapshots"""
+    with open(csv_path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def write_snapshot(
+    path: str,
+    digest: bytes,
+    codes: Sequence[str],
+    mkb_codes: Sequence[str],
+    names: Sequence[str],
+    parents: Sequence[int],
+    child_offsets: Sequence[int],
+    child_rows: Sequence[int],
+) -> None:
+    """Serialize catalogue columns; the file is replaced atomically"""
+    rows = len(codes)
+    encoded = [s.encode("utf-8") for column in (codes, mkb_codes, names) for s in column]
+    ends = list(accumulate(len(b) for b in encoded))
+    starts = [0] + ends
+
+    sections = [
+        array("i", starts[0:rows + 1]),
+        array("i", starts[rows:2 * rows + 1]),
+        array("i", starts[2 * rows:3 * rows + 1]),
+        array("i", parents),
+        array("i", child_offsets),
+        array("i", child_rows),
+    ]
+    blob = b"".join(encoded)
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, _BYTE_ORDER, rows, len(blob), digest)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            for section in sections:
+                section.tofile(f)
+            f.write(blob)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def open_snapshot(path: str, digest: bytes) -> Optional[SnapshotColumns]:
+    """Memory-map a snapshot; returns None if it is missing or stale"""
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if len(mm) < _HEADER.size:
+        return None
+    magic, version, byte_order, rows, blob_size, stored_digest = _HEADER.unpack_from(mm, 0)
+    if (
+        magic != SNAPSHOT_MAGIC
+        or version != SNAPSHOT_VERSION
+        or byte_order != _BYTE_ORDER
+        or stored_digest != digest
+    ):
+        logger.info("MKB snapshot %s is stale, it will be rebuilt", path)
+        return None
+
+    lengths = [rows + 1, rows + 1, rows + 1, rows, rows + 2, rows]
+    expected_size = _HEADER.size + sum(lengths) * _INT_SIZE + blob_size
+    if len(mm) != expected_size:
+        logger.warning("MKB snapshot %s is truncated, it will be rebuilt", path)
+        return None
+
+    view = memoryview(mm)
+    sections = []
+    pos = _HEADER.size
+    for length in lengths:
+        sections.append(view[pos:pos + length * _INT_SIZE].cast("i"))
+        pos += length * _INT_SIZE
+    blob = view[pos:pos + blob_size]
+
+    code_offsets, mkb_offsets, name_offsets, parents, child_offsets, child_rows = sections
+    return SnapshotColumns(
+        codes=StringColumn(blob, code_offsets),
+        mkb_codes=StringColumn(blob, mkb_offsets),
+        names=StringColumn(blob, name_offsets),
+        parents=parents,
+        child_offsets=child_offsets,
+        child_rows=child_rows,
+    )
@@ -0,0 +1,105 @@
+"""
+Deterministic MKB-10 code validation for generated protocols.
+
+Codes produced by the summary agent are normalized (Cyrillic lookalike
+letters, missing dots, stray spaces/asterisks), looked up in a
+code -> row hash index built from the catalogue, and replaced by their
+canonical form with the catalogue name attached. Unknown codes are kept as
+is, flagged in `metadata.flags` and recorded in the audit log.
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+from src.schemas.protocol import AuditLogEntry, MedicalProtocol
+from src.services.mkb_catalogue import MkbEntry, get_catalogue
+
+# Кириллические буквы, внешне совпадающие с латинскими буквами кодов МКБ
+_LOOKALIKES = str.maketrans({
+    "А": "A", "В": "B", "С": "C", "Е": "E", "Н": "H", "К": "K", "М": "M",
+    "О": "O", "Р": "P", "Т": "T", "Х": "X", "У": "Y", "І": "I", "Ј": "J",
+    "З": "3",
+})
+_CODE_RE = re.compile(r"^([A-Z])(\d{2})(?:\.?(\d{1,2}))?$")
+
+UNKNOWN_CODE_FLAG = "unknown_icd10"
+
+
+def normalize_icd10(raw: str) -> str:
+    """
+    Bring a code to the catalogue format: 'а15,1 ' -> 'A15.1', 'J200' -> 'J20.0'.
+    Strings that don't look like an MKB-10 code are returned stripped/upper-cased.
+    """
+    code = raw.strip().upper().translate(_LOOKALIKES)
+    code = re.sub(r"[\s*+†]", "", code).replace(",", ".").rstrip(".")
+    match = _CODE_RE.match(code)
+    if not match:
+        return code
+    letter, category, subcode = match.groups()
+    return f"{letter}{category}.{subcode}" if subcode else f"{letter}{category}"
+
+
+@lru_cache(maxsize=1)
+def _code_index() -> dict[str, int]:
+    """mkb_code -> catalogue row"""
+    catalogue = get_catalogue()
+    index = {}
+    for row in range(len(catalogue)):
+        entry = catalogue.entry(row)
+        if entry.mkb_code:
+            index.setdefault(entry.mkb_code, row)
+    return index
+
+
+def resolve_icd10(raw: Optional[str]) -> Optional[MkbEntry]:
+    """Catalogue entry for a (possibly malformed) code, or None if unknown"""
+    if not raw:
+        return None
+    row = _code_index().get(normalize_icd10(raw))
+    return get_catalogue().entry(row) if row is not None else None
+
+
+def validate_protocol_codes(protocol: MedicalProtocol) -> MedicalProtocol:
+    """
+    Canonicalize every MKB-10 code in the protocol in place and attach names.
+    Returns the same protocol for chaining.
+    """
+    unknown: list[str] = []
+
+    def _check(raw: str, where: str) -> Optional[MkbEntry]:
+        entry = resolve_icd10(raw)
+        if entry is None:
+            unknown.append(raw)
+            protocol.audit_log.append(AuditLogEntry(
+                timestamp=datetime.now(),
+                action="icd10 not found",
+                detail=f"{where}: {raw}",
+            ))
+        elif entry.mkb_code != raw:
+            protocol.audit_log.append(AuditLogEntry(
+                timestamp=datetime.now(),
+                action="icd10 normalized",
+                detail=f"{where}: {raw} -> {entry.mkb_code}",
+            ))
+        return entry
+
+    for diagnosis in [*protocol.preliminary_diagnosis, *protocol.differential_diagnosis]:
+        if not diagnosis.icd10:
+            continue
+        entry = _check(diagnosis.icd10, "diagnosis")
+        if entry is not None:
+            diagnosis.icd10 = entry.mkb_code
+            diagnosis.icd10_name = entry.name
+
+    if protocol.anamnesis_vitae:
+        chronic = []
+        for raw in protocol.anamnesis_vitae.chronic_diseases:
+            entry = _check(raw, "chronic_diseases")
+            chronic.append(entry.mkb_code if entry is not None else raw)
+        protocol.anamnesis_vitae.chronic_diseases = chronic
+
+    if unknown and UNKNOWN_CODE_FLAG not in protocol.metadata.flags:
+        protocol.metadata.flags.append(UNKNOWN_CODE_FLAG)
+
+    return protocol
@@ -0,0 +1,255 @@
+"""
+Per-room notification hub (e.g. "protocol ready") for the API.
+
+The hub is an in-process broker: SSE / WebSocket subscribers of a room get
+events from a bounded queue, and the last event of each room is retained so
+a client that subscribes after the protocol was finished still gets it
+immediately. Events reach the hub through a pluggable backend:
+
+- "memory": publish delivers straight to the hub of the same process;
+- "file": events are small JSON files in `notification_dir` (the output
+  volume shared by the transcription worker and every uvicorn worker). Each
+  API process lists the directory every `notification_poll_interval_s` —
+  one listdir per process instead of every client polling /api/protocol —
+  and files older than `notification_retention_s` are removed.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Callable, Optional, Protocol
+from urllib.parse import quote
+
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_READY = "protocol_ready"
+
+
+@dataclass
+class Event:
+    room_name: str
+    type: str
+    data: dict = field(default_factory=dict)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    timestamp: float = field(default_factory=time.time)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+
+class NotificationBackend(Protocol):
+    async def publish(self, event: Event): ...
+
+    async def start(self, deliver: Callable[[Event], None]): ...
+
+    async def aclose(self): ...
+
+
+class InProcessBackend:
+    """Single process: publish delivers directly"""
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[Event], None]] = None
+
+    async def publish(self, event: Event):
+        if self._deliver is not None:
+            self._deliver(event)
+
+    async def start(self, deliver: Callable[[Event], None]):
+        self._deliver = deliver
+
+    async def aclose(self):
+        self._deliver = None
+
+
+class FileBackend:
+    """Events as files in a directory shared by all processes"""
+
+    def __init__(
+        self,
+        directory: str = settings.notification_dir,
+        poll_interval_s: float = settings.notification_poll_interval_s,
+        retention_s: float = settings.notification_retention_s,
+    ):
+        self.directory = directory
+        self.poll_interval_s = poll_interval_s
+        self.retention_s = retention_s
+        self._seen: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def _write(self, event: Event):
+        os.makedirs(self.directory, exist_ok=True)
+        # имя начинается со времени в нс — сортировка по имени даёт порядок публикации
+        name = f"{time.time_ns():020d}-{event.id}.json"
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(event.to_json())
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    async def publish(self, event: Event):
+        await asyncio.to_thread(self._write, event)
+
+    def _scan(self) -> list[Event]:
+        try:
+            names = sorted(n for n in os.listdir(self.directory) if n.endswith(".json") and not n.startswith("."))
+        except FileNotFoundError:
+            return []
+        cutoff_ns = time.time_ns() - int(self.retention_s * 1e9)
+        events = []
+        for name in names:
+            if name in self._seen:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if int(name.split("-", 1)[0]) < cutoff_ns:
+                    os.remove(path)
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    events.append(Event(**json.load(f)))
+            except FileNotFoundError:
+                continue
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Skipping malformed notification {name}: {e}")
+            self._seen.add(name)
+        # забываем удалённые файлы, чтобы множество не росло
+        self._seen.intersection_update(names)
+        return events
+
+    async def _poll(self, deliver: Callable[[Event], None]):
+        while True:
+            try:
+                for event in await asyncio.to_thread(self._scan):
+                    deliver(event)
+            except Exception:
+                logger.exception("Notification poll failed")
+            await asyncio.sleep(self.poll_interval_s)
+
+    async def start(self, deliver: Callable[[Event], None]):
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll(deliver), name="notification_poll")
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class Subscription:
+    def __init__(self, hub: "NotificationHub", room_name: str, maxsize: int):
+        self.hub = hub
+        self.room_name = room_name
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event: Event):
+        if self.queue.full():
+            # медленный клиент: теряем самое старое, а не последнее событие
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc):
+        self.hub.unsubscribe(self)
+
+
+class NotificationHub:
+    def __init__(self, backend: NotificationBackend, retained_rooms: int = 1024, queue_size: int = 16):
+        self.backend = backend
+        self.retained_rooms = retained_rooms
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._last: OrderedDict[str, Event] = OrderedDict()
+
+        # метрики
+        self.published = 0
+        self.delivered = 0
+
+    async def start(self):
+        await self.backend.start(self._deliver)
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+    async def publish(self, event: Event):
+        self.published += 1
+        await self.backend.publish(event)
+
+    def _deliver(self, event: Event):
+        self._last[event.room_name] = event
+        self._last.move_to_end(event.room_name)
+        while len(self._last) > self.retained_rooms:
+            self._last.popitem(last=False)
+        for subscription in self._subscribers.get(event.room_name, ()):
+            subscription.put(event)
+            self.delivered += 1
+
+    def subscribe(self, room_name: str, replay: bool = True) -> Subscription:
+        """Use as `with hub.subscribe(room) as sub:`; replays the room's last event"""
+        subscription = Subscription(self, room_name, self.queue_size)
+        self._subscribers.setdefault(room_name, set()).add(subscription)
+        last = self._last.get(room_name)
+        if replay and last is not None:
+            subscription.put(last)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.room_name)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.room_name]
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "delivered": self.delivered,
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "retained_rooms": len(self._last),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_notification_backend() -> NotificationBackend:
+    if settings.notification_backend == "memory":
+        return InProcessBackend()
+    if settings.notification_backend == "file":
+        return FileBackend()
+    raise ValueError(f"Unknown notification backend: {settings.notification_backend}")
+
+
+@lru_cache(maxsize=1)
+def get_notification_hub() -> NotificationHub:
+    return NotificationHub(get_notification_backend())
+
+
+async def publish_protocol_ready(room_name: str, key: str):
+    """
+    Called by the summary pipeline once the final protocol is saved under
+    storage `key` (`<room>/medical_protocol.txt`); "file" is the object name
+    within the room, "key" the full storage key.
+    """
+    event = Event(
+        room_name=room_name,
+        type=PROTOCOL_READY,
+        data={"url": f"/api/protocol?room_name={quote(room_name)}", "file": key.rsplit("/", 1)[-1], "key": key},
+    )
+    try:
+        await get_notification_hub().publish(event)
+    except Exception as e:
+        # уведомление не критично: протокол уже на диске и доступен через /api/protocol
+        logger.warning(f"Failed to publish protocol_ready for {room_name}: {e}")
@@ -1,21 +1,76 @@
 from src.agents.role_agent import process_transcript
 from src.agents.role_validator_agent import validate_enhance_role_messages
-from src.agents.summary_agent import generate_summary_of_transcript_with_roles
-from src.utils.file_saver import save_protocol_as_txt
+from src.agents.summary_agent import stream_summary_of_transcript_with_roles
+from src.services.mkb_validator import validate_protocol_codes
+from src.services.notifications import publish_protocol_ready
+from src.services.protocol_renderer import get_protocol_renderer
+from src.utils.file_saver import render_protocol_section
+from src.utils.storage import get_storage, room_key
+from src.core.settings import settings
 from src.schemas.agent_output import MessageToRoleAgent
+from src.schemas.protocol import MedicalProtocol
 
+from typing import Awaitable, Callable, Optional
 import json
 
-async def generate_summary(transcript: list[MessageToRoleAgent],  header_data: dict, client: str = "default"):
-    with open("output/transcript.json", "w", encoding="utf-8") as f:
-        f.write(json.dumps([msg.model_dump() for msg in transcript], ensure_ascii=False, indent=2))
+# on_section(section, text, data): готовый раздел протокола — название поля, текст и JSON раздела
+SectionCallback = Callable[[str, str, object], Awaitable[None]]
+
+async def generate_summary(
+    transcript: list[MessageToRoleAgent],
+    header_data: dict,
+    client: str = "default",
+    on_section: Optional[SectionCallback] = None,
+    previous: Optional[MedicalProtocol] = None,
+    summarized_upto: int = 0,
+):
+    """
+    Generate, validate and save the protocol for a finished consultation.
+    `previous` is a rolling-summary draft covering the first `summarized_upto`
+    messages of the transcript; only the rest is sent to the model.
+    """
+    storage = get_storage()
+    await storage.put(
+        room_key(client, "transcript.json"),
+        json.dumps([msg.model_dump() for msg in transcript], ensure_ascii=False, indent=2),
+    )
         
     # validated_transcript = await validate_enhance_role_messages(transcript)
     
     # with open("output/validated_transcript.json", "w", encoding="utf-8") as f:
     #     f.write(json.dumps([msg.model_dump() for msg in validated_transcript], ensure_ascii=False, indent=2))
-        
-    summary = await generate_summary_of_transcript_with_roles(transcript)
-    save_protocol_as_txt(summary, "output", header_data=header_data, client=client)
 
-    return summary
\ No newline at end of file
+    done_sections: list[str] = []
+    renderer = get_protocol_renderer()
+
+    async def _on_section(section: str, partial: MedicalProtocol):
+        # Файл протокола дописывается по мере готовности разделов
+        done_sections.append(section)
+        if section in ("preliminary_diagnosis", "differential_diagnosis", "anamnesis_vitae"):
+            # коды показываем уже проверенными, но на копии: итоговый протокол
+            # проверяется один раз, без повторных записей в audit_log
+            partial = validate_protocol_codes(partial.model_copy(deep=True))
+        await renderer.save(partial, header_data=header_data, client=client, sections=done_sections, partial=True)
+        if on_section is not None:
+            text = render_protocol_section(partial, section, header_data)
+            data = getattr(partial, section)
+            data = [item.model_dump(mode="json") for item in data] if isinstance(data, list) else (
+                data.model_dump(mode="json") if data is not None else None
+            )
+            await on_section(section, text, data)
+
+    summary = await stream_summary_of_transcript_with_roles(
+        transcript[summarized_upto:] if previous is not None else transcript,
+        _on_section,
+        previous=previous,
+    )
+    summary = validate_protocol_codes(summary)
+    await storage.put(room_key(client, "summary.json"), summary.model_dump_json(indent=2))
+    keys = await renderer.save(
+        summary, header_data=header_data, client=client, formats=["txt", *settings.protocol_formats]
+    )
+    # клиенты ждут это событие по SSE/WebSocket вместо опроса /api/protocol
+    if "txt" in keys:
+        await publish_protocol_ready(client, keys["txt"])
+
+    return summary
@@ -0,0 +1,228 @@
+"""
+Protocol documents in several formats, rendered off the event loop.
+
+All formats are built from the same section templates
+(file_saver.PROTOCOL_SECTIONS: title + body lines per MedicalProtocol field):
+
+- txt:  the plain-text protocol served by GET /api/protocol;
+- html: a standalone page from string.Template templates compiled once at import;
+- pdf:  reportlab platypus; fonts and paragraph styles are set up once per process.
+
+ProtocolRenderer.save renders txt/html in a thread pool and PDF in a small
+process pool — reportlab is pure Python and holds the GIL, so even a thread
+would stall the LiveKit worker's event loop while a document is laid out.
+The documents are written atomically to the room's prefix in session storage.
+"""
+import asyncio
+import html
+import io
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from string import Template
+from typing import Iterable, Optional
+
+from src.core.settings import settings
+from src.schemas.protocol import MedicalProtocol
+from src.utils.file_saver import iter_protocol_sections, protocol_txt_lines
+from src.utils.storage import Storage, get_storage, protocol_key
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("txt", "html", "pdf")
+DOCUMENT_TITLE = "Протокол первичного осмотра"
+
+_HTML_PAGE = Template("""<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+body { font-family: "DejaVu Sans", Arial, sans-serif; max-width: 50em; margin: 2em auto; line-height: 1.4; }
+h1 { font-size: 1.4em; }
+h2 { font-size: 1.1em; margin: 1.2em 0 0.3em; }
+p { margin: 0.15em 0; }
+.meta { color: #555; }
+</style>
+</head>
+<body>
+<h1>$title</h1>
+$meta$sections</body>
+</html>
+""")
+_HTML_SECTION = Template('<section id="$name">\n$heading$body</section>\n')
+
+
+def _html_lines(lines: Iterable[str], css_class: str = "") -> str:
+    attr = f' class="{css_class}"' if css_class else ""
+    return "".join(f"<p{attr}>{html.escape(line.strip())}</p>\n" for line in lines if line.strip())
+
+
+def render_txt(protocol: MedicalProtocol, header_data: dict, sections: Optional[Iterable[str]] = None) -> str:
+    return "\n".join(protocol_txt_lines(protocol, header_data, sections))
+
+
+def render_html(protocol: MedicalProtocol, header_data: dict, sections: Optional[Iterable[str]] = None) -> str:
+    body = []
+    for name, title, lines in iter_protocol_sections(protocol, header_data, sections):
+        heading = f"<h2>{html.escape(title.rstrip(':'))}</h2>\n" if title else ""
+        body.append(_HTML_SECTION.substitute(name=name, heading=heading, body=_html_lines(lines)))
+    meta = [header_data.get("institution"), header_data.get("report_date")]
+    return _HTML_PAGE.substitute(
+        title=html.escape(DOCUMENT_TITLE),
+        meta=_html_lines([", ".join(str(m) for m in meta if m)], "meta"),
+        sections="".join(body),
+    )
+
+
+@lru_cache(maxsize=1)
+def _pdf_styles() -> dict:
+    """Fonts (Cyrillic needs a TTF font) and paragraph styles, once per process"""
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    regular, bold = "Helvetica", "Helvetica-Bold"
+    try:
+        pdfmetrics.registerFont(TTFont("ProtocolSans", settings.pdf_font_path))
+        pdfmetrics.registerFont(TTFont("ProtocolSans-Bold", settings.pdf_font_bold_path))
+        regular, bold = "ProtocolSans", "ProtocolSans-Bold"
+    except Exception as e:
+        logger.warning(f"PDF font not available ({e}), falling back to Helvetica: Cyrillic will not render")
+
+    return {
+        "title": ParagraphStyle("title", fontName=bold, fontSize=15, leading=19, spaceAfter=6),
+        "meta": ParagraphStyle("meta", fontName=regular, fontSize=9, leading=12, spaceAfter=8),
+        "heading": ParagraphStyle("heading", fontName=bold, fontSize=11.5, leading=15, spaceBefore=8, spaceAfter=3),
+        "body": ParagraphStyle("body", fontName=regular, fontSize=10, leading=13.5),
+    }
+
+
+def render_pdf(protocol: MedicalProtocol, header_data: dict, sections: Optional[Iterable[str]] = None) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+    styles = _pdf_styles()
+    story = [Paragraph(html.escape(DOCUMENT_TITLE), styles["title"])]
+    meta = ", ".join(str(m) for m in (header_data.get("institution"), header_data.get("report_date")) if m)
+    if meta:
+        story.append(Paragraph(html.escape(meta), styles["meta"]))
+    for _, title, lines in iter_protocol_sections(protocol, header_data, sections):
+        if title:
+            story.append(Paragraph(html.escape(title.rstrip(":")), styles["heading"]))
+        story.extend(Paragraph(html.escape(line.strip()), styles["body"]) for line in lines if line.strip())
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4, title=DOCUMENT_TITLE,
+        leftMargin=20 * mm, rightMargin=15 * mm, topMargin=15 * mm, bottomMargin=15 * mm,
+    )
+    doc.build(story)
+    return buffer.getvalue()
+
+
+RENDERERS = {"txt": render_txt, "html": render_html, "pdf": render_pdf}
+
+
+def render_document(
+    protocol: MedicalProtocol,
+    fmt: str,
+    header_data: dict,
+    sections: Optional[list[str]] = None,
+) -> bytes:
+    """Render one format; runs in a pool worker (module-level so it pickles)"""
+    document = RENDERERS[fmt](protocol, header_data, sections)
+    return document.encode("utf-8") if isinstance(document, str) else document
+
+
+class ProtocolRenderer:
+    def __init__(
+        self,
+        threads: int = settings.renderer_threads,
+        pdf_processes: int = settings.renderer_pdf_processes,
+        storage: Optional[Storage] = None,
+    ):
+        self.storage = storage or get_storage()
+        self._threads = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="protocol_render")
+        self._pdf_processes = pdf_processes
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+        # метрики
+        self.rendered: dict[str, int] = {fmt: 0 for fmt in FORMATS}
+        self.failed: dict[str, int] = {fmt: 0 for fmt in FORMATS}
+        self._render_s_total: dict[str, float] = {fmt: 0.0 for fmt in FORMATS}
+
+    def _executor(self, fmt: str) -> Executor:
+        if fmt != "pdf" or self._pdf_processes <= 0:
+            return self._threads
+        if self._processes is None:
+            # spawn: процесс задачи LiveKit многопоточный, fork из него небезопасен
+            self._processes = ProcessPoolExecutor(
+                max_workers=self._pdf_processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._processes
+
+    async def save(
+        self,
+        protocol: MedicalProtocol,
+        header_data: dict,
+        client: str = "default",
+        formats: Iterable[str] = ("txt",),
+        sections: Optional[Iterable[str]] = None,
+        partial: bool = False,
+    ) -> dict[str, str]:
+        """
+        Render the requested formats concurrently; returns format -> storage key.
+        A format that fails is logged and left out, so a broken PDF setup
+        does not lose the text protocol. `partial` documents (sections still
+        streaming) go under their own keys and never replace the final one.
+        """
+        loop = asyncio.get_running_loop()
+        sections = list(sections) if sections is not None else None
+        formats = list(dict.fromkeys(formats))
+        for fmt in formats:
+            if fmt not in RENDERERS:
+                raise ValueError(f"Unknown protocol format: {fmt}")
+
+        async def one(fmt: str) -> Optional[str]:
+            started = time.perf_counter()
+            key = protocol_key(client, fmt, partial=partial)
+            try:
+                document = await loop.run_in_executor(
+                    self._executor(fmt), render_document, protocol, fmt, header_data, sections
+                )
+                await self.storage.put(key, document)
+            except Exception:
+                self.failed[fmt] += 1
+                logger.exception(f"Failed to render {fmt} protocol for {client}")
+                return None
+            self.rendered[fmt] += 1
+            self._render_s_total[fmt] += time.perf_counter() - started
+            return key
+
+        keys = await asyncio.gather(*(one(fmt) for fmt in formats))
+        return {fmt: key for fmt, key in zip(formats, keys) if key is not None}
+
+    def close(self):
+        self._threads.shutdown(wait=False)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+    def stats(self) -> dict:
+        return {
+            fmt: {
+                "rendered": n,
+                "failed": self.failed[fmt],
+                "avg_ms": round(self._render_s_total[fmt] / n * 1000, 1) if n else 0.0,
+            }
+            for fmt, n in self.rendered.items() if n or self.failed[fmt]
+        }
+
+
+@lru_cache(maxsize=1)
+def get_protocol_renderer() -> ProtocolRenderer:
+    return ProtocolRenderer()
@@ -0,0 +1,205 @@
+"""
+Local speaker-role classifiers tried before the role agent.
+
+- identity tier: participant identity (exact or prefix match, configured in
+  settings.role_identity_map) -> role, for rooms where doctor and patient
+  join from separate devices;
+- lexical tier: multinomial naive Bayes over word unigrams/bigrams, trained
+  offline from saved transcripts (output/rooms/<room>/transcript.json files).
+
+Both return a RoleGuess with a confidence, or None when they have no opinion;
+the caller decides whether the confidence is high enough to skip the LLM.
+
+    uv run python -m src.services.role_classifier train output/rooms/*/transcript.json --out role_model.json
+    uv run python -m src.services.role_classifier evaluate output/rooms/*/transcript.json
+"""
+import argparse
+import json
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, NamedTuple, Optional
+
+from src.core.settings import settings
+from src.schemas.agent_output import MessageToRoleAgent
+
+DOCTOR = "DOCTOR"
+PATIENT = "PATIENT"
+ROLES = (DOCTOR, PATIENT)
+
+MODEL_VERSION = 1
+
+# Слова на русском/казахском/английском; пунктуация кроме "?" отбрасывается
+_TOKEN_RE = re.compile(r"[0-9a-zа-яәіңғүұқөһ]+")
+
+
+class RoleGuess(NamedTuple):
+    role: str
+    confidence: float
+
+
+class IdentityRoleClassifier:
+    """Maps a participant identity (exact or by prefix, case-insensitive) to a role"""
+
+    def __init__(self, mapping: dict[str, str]):
+        self.mapping = {}
+        for identity, role in mapping.items():
+            role = role.upper()
+            if role not in ROLES:
+                raise ValueError(f"Unknown role {role!r} for identity {identity!r}")
+            self.mapping[identity.lower()] = role
+        # длинные префиксы проверяются первыми
+        self._prefixes = sorted(self.mapping, key=len, reverse=True)
+
+    def __bool__(self) -> bool:
+        return bool(self.mapping)
+
+    def classify(self, text: str, identity: Optional[str]) -> Optional[RoleGuess]:
+        if not identity:
+            return None
+        identity = identity.lower()
+        role = self.mapping.get(identity)
+        if role is None:
+            role = next((self.mapping[p] for p in self._prefixes if identity.startswith(p)), None)
+        return RoleGuess(role, 1.0) if role else None
+
+
+def features(text: str) -> list[str]:
+    """Unigrams, bigrams and a question-mark marker"""
+    tokens = _TOKEN_RE.findall(text.lower().replace("ё", "е"))
+    result = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    if "?" in text:
+        result.append("<?>")
+    return result
+
+
+class LexicalRoleModel:
+    """Multinomial naive Bayes with add-one smoothing"""
+
+    def __init__(self, class_counts: dict[str, int], feature_counts: dict[str, dict[str, int]]):
+        self.class_counts = class_counts
+        self.feature_counts = feature_counts
+
+        vocabulary = set()
+        for counts in feature_counts.values():
+            vocabulary.update(counts)
+        self._vocabulary = vocabulary
+
+        total = sum(class_counts.values())
+        self._log_prior = {}
+        self._log_likelihood: dict[str, dict[str, float]] = {}
+        self._log_unseen = {}
+        for role in ROLES:
+            counts = feature_counts.get(role, {})
+            denominator = sum(counts.values()) + len(vocabulary)
+            self._log_prior[role] = math.log((class_counts.get(role, 0) + 1) / (total + len(ROLES)))
+            self._log_likelihood[role] = {f: math.log((c + 1) / denominator) for f, c in counts.items()}
+            self._log_unseen[role] = math.log(1 / denominator)
+
+    @classmethod
+    def train(cls, messages: Iterable[MessageToRoleAgent]) -> "LexicalRoleModel":
+        class_counts: Counter = Counter()
+        feature_counts: dict[str, Counter] = {role: Counter() for role in ROLES}
+        for msg in messages:
+            role = msg.role.upper()
+            if role not in ROLES:
+                continue
+            class_counts[role] += 1
+            feature_counts[role].update(features(msg.content))
+        return cls(dict(class_counts), {role: dict(c) for role, c in feature_counts.items()})
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalRoleModel":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MODEL_VERSION:
+            raise ValueError(f"Unsupported role model version in {path}: {data.get('version')}")
+        return cls(data["class_counts"], data["feature_counts"])
+
+    def save(self, path: str):
+        data = {
+            "version": MODEL_VERSION,
+            "class_counts": self.class_counts,
+            "feature_counts": self.feature_counts,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def classify(self, text: str, identity: Optional[str] = None) -> Optional[RoleGuess]:
+        known = [f for f in features(text) if f in self._vocabulary]
+        if not known:
+            return None
+        scores = {}
+        for role in ROLES:
+            likelihood, unseen = self._log_likelihood[role], self._log_unseen[role]
+            scores[role] = self._log_prior[role] + sum(likelihood.get(f, unseen) for f in known)
+        best = max(scores, key=scores.get)
+        # апостериорная вероятность лучшего класса (softmax по лог-оценкам)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return RoleGuess(best, 1 / norm)
+
+
+@lru_cache(maxsize=1)
+def get_lexical_model(path: str = settings.role_lexical_model_path) -> Optional[LexicalRoleModel]:
+    """Offline-trained lexical model, or None if it hasn't been trained yet"""
+    if not path or not os.path.exists(path):
+        return None
+    return LexicalRoleModel.load(path)
+
+
+def load_transcripts(paths: list[str]) -> list[MessageToRoleAgent]:
+    messages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            messages.extend(MessageToRoleAgent(**item) for item in json.load(f))
+    return messages
+
+
+def _train(args):
+    messages = load_transcripts(args.transcripts)
+    model = LexicalRoleModel.train(messages)
+    model.save(args.out)
+    print(f"Trained on {len(messages)} messages {model.class_counts}, {len(model._vocabulary)} features -> {args.out}")
+
+
+def _evaluate(args):
+    # каждое k-е сообщение — отложенная выборка
+    messages = load_transcripts(args.transcripts)
+    train = [m for i, m in enumerate(messages) if i % args.holdout_every]
+    test = [m for i, m in enumerate(messages) if not i % args.holdout_every]
+    model = LexicalRoleModel.train(train)
+
+    covered = correct = 0
+    for msg in test:
+        guess = model.classify(msg.content)
+        if guess is None or guess.confidence < args.min_confidence:
+            continue
+        covered += 1
+        correct += guess.role == msg.role.upper()
+    print(
+        f"holdout {len(test)} messages: coverage {covered / max(len(test), 1):.1%}, "
+        f"accuracy on covered {correct / max(covered, 1):.1%} (min confidence {args.min_confidence})"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="train the lexical model from saved transcripts")
+    train_parser.add_argument("transcripts", nargs="+")
+    train_parser.add_argument("--out", default=settings.role_lexical_model_path)
+    train_parser.set_defaults(func=_train)
+
+    evaluate_parser = commands.add_parser("evaluate", help="holdout coverage/accuracy at a confidence threshold")
+    evaluate_parser.add_argument("transcripts", nargs="+")
+    evaluate_parser.add_argument("--holdout-every", type=int, default=5)
+    evaluate_parser.add_argument("--min-confidence", type=float, default=settings.role_local_min_confidence)
+    evaluate_parser.set_defaults(func=_evaluate)
+
+    args = parser.parse_args()
+    args.func(args)
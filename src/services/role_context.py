@@ -0,0 +1,89 @@
+"""
+Role agent context laid out for provider-side prompt caching.
+
+Providers (OpenAI: prompts of 1024+ tokens) reuse the longest byte-identical
+prefix of a request seen recently. The role agent's request is the
+instructions and output schema (identical for every call), then the context
+turns, then the new message(s) — so the changing part is always at the end,
+and consecutive calls share everything up to the last turn of the previous
+context.
+
+A sliding window of the last N turns would still change its first turn on
+every call; instead the window grows until `max_turns` and then drops its
+oldest `drop_turns` turns at once, so the prefix stays stable between drops.
+Each turn is serialized once, when it is appended, and the JSON array of the
+window is extended in place rather than re-dumped per call.
+"""
+import json
+from dataclasses import dataclass
+from typing import Iterable
+
+from src.core.settings import settings
+from src.schemas.agent_output import MessageToRoleAgent
+
+
+@dataclass(frozen=True)
+class RoleContext:
+    """Serialized context turns (a JSON array), as sent to the role agent"""
+    text: str = "[]"
+    turns: int = 0
+
+
+EMPTY_CONTEXT = RoleContext()
+
+
+def serialize_turn(message: MessageToRoleAgent) -> str:
+    return json.dumps(message.model_dump(), ensure_ascii=False, separators=(",", ":"))
+
+
+class RoleContextBuilder:
+    def __init__(
+        self,
+        max_turns: int = settings.role_context_max_turns,
+        drop_turns: int = settings.role_context_drop_turns,
+    ):
+        self.max_turns = max(1, max_turns)
+        self.drop_turns = min(max(1, drop_turns), self.max_turns)
+        self._turns: list[str] = []
+        self._body = ""
+        self._snapshot = EMPTY_CONTEXT
+
+        # метрики
+        self.appended = 0
+        self.drops = 0
+        self.snapshots = 0
+        self._turns_total = 0
+
+    def append(self, messages: Iterable[MessageToRoleAgent]):
+        for message in messages:
+            turn = serialize_turn(message)
+            if len(self._turns) >= self.max_turns:
+                # сдвиг окна сразу на drop_turns: префикс меняется раз в drop_turns реплик
+                del self._turns[:self.drop_turns]
+                self._body = ",".join(self._turns)
+                self.drops += 1
+            self._turns.append(turn)
+            self._body = f"{self._body},{turn}" if self._body else turn
+            self.appended += 1
+        self._snapshot = None
+
+    def snapshot(self) -> RoleContext:
+        """Current context; the same object until the next append"""
+        if self._snapshot is None:
+            self._snapshot = RoleContext(text=f"[{self._body}]", turns=len(self._turns))
+        self.snapshots += 1
+        self._turns_total += self._snapshot.turns
+        return self._snapshot
+
+    def stats(self) -> dict:
+        return {
+            "appended": self.appended,
+            "window_drops": self.drops,
+            "snapshots": self.snapshots,
+            "avg_turns": round(self._turns_total / self.snapshots, 1) if self.snapshots else 0.0,
+        }
+
+
+def context_payload(context: RoleContext, new_label: str, new_text: str) -> str:
+    """Role agent input: the context first (shared prefix), the new part last"""
+    return f"CONTEXT_JSON:\n{context.text}\n\n{new_label}:\n{new_text}"
@@ -0,0 +1,98 @@
+"""
+Rolling summary: keeps a draft MedicalProtocol up to date during the consultation.
+
+Every `every_n` new messages, or after `idle_s` seconds without new messages,
+the draft is merged with the messages it does not cover yet. At the end of the
+call only the remaining delta has to be merged, so the final prompt stays
+bounded no matter how long the consultation was.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from src.agents.summary_agent import update_summary_of_transcript_with_roles
+from src.core.settings import settings
+from src.schemas.agent_output import MessageToRoleAgent
+from src.schemas.protocol import MedicalProtocol
+
+logger = logging.getLogger(__name__)
+
+
+class RollingSummarizer:
+    """Background draft-protocol updater for one room"""
+
+    def __init__(
+        self,
+        every_n: int = settings.rolling_summary_every_n,
+        idle_s: float = settings.rolling_summary_idle_s,
+    ):
+        self.every_n = every_n
+        self.idle_s = idle_s
+        self.protocol: Optional[MedicalProtocol] = None
+        # сколько первых сообщений уже учтено в self.protocol
+        self.summarized_upto = 0
+        self._messages: list[MessageToRoleAgent] = []
+        self._task: Optional[asyncio.Task] = None
+        self._idle_handle: Optional[asyncio.TimerHandle] = None
+        self._closed = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.every_n > 0
+
+    def on_messages(self, messages: list[MessageToRoleAgent]):
+        """Call after new messages were appended to the room transcript"""
+        if not self.enabled:
+            return
+        self._messages = messages
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+
+        pending = len(messages) - self.summarized_upto
+        if pending >= self.every_n:
+            self._start_update()
+        elif pending > 0 and self.idle_s > 0:
+            self._idle_handle = asyncio.get_running_loop().call_later(self.idle_s, self._start_update)
+
+    def _start_update(self):
+        self._idle_handle = None
+        if self._closed or (self._task is not None and not self._task.done()):
+            return
+        end = len(self._messages)
+        if end <= self.summarized_upto:
+            return
+        self._task = asyncio.create_task(self._update(end), name="rolling_summary")
+
+    async def _update(self, end: int):
+        delta = self._messages[self.summarized_upto:end]
+        try:
+            self.protocol = await update_summary_of_transcript_with_roles(self.protocol, delta)
+            self.summarized_upto = end
+            logger.info(f"Rolling summary updated: {end} messages covered")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # не страшно: дельта просто войдёт в следующее обновление
+            logger.exception("Rolling summary update failed")
+
+        self._task = None
+        if len(self._messages) - self.summarized_upto >= self.every_n:
+            self._start_update()
+
+    async def finalize(self) -> tuple[Optional[MedicalProtocol], int]:
+        """
+        Stop scheduling updates, wait for the one in flight and return
+        (draft protocol, number of messages it covers).
+        """
+        self._closed = True
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception:
+                pass
+            self._task = None
+        return self.protocol, self.summarized_upto
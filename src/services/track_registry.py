@@ -0,0 +1,118 @@
+"""
+Event-driven readiness of remote audio tracks.
+
+Publications are announced from several room events (participant_connected,
+track_published, participants already in the room); the track itself
+becomes available only with track_subscribed. The registry starts one task
+per publication sid, exactly once, which awaits a readiness future resolved
+by track_subscribed and then runs the per-track handler — no polling of
+`pub.track`.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from livekit import rtc
+
+logger = logging.getLogger(__name__)
+
+TrackHandler = Callable[[rtc.RemoteTrackPublication, rtc.RemoteParticipant, rtc.Track], Awaitable[None]]
+
+
+class TrackRegistry:
+    def __init__(self, on_track: TrackHandler, subscribe_timeout: float = 10.0):
+        self.on_track = on_track
+        self.subscribe_timeout = subscribe_timeout
+        self._ready: dict[str, asyncio.Future] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+        # метрики
+        self.started = 0
+        self.timed_out = 0
+        self._subscribe_waits = 0
+        self._subscribe_s_total = 0.0
+
+    def _future(self, sid: str) -> asyncio.Future:
+        if sid not in self._ready:
+            self._ready[sid] = asyncio.get_running_loop().create_future()
+        return self._ready[sid]
+
+    def _start(self, pub: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant):
+        # единственное место запуска обработчика — не больше одной задачи на sid
+        sid = pub.sid
+        if sid not in self._tasks:
+            self._tasks[sid] = asyncio.create_task(self._run(sid, pub, participant), name=f"track_{sid}")
+
+    def publication_added(self, pub: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant):
+        """Audio publication seen: subscribe and wait for track_subscribed"""
+        if getattr(pub, "kind", None) != rtc.TrackKind.KIND_AUDIO or pub.sid in self._tasks:
+            return
+        future = self._future(pub.sid)
+        if pub.track is not None and not future.done():
+            future.set_result(pub.track)
+        elif pub.track is None:
+            # subscribe request (API supports set_subscribed)
+            try:
+                pub.set_subscribed(True)
+            except Exception:
+                pass
+        self._start(pub, participant)
+
+    def track_subscribed(self, track: rtc.Track, pub: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant):
+        """Track available: resolve its readiness future"""
+        if getattr(pub, "kind", None) != rtc.TrackKind.KIND_AUDIO:
+            return
+        future = self._future(pub.sid)
+        if not future.done():
+            future.set_result(track)
+        self._start(pub, participant)
+
+    async def _run(self, sid: str, pub: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant):
+        try:
+            future = self._future(sid)
+            if not future.done():
+                requested_at = time.monotonic()
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), timeout=self.subscribe_timeout)
+                except asyncio.TimeoutError:
+                    self.timed_out += 1
+                    print(f"[WARN] track not available for publication {sid} (participant={participant.identity})")
+                    return
+                self._subscribe_waits += 1
+                self._subscribe_s_total += time.monotonic() - requested_at
+
+            self.started += 1
+            await self.on_track(pub, participant, future.result())
+        except asyncio.CancelledError:
+            return
+        except Exception:
+            logger.exception("Error in processing publication %s for %s", sid, getattr(participant, "identity", "<no-id>"))
+        finally:
+            self._tasks.pop(sid, None)
+            self._ready.pop(sid, None)
+
+    def _forget(self, sid: str):
+        future = self._ready.pop(sid, None)
+        if future is not None and not future.done():
+            future.cancel()
+        task = self._tasks.pop(sid, None)
+        if task is not None and not task.done():
+            task.cancel()
+
+    def participant_disconnected(self, participant: rtc.RemoteParticipant):
+        # note: participant.track_publications keys are publication.sids
+        for sid in list(participant.track_publications):
+            self._forget(sid)
+
+    def close(self):
+        for sid in {*self._tasks, *self._ready}:
+            self._forget(sid)
+
+    def stats(self) -> dict:
+        return {
+            "tracks_started": self.started,
+            "active": len(self._tasks),
+            "subscribe_timeouts": self.timed_out,
+            "avg_subscribe_ms": round(self._subscribe_s_total / self._subscribe_waits * 1000, 1) if self._subscribe_waits else 0.0,
+        }
@@ -0,0 +1,213 @@
+"""
+Append-only, crash-safe transcript log of one room.
+
+Every classified message is appended to `<transcript_log_dir>/<room>.log` as
+a length-prefixed compact JSON record (4-byte big-endian length + UTF-8
+JSON). Writes go through the file buffer; fsync is batched — after
+`fsync_every_n` unsynced records or `fsync_interval_s` seconds, whichever
+comes first — and runs in a thread so the event loop is not blocked.
+
+Only the last `tail_size` messages (the role agent's context) and one file
+offset per record are kept in memory; older messages are read back from the
+file on demand, e.g. the rolling-summary delta or the full transcript for
+the final protocol. Opening an existing log replays it, so a job restarted
+after a worker crash continues the same consultation. A torn record at the
+end of the file (crash mid-write) is truncated away.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import struct
+import time
+from array import array
+from collections import deque
+from typing import Optional, Union
+
+from src.core.settings import settings
+from src.schemas.agent_output import MessageToRoleAgent
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">I")
+
+
+def _encode(message: MessageToRoleAgent) -> bytes:
+    payload = json.dumps(message.model_dump(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _log_path(log_dir: str, room: str) -> str:
+    # имя комнаты приходит извне — в имени файла только безопасные символы
+    return os.path.join(log_dir, re.sub(r"[^\w.-]", "_", room) + ".log")
+
+
+class TranscriptLog:
+    def __init__(
+        self,
+        room: str,
+        log_dir: str = settings.transcript_log_dir,
+        fsync_every_n: int = settings.transcript_fsync_every_n,
+        fsync_interval_s: float = settings.transcript_fsync_interval_s,
+        tail_size: int = settings.transcript_tail_size,
+    ):
+        self.room = room
+        self.path = _log_path(log_dir, room)
+        self.fsync_every_n = max(1, fsync_every_n)
+        self.fsync_interval_s = fsync_interval_s
+        self._tail: deque[MessageToRoleAgent] = deque(maxlen=max(1, tail_size))
+        # смещение начала каждой записи; последний элемент — конец файла
+        self._offsets = array("Q", [0])
+        self._unsynced = 0
+        self._sync_task: Optional[asyncio.Task] = None
+        self._sync_handle: Optional[asyncio.TimerHandle] = None
+
+        # метрики
+        self.replayed = 0
+        self.truncated_bytes = 0
+        self.fsyncs = 0
+        self._fsync_s_total = 0.0
+
+        os.makedirs(log_dir, exist_ok=True)
+        self._replay()
+        self._file = open(self.path, "ab")
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r+b") as f:
+            size = os.fstat(f.fileno()).st_size
+            offset = 0
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                (length,) = _HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    break
+                try:
+                    message = MessageToRoleAgent(**json.loads(payload))
+                except ValueError:
+                    break
+                offset += _HEADER.size + length
+                self._offsets.append(offset)
+                self._tail.append(message)
+            if offset < size:
+                # оборванная при падении запись — отрезаем, дальше пишем с целой границы
+                self.truncated_bytes = size - offset
+                f.truncate(offset)
+                logger.warning(f"Transcript log {self.path}: truncated {self.truncated_bytes} bytes of a torn record")
+        self.replayed = len(self)
+        if self.replayed:
+            logger.info(f"Transcript log {self.path}: replayed {self.replayed} messages")
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def append(self, messages: list[MessageToRoleAgent]):
+        for message in messages:
+            record = _encode(message)
+            self._file.write(record)
+            self._offsets.append(self._offsets[-1] + len(record))
+            self._tail.append(message)
+        self._unsynced += len(messages)
+        self._schedule_sync()
+
+    def tail(self, n: int) -> list[MessageToRoleAgent]:
+        """Last `n` messages (at most tail_size) without touching the file"""
+        if n <= 0:
+            return []
+        return list(self._tail)[-n:]
+
+    def __getitem__(self, index: Union[int, slice]):
+        """Messages by position, read back from the file"""
+        if isinstance(index, int):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("transcript log index out of range")
+            return self.read(index, index + 1)[0]
+        start, stop, step = index.indices(len(self))
+        messages = self.read(start, stop) if stop > start else []
+        return messages[::step] if step != 1 else messages
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> list[MessageToRoleAgent]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return []
+        # сначала сбрасываем буфер записи, чтобы увидеть последние сообщения
+        if not self._file.closed:
+            self._file.flush()
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[start])
+            data = f.read(self._offsets[stop] - self._offsets[start])
+        messages = []
+        pos = 0
+        while pos < len(data):
+            (length,) = _HEADER.unpack_from(data, pos)
+            pos += _HEADER.size
+            messages.append(MessageToRoleAgent(**json.loads(data[pos:pos + length])))
+            pos += length
+        return messages
+
+    def _schedule_sync(self):
+        # fsync уже идёт — записи, пришедшие за это время, он заберёт следующим проходом
+        if self._sync_task is not None or self._unsynced == 0:
+            return
+        if self._unsynced >= self.fsync_every_n or self.fsync_interval_s <= 0:
+            self._start_sync()
+        elif self._sync_handle is None:
+            self._sync_handle = asyncio.get_running_loop().call_later(self.fsync_interval_s, self._start_sync)
+
+    def _start_sync(self):
+        if self._sync_handle is not None:
+            self._sync_handle.cancel()
+            self._sync_handle = None
+        if self._sync_task is None and not self._file.closed:
+            self._sync_task = asyncio.create_task(self._sync(), name=f"transcript_fsync_{self.room}")
+
+    async def _sync(self):
+        try:
+            while self._unsynced:
+                self._unsynced = 0
+                self._file.flush()
+                started = time.perf_counter()
+                await asyncio.to_thread(os.fsync, self._file.fileno())
+                self.fsyncs += 1
+                self._fsync_s_total += time.perf_counter() - started
+        except Exception as e:
+            logger.warning(f"Transcript log fsync failed for {self.path}: {e}")
+        finally:
+            self._sync_task = None
+
+    async def aclose(self):
+        """Flush and fsync everything written so far and close the file"""
+        if self._file.closed:
+            return
+        if self._sync_handle is not None:
+            self._sync_handle.cancel()
+            self._sync_handle = None
+        if self._sync_task is not None:
+            await asyncio.gather(self._sync_task, return_exceptions=True)
+        await self._sync()
+        self._file.close()
+
+    async def discard(self):
+        """Close and delete the log once the protocol has been generated"""
+        await self.aclose()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "messages": len(self),
+            "bytes": self._offsets[-1],
+            "replayed": self.replayed,
+            "truncated_bytes": self.truncated_bytes,
+            "fsyncs": self.fsyncs,
+            "avg_fsync_ms": round(self._fsync_s_total / self.fsyncs * 1000, 2) if self.fsyncs else 0.0,
+        }
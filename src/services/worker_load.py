@@ -0,0 +1,194 @@
+"""
+Load model of the transcription worker.
+
+Jobs run in separate processes, so each job periodically writes a small
+status report (its audio tracks and classification queue depth) into
+settings.worker_load_dir. Every worker on a host gets its own subdirectory
+(set by the main process and inherited by job processes through the
+environment), so workers do not count each other's rooms. The worker's main
+process combines the fresh reports with the number of active jobs and CPU
+usage into a single load value in [0, 1]:
+
+    load = max(cpu, rooms / max_rooms, tracks / max_tracks, queue_depth / max_queue_depth)
+
+It is passed to WorkerOptions as `load_fnc` (the worker stops taking jobs
+above `load_threshold`) and `request_fnc` rejects job requests that arrive
+while the worker is already over the threshold, so LiveKit dispatches them
+to another worker.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Optional
+
+from livekit.agents import JobRequest, utils
+from livekit.agents.utils.hw import get_cpu_monitor
+
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RoomLoad:
+    room: str
+    tracks: int = 0
+    queue_depth: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+
+class LoadReporter:
+    """Job side: writes the room's load report every `interval` seconds"""
+
+    def __init__(
+        self,
+        key: str,
+        sample: Callable[[], RoomLoad],
+        report_dir: str = settings.worker_load_dir,
+        interval: float = settings.worker_load_report_interval_s,
+    ):
+        self.path = os.path.join(report_dir, f"{key}.json")
+        self.sample = sample
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        os.makedirs(report_dir, exist_ok=True)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="load_reporter")
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self.sample()), f)
+        os.replace(tmp_path, self.path)
+
+    async def _loop(self):
+        while True:
+            try:
+                self.write()
+            except Exception as e:
+                logger.warning(f"Failed to write load report: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def read_reports(report_dir: str = settings.worker_load_dir, max_age_s: float = 10.0) -> list[RoomLoad]:
+    """Fresh reports; stale ones (crashed jobs) are deleted"""
+    reports = []
+    if not os.path.isdir(report_dir):
+        return reports
+    now = time.time()
+    for name in os.listdir(report_dir):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(report_dir, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                report = RoomLoad(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            continue
+        if now - report.updated_at > max_age_s:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        reports.append(report)
+    return reports
+
+
+class _CpuSampler:
+    """Moving average of process-visible CPU usage, sampled in a daemon thread"""
+
+    def __init__(self):
+        self._monitor = get_cpu_monitor()
+        self._avg = utils.MovingAverage(5)
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True, name="worker_load_cpu").start()
+
+    def _run(self):
+        while True:
+            cpu = self._monitor.cpu_percent(interval=0.5)
+            with self._lock:
+                self._avg.add_sample(cpu)
+
+    def get(self) -> float:
+        with self._lock:
+            return self._avg.get_avg()
+
+
+class WorkerLoadModel:
+    def __init__(
+        self,
+        max_rooms: int = settings.worker_max_rooms,
+        max_tracks: int = settings.worker_max_tracks,
+        max_queue_depth: int = settings.worker_max_queue_depth,
+        threshold: float = settings.worker_load_threshold,
+        report_dir: Optional[str] = settings.worker_load_dir,
+        sample_cpu: bool = True,
+    ):
+        self.max_rooms = max_rooms
+        self.max_tracks = max_tracks
+        self.max_queue_depth = max_queue_depth
+        self.threshold = threshold
+        self.report_dir = report_dir
+        self._cpu: Optional[_CpuSampler] = _CpuSampler() if sample_cpu else None
+        # воркер запоминается из load_fnc: request_fnc его не получает, а комнаты
+        # должны считаться одинаково в обоих местах — по активным задачам
+        self._worker = None
+        self.rejected = 0
+
+    def active_rooms(self) -> Optional[int]:
+        """Active jobs of the worker; None until the first load_fnc call (reports are counted then)"""
+        return len(self._worker.active_jobs) if self._worker is not None else None
+
+    def snapshot(self, active_rooms: Optional[int] = None, reports: Optional[list[RoomLoad]] = None) -> dict:
+        if reports is None:
+            reports = read_reports(self.report_dir) if self.report_dir else []
+        rooms = active_rooms if active_rooms is not None else len(reports)
+        tracks = sum(r.tracks for r in reports)
+        queue_depth = sum(r.queue_depth for r in reports)
+        cpu = self._cpu.get() if self._cpu is not None else 0.0
+        load = max(
+            cpu,
+            rooms / self.max_rooms if self.max_rooms else 0.0,
+            tracks / self.max_tracks if self.max_tracks else 0.0,
+            queue_depth / self.max_queue_depth if self.max_queue_depth else 0.0,
+        )
+        return {
+            "rooms": rooms,
+            "tracks": tracks,
+            "queue_depth": queue_depth,
+            "cpu": round(cpu, 3),
+            "load": round(min(load, 1.0), 3),
+        }
+
+    def load(self, worker=None) -> float:
+        """WorkerOptions.load_fnc"""
+        if worker is not None:
+            self._worker = worker
+        return self.snapshot(self.active_rooms())["load"]
+
+    async def request_fnc(self, req: JobRequest):
+        """WorkerOptions.request_fnc: hand the job off when already over the threshold"""
+        snapshot = self.snapshot(self.active_rooms())
+        if snapshot["load"] >= self.threshold:
+            self.rejected += 1
+            logger.warning(f"Rejecting job for room {req.room.name}, worker load {snapshot}")
+            await req.reject()
+            return
+        await req.accept()
@@ -5,10 +5,15 @@ import base64
 import hashlib
 import hmac
 import time
-import requests
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
 import jwt
-from livekit import api
 from src.core.settings import settings
+from src.utils.livekit_client import get_room_client
+
+if TYPE_CHECKING:
+    from livekit import api
 
 
 def create_room_auth_token() -> str:
@@ -27,7 +32,7 @@ def create_room_auth_token() -> str:
 
 async def create_room(room_name: str) -> dict:
     """
-    Create a room using HTTP request to LiveKit server
+    Create a room through the pooled LiveKit RoomService client
     
     Args:
         room_name: Name for the new room
@@ -35,20 +40,82 @@ async def create_room(room_name: str) -> dict:
     Returns:
         Room creation response data
     """
-    token = create_room_auth_token()
+    return await get_room_client().create_room(room_name, empty_timeout=15, max_participants=10)
+
+
+def sign_access_token(room_name: str, participant_name: str, now: Optional[int] = None) -> str:
+    """
+    Sign a room-join token directly with PyJWT.
     
-    # Make HTTP request to create room
-    url = f"https://{settings.livekit_url.replace('wss://', '').replace('ws://', '')}/twirp/livekit.RoomService/CreateRoom"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
+    Same claims as api.AccessToken with identity/name = participant_name and
+    VideoGrants(room_join, room, can_publish, can_subscribe), without its
+    per-call dataclass and grant serialization overhead. Like AccessToken,
+    refuses a join grant without an identity or a room (ValueError).
+    """
+    if not participant_name:
+        raise ValueError("identity is required for join but not set")
+    if not room_name:
+        raise ValueError("room is required for join but not set")
+    now = int(time.time()) if now is None else now
+    payload = {
+        "sub": participant_name,
+        "name": participant_name,
+        "iss": settings.livekit_api_key,
+        "nbf": now,
+        "exp": now + settings.access_token_ttl_s,
+        "video": {
+            "roomJoin": True,
+            "room": room_name,
+            "canPublish": True,
+            "canSubscribe": True,
+            "canPublishData": True,
+        },
     }
-    data = {"name": room_name, "empty_timeout": 15, "max_participants": 10}
-    
-    response = requests.post(url, json=data, headers=headers)
-    response.raise_for_status()
-    
-    return response.json()
+    return jwt.encode(payload, settings.livekit_api_secret, algorithm="HS256")
+
+
+class AccessTokenCache:
+    """Join tokens per (room, participant), reused for `reuse_s` after signing"""
+
+    def __init__(self, reuse_s: int = settings.access_token_reuse_s, maxsize: int = settings.access_token_cache_size):
+        self.reuse_s = reuse_s
+        self.maxsize = maxsize
+        self._tokens: OrderedDict[tuple[str, str], tuple[int, str]] = OrderedDict()
+
+        # метрики
+        self.hits = 0
+        self.signed = 0
+
+    def get(self, room_name: str, participant_name: str) -> str:
+        key = (room_name, participant_name)
+        now = int(time.time())
+        cached = self._tokens.get(key)
+        if cached is not None and now - cached[0] < self.reuse_s:
+            self._tokens.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+        token = sign_access_token(room_name, participant_name, now)
+        self.signed += 1
+        self._tokens[key] = (now, token)
+        self._tokens.move_to_end(key)
+        while len(self._tokens) > self.maxsize:
+            self._tokens.popitem(last=False)
+        return token
+
+    def stats(self) -> dict:
+        requests = self.hits + self.signed
+        return {
+            "cached": len(self._tokens),
+            "hits": self.hits,
+            "signed": self.signed,
+            "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_access_token_cache() -> AccessTokenCache:
+    return AccessTokenCache()
 
 
 def generate_access_token(room_name: str, participant_name: str) -> str:
@@ -60,18 +127,15 @@ def generate_access_token(room_name: str, participant_name: str) -> str:
         participant_name: Name of the participant
         
     Returns:
-        JWT access token
+        JWT access token (the same one for repeated requests within access_token_reuse_s)
     """
-    token = api.AccessToken(settings.livekit_api_key, settings.livekit_api_secret)
-    token.with_identity(participant_name)
-    token.with_name(participant_name)
-    token.with_grants(
-        api.VideoGrants(
-            room_join=True,
-            room=room_name,
-            can_publish=True,
-            can_subscribe=True
-        )
-    )
-    
-    return token.to_jwt()
\ No newline at end of file
+    return get_access_token_cache().get(room_name, participant_name)
+
+
+@lru_cache(maxsize=1)
+def get_webhook_receiver() -> "api.WebhookReceiver":
+    """Verifies LiveKit webhook signatures with the server API key/secret"""
+    # livekit.api тянет aiohttp и protobuf-модели всех сервисов — загружаем при первом вебхуке
+    from livekit import api
+
+    return api.WebhookReceiver(api.TokenVerifier(settings.livekit_api_key, settings.livekit_api_secret))
@@ -1,6 +1,6 @@
 from src.schemas.protocol import MedicalProtocol
-from typing import List 
-import os
+from typing import Callable, Iterable, Iterator, List, Optional
+from dataclasses import dataclass
 from datetime import date
     
     
@@ -154,199 +154,217 @@ def _format_vital(vitals: dict, key: str, default="-") -> str:
         return f"{v} {u}".strip()
     return str(val)
 
-def save_protocol_as_txt(protocol: MedicalProtocol, output_dir: str, header_data: dict, client: str = "default") -> str:
-    """
-    Сохраняет объект MedicalProtocol в текстовый файл формата медицинского протокола.
-    Возвращает путь к файлу.
-    """
-    os.makedirs(output_dir, exist_ok=True)
-    filename = f"medical_protocol_{client}.txt"
-    output_path = os.path.join(output_dir, filename)
+def _by_order(item) -> int:
+    return item.order
 
-    lines: List[str] = []
+# Функции ниже возвращают тело раздела без заголовка (заголовок — в PROTOCOL_SECTIONS);
+# поля моделей протокола всегда есть, поэтому без getattr-проверок
 
+def _render_patient(protocol: MedicalProtocol, header_data: dict) -> List[str]:
     # Заголовок / шапка пациента
     p = protocol.patient
-    lines.append("Ф.И.О. пациента: " + (p.full_name or "______________________"))
-    age_str = str(p.age) if p and p.age is not None else "-"
-    lines.append("Возраст: " + age_str)
-    lines.append("Пол: " + _sex_label(p.sex if p else None))
-    lines.append("Дата осмотра: " + ((p.date_of_exam.isoformat()) if (p and p.date_of_exam) else "______________________"))
-    lines.append("")
-
-    # Жалобы
-    lines.append("Жалобы:")
-    if protocol.chief_complaints:
-        for cc in protocol.chief_complaints:
-            # используем формализованный текст, но если есть raw_text — добавляем как уточнение
-            text = cc.text if getattr(cc, "text", None) else (cc.raw_text or "-")
-            lines.append(text)
-            if getattr(cc, "raw_text", None) and cc.raw_text != cc.text:
-                lines.append(f"(Исходная фраза: {cc.raw_text})")
-    else:
+    return [
+        "Ф.И.О. пациента: " + (p.full_name or "______________________"),
+        "Возраст: " + (str(p.age) if p and p.age is not None else "-"),
+        "Пол: " + _sex_label(p.sex if p else None),
+        "Дата осмотра: " + ((p.date_of_exam.isoformat()) if (p and p.date_of_exam) else "______________________"),
+        "",
+    ]
+
+def _render_chief_complaints(protocol: MedicalProtocol, header_data: dict) -> List[str]:
+    lines: List[str] = []
+    for cc in protocol.chief_complaints:
+        # используем формализованный текст, но если есть raw_text — добавляем как уточнение
+        lines.append(cc.text if cc.text else (cc.raw_text or "-"))
+        if cc.raw_text and cc.raw_text != cc.text:
+            lines.append(f"(Исходная фраза: {cc.raw_text})")
+    if not lines:
         lines.append("-")
     lines.append("")
+    return lines
 
-    # Анамнез заболевания
-    lines.append("Анамнез заболевания:")
-    if protocol.anamnesis_morbi and getattr(protocol.anamnesis_morbi, "text", None):
-        lines.append(protocol.anamnesis_morbi.text)
-    else:
-        lines.append("-")
-    lines.append("")
+def _render_anamnesis_morbi(protocol: MedicalProtocol, header_data: dict) -> List[str]:
+    am = protocol.anamnesis_morbi
+    return [am.text if am and am.text else "-", ""]
 
-    # Анамнез жизни
-    lines.append("Анамнез жизни:")
+def _render_anamnesis_vitae(protocol: MedicalProtocol, header_data: dict) -> List[str]:
     av = protocol.anamnesis_vitae
-    if av:
-        # если есть свободный текст — вывести
-        if av.text:
-            # разбить на строки, если длинный
-            lines.extend([ln for ln in av.text.splitlines() if ln.strip()])
-        else:
-            # попытаться вывести структурированные поля
-            disp = av.dispensary_register_status or "unknown"
-            lines.append(f"- Диспансерный учёт: {disp}")
-            lines.append(f"- Аллергии: {', '.join(av.allergies) if av.allergies else 'не отмечены'}")
-            lines.append(f"- Хронические заболевания: {', '.join(av.chronic_diseases) if av.chronic_diseases else 'не выявлены'}")
+    if not av:
+        return ["-", ""]
+    if av.text:
+        # свободный текст — по непустым строкам
+        lines = [ln for ln in av.text.splitlines() if ln.strip()]
     else:
-        lines.append("-")
+        # структурированные поля
+        lines = [
+            f"- Диспансерный учёт: {av.dispensary_register_status or 'unknown'}",
+            f"- Аллергии: {', '.join(av.allergies) if av.allergies else 'не отмечены'}",
+            f"- Хронические заболевания: {', '.join(av.chronic_diseases) if av.chronic_diseases else 'не выявлены'}",
+        ]
     lines.append("")
+    return lines
 
-    # Объективный статус
-    lines.append("Объективный статус:")
+def _render_objective_status(protocol: MedicalProtocol, header_data: dict) -> List[str]:
     os_stat = protocol.objective_status
-    if os_stat:
-        # краткое резюме
-        if os_stat.summary:
-            lines.append(os_stat.summary)
-        # витальные
-        vitals = os_stat.vitals or {}
-        #температура, пульс, давление
-        temp = _format_vital(vitals, "temperature")
-        pulse = _format_vital(vitals, "pulse")
-        bp_repr = _format_bp(vitals.get("bp") or vitals.get("blood_pressure") or vitals.get("pressure"))
-        if temp != "-" or pulse != "-" or bp_repr != "-":
-            if temp != "-":
-                lines.append(f"Температура тела: {temp}")
-            if pulse != "-":
-                lines.append(f"Пульс: {pulse} уд/мин")
-            if bp_repr != "-":
-                lines.append(f"Артериальное давление: {bp_repr}")
-        # другие находки
-        if os_stat.other_findings:
-            for f in os_stat.other_findings:
-                lines.append(f"- {f.text}")
-    else:
-        lines.append("-")
+    if not os_stat:
+        return ["-", ""]
+    lines: List[str] = []
+    # краткое резюме
+    if os_stat.summary:
+        lines.append(os_stat.summary)
+    # витальные: температура, пульс, давление
+    vitals = os_stat.vitals or {}
+    temp = _format_vital(vitals, "temperature")
+    pulse = _format_vital(vitals, "pulse")
+    bp_repr = _format_bp(vitals.get("bp") or vitals.get("blood_pressure") or vitals.get("pressure"))
+    if temp != "-":
+        lines.append(f"Температура тела: {temp}")
+    if pulse != "-":
+        lines.append(f"Пульс: {pulse} уд/мин")
+    if bp_repr != "-":
+        lines.append(f"Артериальное давление: {bp_repr}")
+    # другие находки
+    lines.extend(f"- {f.text}" for f in os_stat.other_findings)
     lines.append("")
+    return lines
 
+def _render_status_localis(protocol: MedicalProtocol, header_data: dict) -> List[str]:
     # Status localis (локальный осмотр)
-    if protocol.status_localis:
-        lines.append("Status localis:")
-        for region in protocol.status_localis:
-            lines.append(region.region + ":")
-            if region.findings:
-                for ff in region.findings:
-                    lines.append(ff.text)
-            else:
-                lines.append("-")
-            lines.append("")  # разделитель между регионами
-    else:
-        # если нет — не обязательно, но добавим пустой блок
-        lines.append("Status localis:")
-        lines.append("-")
-        lines.append("")
-
-    # Предварительный диагноз
-    lines.append("Предварительный диагноз (по МКБ-10):")
-    if protocol.preliminary_diagnosis:
-        for pd in protocol.preliminary_diagnosis:
-            icd = f" — {pd.icd10}" if getattr(pd, "icd10", None) else ""
-            certainty = f" (уверенность: {pd.certainty})" if getattr(pd, "certainty", None) else ""
-            lines.append(f"{pd.text}{icd}{certainty}")
-            if getattr(pd, "rationale", None):
-                lines.append(f"Обоснование: {pd.rationale}")
-    else:
-        lines.append("-")
-    lines.append("")
+    if not protocol.status_localis:
+        return ["-", ""]
+    lines: List[str] = []
+    for region in protocol.status_localis:
+        lines.append(region.region + ":")
+        if region.findings:
+            lines.extend(ff.text for ff in region.findings)
+        else:
+            lines.append("-")
+        lines.append("")  # разделитель между регионами
+    return lines
 
-    # Дифференциальный диагноз
-    lines.append("Дифференциальный диагноз:")
-    if protocol.differential_diagnosis:
-        for i, dd in enumerate(protocol.differential_diagnosis, start=1):
-            icd = f" — {dd.icd10}" if getattr(dd, "icd10", None) else ""
-            lines.append(f"    {i}. {dd.text}{icd}")
-    else:
+def _render_preliminary_diagnosis(protocol: MedicalProtocol, header_data: dict) -> List[str]:
+    lines: List[str] = []
+    for pd in protocol.preliminary_diagnosis:
+        icd = f" — {pd.icd10}" if pd.icd10 else ""
+        certainty = f" (уверенность: {pd.certainty})" if pd.certainty else ""
+        lines.append(f"{pd.text}{icd}{certainty}")
+        if pd.rationale:
+            lines.append(f"Обоснование: {pd.rationale}")
+    if not lines:
         lines.append("-")
     lines.append("")
+    return lines
 
-    # План обследования
-    lines.append("План обследования:")
-    if protocol.plan_investigations:
-        # отсортируем по полю order на всякий случай
-        for item in sorted(protocol.plan_investigations, key=lambda x: getattr(x, "order", 0)):
-            notes = f": {item.notes}" if getattr(item, "notes", None) else ""
-            lines.append(f"    {item.order}. {item.test}{notes}")
-    else:
-        lines.append("-")
+def _render_differential_diagnosis(protocol: MedicalProtocol, header_data: dict) -> List[str]:
+    lines = [
+        f"    {i}. {dd.text}" + (f" — {dd.icd10}" if dd.icd10 else "")
+        for i, dd in enumerate(protocol.differential_diagnosis, start=1)
+    ] or ["-"]
     lines.append("")
+    return lines
 
-    # План лечения
-    lines.append("План лечения:")
-    if protocol.plan_treatment:
-        for item in sorted(protocol.plan_treatment, key=lambda x: getattr(x, "order", 0)):
-            parts = [item.treatment]
-            if item.dose:
-                parts.append(item.dose)
-            if item.route:
-                parts.append(f"({item.route})")
-            if item.freq:
-                parts.append(f", {item.freq}")
-            if item.duration:
-                parts.append(f", {item.duration}")
-            lines.append(f"    {item.order}. " + " ".join(str(p) for p in parts if p))
-    else:
-        lines.append("-")
+def _render_plan_investigations(protocol: MedicalProtocol, header_data: dict) -> List[str]:
+    lines = [
+        f"    {item.order}. {item.test}" + (f": {item.notes}" if item.notes else "")
+        for item in sorted(protocol.plan_investigations, key=_by_order)
+    ] or ["-"]
     lines.append("")
+    return lines
 
-    # Рекомендации
-    lines.append("Рекомендации:")
-    if protocol.recommendations:
-        for r in sorted(protocol.recommendations, key=lambda x: getattr(x, "order", 0)):
-            lines.append(f"    {r.order}. {r.text}")
-    else:
+def _render_plan_treatment(protocol: MedicalProtocol, header_data: dict) -> List[str]:
+    lines: List[str] = []
+    for item in sorted(protocol.plan_treatment, key=_by_order):
+        parts = [item.treatment]
+        if item.dose:
+            parts.append(item.dose)
+        if item.route:
+            parts.append(f"({item.route})")
+        if item.freq:
+            parts.append(f", {item.freq}")
+        if item.duration:
+            parts.append(f", {item.duration}")
+        lines.append(f"    {item.order}. " + " ".join(str(p) for p in parts if p))
+    if not lines:
         lines.append("-")
     lines.append("")
+    return lines
 
-    # Прогноз
-    lines.append("Прогноз:")
-    if protocol.prognosis and getattr(protocol.prognosis, "text", None):
-        prog = protocol.prognosis
-        cat = f" ({prog.category})" if getattr(prog, "category", None) else ""
-        lines.append(prog.text + cat)
-    else:
-        lines.append("-")
+def _render_recommendations(protocol: MedicalProtocol, header_data: dict) -> List[str]:
+    lines = [f"    {r.order}. {r.text}" for r in sorted(protocol.recommendations, key=_by_order)] or ["-"]
     lines.append("")
+    return lines
+
+def _render_prognosis(protocol: MedicalProtocol, header_data: dict) -> List[str]:
+    prog = protocol.prognosis
+    if not (prog and prog.text):
+        return ["-", ""]
+    return [prog.text + (f" ({prog.category})" if prog.category else ""), ""]
 
+def _render_sign_off(protocol: MedicalProtocol, header_data: dict) -> List[str]:
     # Подпись врача / авторство
-    lines.append("Врач-ординатор / Специалист: " + (protocol.sign_off.doctor_name if protocol.sign_off and protocol.sign_off.doctor_name else header_data.get("doctor_name", "-")))
-    if protocol.sign_off and getattr(protocol.sign_off, "specialty", None):
-        lines.append("Специальность: " + protocol.sign_off.specialty)
+    so = protocol.sign_off
+    lines = ["Врач-ординатор / Специалист: " + (so.doctor_name if so and so.doctor_name else header_data.get("doctor_name", "-"))]
+    if so and so.specialty:
+        lines.append("Специальность: " + so.specialty)
     elif header_data.get("doctor_position"):
         lines.append("Специальность: " + header_data.get("doctor_position"))
-    if protocol.sign_off and getattr(protocol.sign_off, "experience_years", None) is not None:
-        lines.append(f"Стаж работы: {protocol.sign_off.experience_years} лет")
-    else:
-        if header_data.get("doctor_experience_years") is not None:
-            lines.append(f"Стаж работы: {header_data.get('doctor_experience_years')}")
+    if so and so.experience_years is not None:
+        lines.append(f"Стаж работы: {so.experience_years} лет")
+    elif header_data.get("doctor_experience_years") is not None:
+        lines.append(f"Стаж работы: {header_data.get('doctor_experience_years')}")
     # подпись (если требуется)
-    sig_required = (protocol.sign_off.signature_required if protocol.sign_off is not None else True)
+    sig_required = so.signature_required if so is not None else True
     lines.append("Подпись: " + ("_____________" if sig_required else "(не требуется)"))
     lines.append("")
-
-    # Запись в файл
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
-
-    return output_path
\ No newline at end of file
+    return lines
+
+
+@dataclass(frozen=True)
+class SectionTemplate:
+    """Заголовок раздела (None — без заголовка) и функция тела раздела"""
+    title: Optional[str]
+    body: Callable[[MedicalProtocol, dict], List[str]]
+
+
+# Разделы протокола в порядке вывода: поле MedicalProtocol -> шаблон раздела.
+# Общий источник содержимого для всех форматов (TXT, HTML, PDF)
+PROTOCOL_SECTIONS: dict[str, SectionTemplate] = {
+    "patient": SectionTemplate(None, _render_patient),
+    "chief_complaints": SectionTemplate("Жалобы:", _render_chief_complaints),
+    "anamnesis_morbi": SectionTemplate("Анамнез заболевания:", _render_anamnesis_morbi),
+    "anamnesis_vitae": SectionTemplate("Анамнез жизни:", _render_anamnesis_vitae),
+    "objective_status": SectionTemplate("Объективный статус:", _render_objective_status),
+    "status_localis": SectionTemplate("Status localis:", _render_status_localis),
+    "preliminary_diagnosis": SectionTemplate("Предварительный диагноз (по МКБ-10):", _render_preliminary_diagnosis),
+    "differential_diagnosis": SectionTemplate("Дифференциальный диагноз:", _render_differential_diagnosis),
+    "plan_investigations": SectionTemplate("План обследования:", _render_plan_investigations),
+    "plan_treatment": SectionTemplate("План лечения:", _render_plan_treatment),
+    "recommendations": SectionTemplate("Рекомендации:", _render_recommendations),
+    "prognosis": SectionTemplate("Прогноз:", _render_prognosis),
+    "sign_off": SectionTemplate(None, _render_sign_off),
+}
+
+def iter_protocol_sections(
+    protocol: MedicalProtocol, header_data: dict, sections: Optional[Iterable[str]] = None
+) -> Iterator[tuple[str, Optional[str], List[str]]]:
+    """(поле, заголовок, строки тела) выбранных разделов в порядке вывода"""
+    selected = set(sections) if sections is not None else None
+    for name, template in PROTOCOL_SECTIONS.items():
+        if selected is None or name in selected:
+            yield name, template.title, template.body(protocol, header_data)
+
+def protocol_txt_lines(protocol: MedicalProtocol, header_data: dict, sections: Optional[Iterable[str]] = None) -> List[str]:
+    lines: List[str] = []
+    for _, title, body in iter_protocol_sections(protocol, header_data, sections):
+        if title is not None:
+            lines.append(title)
+        lines.extend(body)
+    return lines
+
+def render_protocol_section(protocol: MedicalProtocol, section: str, header_data: dict) -> str:
+    """Текст одного раздела протокола (пустая строка, если раздел не выводится)"""
+    template = PROTOCOL_SECTIONS.get(section)
+    if template is None:
+        return ""
+    body = template.body(protocol, header_data)
+    return "\n".join([template.title, *body] if template.title is not None else body)
@@ -0,0 +1,138 @@
+"""
+Async client for the LiveKit RoomService (Twirp over HTTP)
+
+One pooled keep-alive httpx client per application, opened and closed in
+the FastAPI lifespan. Server API tokens are cached until shortly before
+they expire instead of being minted for every request, and every call has
+a timeout and a bounded number of retries on connection errors and 5xx/429.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+import httpx
+import jwt
+
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def livekit_http_url() -> str:
+    """HTTP(S) base URL of the LiveKit server from the ws(s):// URL in settings"""
+    url = settings.livekit_url
+    if url.startswith(("http://", "https://")):
+        return url.rstrip("/")
+    return f"https://{url.replace('wss://', '').replace('ws://', '')}".rstrip("/")
+
+
+class CachedToken:
+    """Server API token reused until `refresh_before_s` before its `exp`"""
+
+    def __init__(self, mint: Callable[[], str], refresh_before_s: float = settings.livekit_token_refresh_s):
+        self.mint = mint
+        self.refresh_before_s = refresh_before_s
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self.minted = 0
+
+    def get(self) -> str:
+        if self._token is None or time.time() >= self._expires_at - self.refresh_before_s:
+            self._token = self.mint()
+            self._expires_at = jwt.decode(self._token, options={"verify_signature": False})["exp"]
+            self.minted += 1
+        return self._token
+
+
+class LiveKitRoomClient:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        timeout_s: float = settings.livekit_api_timeout_s,
+        retries: int = settings.livekit_api_retries,
+        max_connections: int = settings.livekit_api_max_connections,
+    ):
+        # импорт здесь: auth и room сами импортируют этот модуль
+        from src.utils.auth import create_room_auth_token
+        from src.utils.room import create_room_list_token
+
+        self.retries = max(0, retries)
+        self._http = httpx.AsyncClient(
+            base_url=base_url or livekit_http_url(),
+            timeout=httpx.Timeout(timeout_s),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self.room_create_token = CachedToken(create_room_auth_token)
+        self.room_list_token = CachedToken(create_room_list_token)
+
+        # метрики
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+        self._latency_s_total = 0.0
+
+    async def _call(self, method: str, data: dict, token: CachedToken) -> dict:
+        url = f"/twirp/livekit.RoomService/{method}"
+        started = time.perf_counter()
+        self.requests += 1
+        attempt = 0
+        while True:
+            try:
+                response = await self._http.post(url, json=data, headers={"Authorization": f"Bearer {token.get()}"})
+                if response.status_code not in _RETRY_STATUSES or attempt >= self.retries:
+                    response.raise_for_status()
+                    self._latency_s_total += time.perf_counter() - started
+                    return response.json()
+            except httpx.TransportError as e:
+                if attempt >= self.retries:
+                    self.failed += 1
+                    raise
+                logger.warning(f"LiveKit {method} failed ({e!r}), retrying")
+            except httpx.HTTPStatusError:
+                self.failed += 1
+                raise
+            attempt += 1
+            self.retried += 1
+            await asyncio.sleep(0.1 * 2 ** (attempt - 1))
+
+    async def create_room(self, room_name: str, empty_timeout: int = 15, max_participants: int = 10) -> dict:
+        data = {"name": room_name, "empty_timeout": empty_timeout, "max_participants": max_participants}
+        return await self._call("CreateRoom", data, self.room_create_token)
+
+    async def list_rooms(self) -> dict:
+        return await self._call("ListRooms", {}, self.room_list_token)
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    def stats(self) -> dict:
+        succeeded = self.requests - self.failed
+        return {
+            "requests": self.requests,
+            "retried": self.retried,
+            "failed": self.failed,
+            "tokens_minted": self.room_create_token.minted + self.room_list_token.minted,
+            "avg_latency_ms": round(self._latency_s_total / succeeded * 1000, 1) if succeeded else 0.0,
+        }
+
+
+_client: Optional[LiveKitRoomClient] = None
+
+
+def get_room_client() -> LiveKitRoomClient:
+    """Client opened in the app lifespan (created lazily outside of it, e.g. in scripts)"""
+    global _client
+    if _client is None:
+        _client = LiveKitRoomClient()
+    return _client
+
+
+async def close_room_client():
+    global _client
+    if _client is not None:
+        logger.info(f"LiveKit room client: {_client.stats()}")
+        await _client.aclose()
+        _client = None
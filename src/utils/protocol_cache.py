@@ -0,0 +1,123 @@
+"""
+Non-blocking access to the protocol files written by the transcription worker
+
+The worker (a separate process) writes the room's
+medical_protocol.partial.txt section by section while the protocol streams,
+and medical_protocol.txt once, when it is final. Reads go through the
+storage layer and never block the event loop, and file contents are kept in
+a small LRU cache validated by mtime/size, so a polling client costs one
+stat() per request. The ETag is derived from mtime and size as well.
+
+Only the final protocol is returned unless the caller asks for `partial`
+(then the streaming version is returned until the final one exists).
+`wait()` is the long-poll path: it returns as soon as such a version exists
+and differs from the version the client already has, or after `timeout`.
+"""
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from src.core.settings import settings
+from src.utils.http_cache import etag_matches
+from src.utils.storage import Storage, get_storage, protocol_key
+
+
+@dataclass
+class ProtocolFile:
+    room_name: str
+    text: str
+    etag: str
+    mtime: float
+    mtime_ns: int
+    size: int
+    final: bool = True
+
+
+class ProtocolCache:
+    def __init__(
+        self,
+        storage: Optional[Storage] = None,
+        maxsize: int = settings.protocol_cache_size,
+        poll_interval_s: float = settings.protocol_poll_interval_s,
+    ):
+        self.storage = storage or get_storage()
+        self.maxsize = maxsize
+        self.poll_interval_s = poll_interval_s
+        self._files: OrderedDict[str, ProtocolFile] = OrderedDict()
+
+        # метрики
+        self.hits = 0
+        self.reads = 0
+        self.missing = 0
+
+    async def get(self, room_name: str, partial: bool = False) -> Optional[ProtocolFile]:
+        """The final protocol; with `partial`, the streaming version until the final one exists"""
+        protocol = await self._read(room_name, final=True)
+        if protocol is None and partial:
+            protocol = await self._read(room_name, final=False)
+        if protocol is None:
+            self.missing += 1
+        return protocol
+
+    async def _read(self, room_name: str, final: bool) -> Optional[ProtocolFile]:
+        key = protocol_key(room_name, partial=not final)
+        st = await self.storage.stat(key)
+        if st is None:
+            self._files.pop(key, None)
+            return None
+
+        cached = self._files.get(key)
+        if cached is not None and (cached.mtime_ns, cached.size) == (st.mtime_ns, st.size):
+            self._files.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        data = await self.storage.get(key)
+        if data is None:
+            return None
+        self.reads += 1
+        # версия по stat до чтения: если файл успел измениться, следующий запрос перечитает его
+        protocol = ProtocolFile(
+            room_name=room_name,
+            text=data.decode("utf-8"),
+            # у частичной версии свой ETag: совпадение mtime/size с итоговой не даст 304
+            etag=f'"{"" if final else "p-"}{st.mtime_ns:x}-{st.size:x}"',
+            mtime=st.mtime,
+            mtime_ns=st.mtime_ns,
+            size=st.size,
+            final=final,
+        )
+        self._files[key] = protocol
+        self._files.move_to_end(key)
+        while len(self._files) > self.maxsize:
+            self._files.popitem(last=False)
+        return protocol
+
+    async def wait(
+        self, room_name: str, if_none_match: Optional[str], timeout: float, partial: bool = False
+    ) -> Optional[ProtocolFile]:
+        """
+        Long poll: the protocol once it exists and its ETag does not match
+        `if_none_match`; after `timeout` the current version (or None).
+        Without `partial` only the final protocol ends the wait.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            protocol = await self.get(room_name, partial=partial)
+            if protocol is not None and not etag_matches(if_none_match, protocol.etag):
+                return protocol
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return protocol
+            await asyncio.sleep(min(self.poll_interval_s, remaining))
+
+    def stats(self) -> dict:
+        return {"cached": len(self._files), "hits": self.hits, "reads": self.reads, "missing": self.missing}
+
+
+@lru_cache(maxsize=1)
+def get_protocol_cache() -> ProtocolCache:
+    return ProtocolCache()
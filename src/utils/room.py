@@ -5,10 +5,9 @@ import base64
 import hashlib
 import hmac
 import time
-import requests
 import jwt
-from livekit import api
 from src.core.settings import settings
+from src.utils.livekit_client import get_room_client
 
 
 def create_room_list_token() -> str:
@@ -26,25 +25,9 @@ def create_room_list_token() -> str:
 
 async def list_rooms() -> dict:
     """
-    Create a room using HTTP request to LiveKit server
-    
-    Args:
-        room_name: Name for the new room
+    List rooms through the pooled LiveKit RoomService client
         
     Returns:
-        Room creation response data
+        ListRooms response data
     """
-    token = create_room_list_token()
-    
-    # Make HTTP request to create room
-    url = f"https://{settings.livekit_url.replace('wss://', '').replace('ws://', '')}/twirp/livekit.RoomService/ListRooms"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    data = {}
-    response = requests.post(url, json=data, headers=headers)
-    response.raise_for_status()
-    
-    data = response.json()
-    return data
\ No newline at end of file
+    return await get_room_client().list_rooms()
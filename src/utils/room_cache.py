@@ -0,0 +1,100 @@
+"""
+Short-TTL cache of the LiveKit room list for GET /api/list-rooms
+
+Dashboards poll the room list from many browsers; within `ttl_s` all of them
+are served from one upstream ListRooms call, and concurrent callers on a
+miss share the same in-flight request (single-flight). Room webhooks from
+LiveKit invalidate the cache early. Every snapshot carries an ETag (hash of
+the response) and the time it last changed, for conditional GETs.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Awaitable, Callable, Optional
+
+from src.core.settings import settings
+from src.utils.room import list_rooms
+
+logger = logging.getLogger(__name__)
+
+# события вебхука, после которых список комнат (или число участников) меняется
+INVALIDATING_EVENTS = {"room_started", "room_finished", "participant_joined", "participant_left"}
+
+
+@dataclass
+class RoomList:
+    data: dict
+    etag: str
+    last_modified: float
+    fetched_at: float
+
+
+class RoomListCache:
+    def __init__(self, fetch: Callable[[], Awaitable[dict]], ttl_s: float = settings.room_list_cache_ttl_s):
+        self.fetch = fetch
+        self.ttl_s = ttl_s
+        self._current: Optional[RoomList] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._generation = 0
+
+        # метрики
+        self.hits = 0
+        self.fetches = 0
+        self.shared = 0
+        self.invalidations = 0
+
+    def _fresh(self) -> bool:
+        return self._current is not None and time.monotonic() - self._current.fetched_at < self.ttl_s
+
+    async def get(self) -> RoomList:
+        if self._fresh():
+            self.hits += 1
+            return self._current
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._refresh(), name="list_rooms")
+        else:
+            self.shared += 1
+        # shield: отмена одного запроса клиента не отменяет общий запрос к LiveKit
+        return await asyncio.shield(self._inflight)
+
+    async def _refresh(self) -> RoomList:
+        generation = self._generation
+        self.fetches += 1
+        try:
+            data = await self.fetch()
+        finally:
+            self._inflight = None
+        etag = '"' + hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest() + '"'
+        last_modified = time.time()
+        if self._current is not None and self._current.etag == etag:
+            last_modified = self._current.last_modified
+        # инвалидация во время запроса — ответ отдаём, но свежим не считаем
+        fetched_at = time.monotonic() if generation == self._generation else float("-inf")
+        self._current = RoomList(data=data, etag=etag, last_modified=last_modified, fetched_at=fetched_at)
+        return self._current
+
+    def invalidate(self):
+        self._generation += 1
+        self.invalidations += 1
+        if self._current is not None:
+            self._current.fetched_at = float("-inf")
+
+    def stats(self) -> dict:
+        requests = self.hits + self.fetches + self.shared
+        return {
+            "requests": requests,
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "shared": self.shared,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.hits + self.shared) / requests, 3) if requests else 0.0,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_room_list_cache() -> RoomListCache:
+    return RoomListCache(list_rooms)
@@ -0,0 +1,329 @@
+"""
+Per-room session output storage shared by the transcription worker and the API
+
+Everything a session produces lives under its room's prefix
+(`<room>/transcript.json`, `<room>/medical_protocol.txt`, ...), so concurrent
+rooms never write the same file. `put` is atomic — the object is written to a
+temporary name and renamed — so a reader never sees a half-written file.
+Streaming logs (`<room>/messages.txt`) go through long-lived buffered append
+handles instead of reopening the file for every line. A write schedules a
+flush timer on the event loop, so buffered lines reach the backend at most
+`storage_append_flush_s` seconds later even if no further line arrives;
+handles are closed with `close_room`.
+
+Backends:
+- "local": files under `storage_dir` (the output volume shared by the worker
+  and every uvicorn worker); blocking calls run in a thread;
+- "memory": an in-process object store stand-in, for a single process
+  (benchmarks, local experiments).
+"""
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Protocol
+from urllib.parse import quote
+
+from src.core.settings import settings
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    key: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def mtime(self) -> float:
+        return self.mtime_ns / 1e9
+
+
+def room_prefix(room_name: str) -> str:
+    """Room name as a single safe path segment (reversible, no separators, no leading dot)"""
+    if not room_name:
+        raise ValueError("Empty room name")
+    segment = quote(room_name, safe="")
+    return "%2E" + segment[1:] if segment.startswith(".") else segment
+
+
+def room_key(room_name: str, name: str) -> str:
+    return f"{room_prefix(room_name)}/{name}"
+
+
+def protocol_key(room_name: str, fmt: str = "txt", partial: bool = False) -> str:
+    """Final protocol document; `partial` — the one rewritten while sections stream"""
+    return room_key(room_name, f"medical_protocol.partial.{fmt}" if partial else f"medical_protocol.{fmt}")
+
+
+class Appender(Protocol):
+    def write(self, text: str): ...
+
+    def flush(self): ...
+
+    def close(self): ...
+
+
+class Storage(Protocol):
+    async def put(self, key: str, data: str | bytes): ...
+
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def stat(self, key: str) -> Optional[ObjectInfo]: ...
+
+    def appender(self, key: str) -> Appender: ...
+
+    async def close_room(self, room_name: str): ...
+
+    async def aclose(self): ...
+
+    def stats(self) -> dict: ...
+
+
+def _as_bytes(data: str | bytes) -> bytes:
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+class _TimedFlush:
+    """Flush timer of a buffered appender: one pending call_later while data is unflushed"""
+    flush_s: float
+    _flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # вне event loop таймера нет: данные уйдут при переполнении буфера или close
+            return
+        self._flush_handle = loop.call_later(self.flush_s, self._on_flush_timer)
+
+    def _on_flush_timer(self):
+        # handle сбрасывается на стороне loop, до самого сброса данных
+        self._flush_handle = None
+        self._timer_flush()
+
+    def _timer_flush(self):
+        self.flush()
+
+    def _cancel_flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+
+class _LocalAppender(_TimedFlush):
+    def __init__(self, path: str, buffer_bytes: int, flush_s: float):
+        self.path = path
+        self.flush_s = flush_s
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "ab", buffering=buffer_bytes)
+
+    def write(self, text: str):
+        # запись попадает в буфер файла; на диск — при заполнении буфера или по таймеру через flush_s
+        self._file.write(text.encode("utf-8"))
+        self._schedule_flush()
+
+    def _timer_flush(self):
+        # flush файла блокирующий — по таймеру выполняется в потоке, не в event loop
+        asyncio.get_running_loop().run_in_executor(None, self._flush_file)
+
+    def _flush_file(self):
+        try:
+            self._file.flush()
+        except ValueError:
+            # файл закрыли, пока flush ждал поток; close уже сбросил буфер
+            pass
+
+    def flush(self):
+        self._cancel_flush()
+        self._flush_file()
+
+    def close(self):
+        self._cancel_flush()
+        if not self._file.closed:
+            self._file.close()
+
+
+class LocalStorage:
+    def __init__(
+        self,
+        root: str = settings.storage_dir,
+        append_buffer_bytes: int = settings.storage_append_buffer_bytes,
+        append_flush_s: float = settings.storage_append_flush_s,
+    ):
+        self.root = root
+        self.append_buffer_bytes = append_buffer_bytes
+        self.append_flush_s = append_flush_s
+        self._appenders: dict[str, _LocalAppender] = {}
+
+        # метрики
+        self.puts = 0
+        self.gets = 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _put(self, key: str, data: bytes):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # уникальное временное имя: параллельные записи одного ключа не портят друг друга
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _stat(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            st = os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+        return ObjectInfo(key=key, size=st.st_size, mtime_ns=st.st_mtime_ns)
+
+    async def put(self, key: str, data: str | bytes):
+        self.puts += 1
+        await asyncio.to_thread(self._put, key, _as_bytes(data))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self.gets += 1
+        return await asyncio.to_thread(self._get, key)
+
+    async def stat(self, key: str) -> Optional[ObjectInfo]:
+        return await asyncio.to_thread(self._stat, key)
+
+    def appender(self, key: str) -> Appender:
+        """One long-lived handle per key; close it with close_room / aclose"""
+        appender = self._appenders.get(key)
+        if appender is None:
+            appender = self._appenders[key] = _LocalAppender(
+                self.path(key), self.append_buffer_bytes, self.append_flush_s
+            )
+        return appender
+
+    def _close(self, keys: list[str]):
+        for key in keys:
+            self._appenders.pop(key).close()
+
+    def _cancel_flushes(self, keys: list[str]):
+        # таймеры принадлежат event loop — снимаем их до закрытия файлов в потоке
+        for key in keys:
+            self._appenders[key]._cancel_flush()
+
+    async def close_room(self, room_name: str):
+        prefix = room_prefix(room_name) + "/"
+        keys = [key for key in self._appenders if key.startswith(prefix)]
+        if keys:
+            self._cancel_flushes(keys)
+            await asyncio.to_thread(self._close, keys)
+
+    async def aclose(self):
+        if self._appenders:
+            keys = list(self._appenders)
+            self._cancel_flushes(keys)
+            await asyncio.to_thread(self._close, keys)
+
+    def stats(self) -> dict:
+        return {"puts": self.puts, "gets": self.gets, "open_appenders": len(self._appenders)}
+
+
+class _MemoryAppender(_TimedFlush):
+    def __init__(self, storage: "MemoryStorage", key: str, flush_s: float):
+        self.storage = storage
+        self.key = key
+        self.flush_s = flush_s
+        self._buffer: list[bytes] = []
+
+    def write(self, text: str):
+        self._buffer.append(text.encode("utf-8"))
+        self._schedule_flush()
+
+    def flush(self):
+        self._cancel_flush()
+        if self._buffer:
+            data, self._buffer = b"".join(self._buffer), []
+            self.storage._append(self.key, data)
+
+    def close(self):
+        self.flush()
+
+
+class MemoryStorage:
+    """Object store stand-in: whole-object put/get, appends are buffered and flushed as a new version"""
+
+    def __init__(self, append_flush_s: float = settings.storage_append_flush_s):
+        self.append_flush_s = append_flush_s
+        self._objects: dict[str, tuple[bytes, int]] = {}
+        self._appenders: dict[str, _MemoryAppender] = {}
+
+        # метрики
+        self.puts = 0
+        self.gets = 0
+
+    def _store(self, key: str, data: bytes):
+        previous = self._objects.get(key)
+        mtime_ns = time.time_ns()
+        if previous is not None and mtime_ns <= previous[1]:
+            # версия (ETag) должна меняться даже при записи в ту же наносекунду
+            mtime_ns = previous[1] + 1
+        self._objects[key] = (data, mtime_ns)
+
+    def _append(self, key: str, data: bytes):
+        previous = self._objects.get(key)
+        self._store(key, previous[0] + data if previous is not None else data)
+
+    async def put(self, key: str, data: str | bytes):
+        self.puts += 1
+        self._store(key, _as_bytes(data))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self.gets += 1
+        obj = self._objects.get(key)
+        return obj[0] if obj is not None else None
+
+    async def stat(self, key: str) -> Optional[ObjectInfo]:
+        obj = self._objects.get(key)
+        return ObjectInfo(key=key, size=len(obj[0]), mtime_ns=obj[1]) if obj is not None else None
+
+    def appender(self, key: str) -> Appender:
+        appender = self._appenders.get(key)
+        if appender is None:
+            appender = self._appenders[key] = _MemoryAppender(self, key, self.append_flush_s)
+        return appender
+
+    async def close_room(self, room_name: str):
+        prefix = room_prefix(room_name) + "/"
+        for key in [key for key in self._appenders if key.startswith(prefix)]:
+            self._appenders.pop(key).close()
+
+    async def aclose(self):
+        for appender in self._appenders.values():
+            appender.close()
+        self._appenders.clear()
+
+    def stats(self) -> dict:
+        return {"puts": self.puts, "gets": self.gets, "open_appenders": len(self._appenders), "objects": len(self._objects)}
+
+
+@lru_cache(maxsize=1)
+def get_storage() -> Storage:
+    if settings.storage_backend == "local":
+        return LocalStorage()
+    if settings.storage_backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend}")